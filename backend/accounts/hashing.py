@@ -0,0 +1,44 @@
+"""
+Hash de palavras-passe em paralelo (ProcessPoolExecutor) para importações em massa.
+
+O hasher PBKDF2 é propositadamente lento (~centenas de ms por palavra-passe) e ocupa
+um núcleo; com um processo por núcleo, uma turma de 10k usuários leva minutos em vez
+de horas. Este módulo não importa models para os processos filhos poderem
+arrancar o Django no initializer (fork ou spawn).
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _hash_chunk(passwords):
+    from django.contrib.auth.hashers import make_password
+    return [make_password(password) for password in passwords]
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    make_password de cada palavra-passe (None = sem palavra-passe utilizável), pela ordem.
+    workers=1 faz o hash neste processo; None usa um processo por núcleo.
+    """
+    passwords = list(passwords)
+    workers = workers or os.cpu_count() or 1
+    to_hash = [i for i, password in enumerate(passwords) if password]
+    if workers <= 1 or len(to_hash) < 2:
+        return _hash_chunk(passwords)
+
+    hashed = _hash_chunk([None] * len(passwords))
+    chunk_size = max(1, min(100, len(to_hash) // (workers * 4) or 1))
+    chunks = [to_hash[i:i + chunk_size] for i in range(0, len(to_hash), chunk_size)]
+    settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(settings_module,)) as pool:
+        results = pool.map(_hash_chunk, [[passwords[i] for i in chunk] for chunk in chunks])
+        for chunk, values in zip(chunks, results):
+            for i, value in zip(chunk, values):
+                hashed[i] = value
+    return hashed
@@ -0,0 +1,141 @@
+"""
+Importação de turmas (escola, empresa) a partir de CSV.
+
+Colunas: email (obrigatória), username, first_name, last_name, phone, password.
+Sem password, o usuário fica sem palavra-passe utilizável (definida depois).
+
+As palavras-passe são processadas em paralelo (accounts/hashing.py) e cada lote
+grava User, Token, subscrição trial do app e inscrições nos cursos com bulk_create,
+numa transação por lote. Emails/usernames já existentes (ou repetidos no ficheiro)
+são ignorados e reportados.
+"""
+import csv
+import io
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from courses.models import Course, Enrollment
+from subscriptions.models import TRIAL_DAYS, MobileAppSubscription
+
+from .hashing import hash_passwords
+from .models import User
+from .referral_codes import bulk_create_with_codes
+
+COLUMNS = ('email', 'username', 'first_name', 'last_name', 'phone', 'password')
+DEFAULT_BATCH_SIZE = 1000
+
+
+def read_csv(file):
+    """(linhas válidas, erros) de um CSV (texto ou bytes); cada erro é {'line', 'error'}"""
+    if isinstance(file, bytes):
+        file = file.decode('utf-8-sig')
+    if isinstance(file, str):
+        file = io.StringIO(file)
+    reader = csv.DictReader(file)
+    if not reader.fieldnames or 'email' not in [name.strip().lower() for name in reader.fieldnames]:
+        return [], [{'line': 1, 'error': 'Coluna email em falta.'}]
+
+    rows, errors, seen = [], [], set()
+    for line, raw in enumerate(reader, start=2):
+        row = {
+            (key or '').strip().lower(): (value or '').strip()
+            for key, value in raw.items()
+            if (key or '').strip().lower() in COLUMNS
+        }
+        email = row.get('email', '').lower()
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors.append({'line': line, 'error': f'Email inválido: {email or "(vazio)"}'})
+            continue
+        username = row.get('username') or email
+        if email in seen or username.lower() in seen:
+            errors.append({'line': line, 'error': f'Repetido no ficheiro: {email}'})
+            continue
+        seen.update({email, username.lower()})
+        rows.append({**row, 'email': email, 'username': username[:150]})
+    return rows, errors
+
+
+def resolve_courses(values):
+    """(cursos, valores não encontrados) a partir de ids ou slugs"""
+    values = [str(value).strip() for value in values if str(value).strip()]
+    ids = [int(value) for value in values if value.isdigit()]
+    courses = list(Course.objects.filter(id__in=ids)) + list(Course.objects.filter(slug__in=values))
+    found = {str(course.id) for course in courses} | {course.slug for course in courses}
+    unique = list({course.id: course for course in courses}.values())
+    return unique, [value for value in values if value not in found]
+
+
+def _existing(rows):
+    """Emails e usernames (minúsculas) das linhas que já existem na base de dados, sem distinguir maiúsculas"""
+    emails = {row['email'].lower() for row in rows}
+    usernames = {row['username'].lower() for row in rows}
+    existing = set(
+        User.objects.annotate(email_lower=Lower('email'))
+        .filter(email_lower__in=emails)
+        .values_list('email_lower', flat=True)
+    )
+    existing.update(
+        User.objects.annotate(username_lower=Lower('username'))
+        .filter(username_lower__in=usernames)
+        .values_list('username_lower', flat=True)
+    )
+    return existing
+
+
+def import_users(rows, courses=(), trial=True, enrollment_status='active',
+                 workers=None, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Criar os usuários de `rows` (de read_csv) com token, trial do app (se `trial`) e
+    inscrições em `courses`. Devolve {'created', 'skipped'}; `skipped` lista os emails ignorados.
+    """
+    existing = _existing(rows) if rows else set()
+    skipped = [row['email'] for row in rows if row['email'] in existing or row['username'].lower() in existing]
+    rows = [row for row in rows if row['email'] not in existing and row['username'].lower() not in existing]
+    passwords = hash_passwords([row.get('password') or None for row in rows], workers=workers)
+
+    created = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        now = timezone.now()
+        users = [
+            User(
+                email=row['email'],
+                username=row['username'],
+                first_name=row.get('first_name', '')[:150],
+                last_name=row.get('last_name', '')[:150],
+                phone=row.get('phone', '')[:20],
+                password=password,
+            )
+            for row, password in zip(batch, passwords[start:start + batch_size])
+        ]
+        with transaction.atomic():
+            users = bulk_create_with_codes(User, users)
+            Token.objects.bulk_create([Token(key=Token.generate_key(), user=user) for user in users])
+            if trial:
+                MobileAppSubscription.objects.bulk_create([
+                    MobileAppSubscription(user=user, status='trial', trial_ends_at=now + timedelta(days=TRIAL_DAYS))
+                    for user in users
+                ])
+            if courses:
+                Enrollment.objects.bulk_create([
+                    Enrollment(
+                        user=user,
+                        course=course,
+                        status=enrollment_status,
+                        activated_at=now if enrollment_status == 'active' else None,
+                    )
+                    for user in users
+                    for course in courses
+                ])
+        created += len(users)
+        if progress:
+            progress(created, len(rows))
+    return {'created': created, 'skipped': skipped}
@@ -0,0 +1,88 @@
+"""
+Management command para importar uma turma de usuários (escola, empresa) de um CSV.
+
+Exemplo:
+    python manage.py import_users turma.csv --course financas-pessoais --workers 8
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.importing import DEFAULT_BATCH_SIZE, import_users, read_csv, resolve_courses
+
+
+class Command(BaseCommand):
+    help = 'Importa usuários de um CSV (email, username, first_name, last_name, phone, password)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Caminho do ficheiro CSV (UTF-8)')
+        parser.add_argument(
+            '--course',
+            action='append',
+            default=[],
+            help='Inscrever os usuários neste curso (id ou slug); pode repetir-se',
+        )
+        parser.add_argument(
+            '--pending',
+            action='store_true',
+            help='Criar as inscrições como pendentes (por defeito ficam ativas)',
+        )
+        parser.add_argument(
+            '--no-trial',
+            action='store_true',
+            help='Não criar a subscrição trial do app móvel',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processos para o hash das palavras-passe (por defeito, um por núcleo)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Usuários por transação',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Só validar o ficheiro, sem criar usuários',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_file'], encoding='utf-8-sig', newline='') as f:
+                rows, errors = read_csv(f)
+        except OSError as e:
+            raise CommandError(f'Não foi possível ler o ficheiro: {e}')
+
+        courses, missing = resolve_courses(options['course'])
+        if missing:
+            raise CommandError(f'Curso(s) não encontrado(s): {", ".join(missing)}')
+
+        for error in errors:
+            self.stdout.write(self.style.WARNING(f'  Linha {error["line"]}: {error["error"]}'))
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'{len(rows)} usuário(s) válido(s), {len(errors)} linha(s) com erro (dry-run).'
+            ))
+            return
+
+        def progress(done, total):
+            self.stdout.write(f'  {done}/{total} usuário(s)')
+
+        result = import_users(
+            rows,
+            courses=courses,
+            trial=not options['no_trial'],
+            enrollment_status='pending' if options['pending'] else 'active',
+            workers=options['workers'],
+            batch_size=max(options['batch_size'], 1),
+            progress=progress,
+        )
+        for email in result['skipped']:
+            self.stdout.write(self.style.WARNING(f'  Já existe: {email}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Total de {result["created"]} usuário(s) importado(s), '
+            f'{len(result["skipped"])} já existente(s), {len(errors)} linha(s) com erro.'
+        ))
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-import secrets
+
+from .referral_codes import new_code, save_with_code
 
 
 class User(AbstractUser):
@@ -17,16 +18,12 @@ class User(AbstractUser):
     REQUIRED_FIELDS = ['username']
 
     def save(self, *args, **kwargs):
-        if not self.referral_code:
-            self.referral_code = self.generate_referral_code()
-        super().save(*args, **kwargs)
+        # Código gerado sem consultar a base de dados; colisões são repetidas (referral_codes)
+        save_with_code(self, super().save, *args, **kwargs)
 
     def generate_referral_code(self):
-        """Gera um código de referência único"""
-        while True:
-            code = secrets.token_urlsafe(8)[:12].upper()
-            if not User.objects.filter(referral_code=code).exists():
-                return code
+        """Gera um código de referência (a unicidade é garantida pela restrição UNIQUE)"""
+        return new_code()
 
     def __str__(self):
         return self.email
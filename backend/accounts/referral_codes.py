@@ -0,0 +1,74 @@
+"""
+Alocação de códigos de referência sem loops de verificação.
+
+Os códigos são aleatórios (secrets) num alfabeto sem caracteres ambíguos
+(32^10 ≈ 10^15 combinações), pelo que uma colisão é muito improvável. Em vez de
+consultar a base de dados antes de gravar, a gravação confia na restrição UNIQUE
+de User.referral_code: se colidir, o savepoint é desfeito e a gravação repetida
+com um código novo. Os lotes (bulk_create) recebem os códigos todos de uma vez.
+"""
+import secrets
+
+from django.db import IntegrityError, transaction
+
+# Base32 de Crockford (sem I, L, O, U), fácil de ditar e de copiar
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+CODE_LENGTH = 10
+MAX_ATTEMPTS = 5
+
+
+def new_code():
+    return ''.join(secrets.choice(ALPHABET) for _ in range(CODE_LENGTH))
+
+
+def new_codes(count):
+    """`count` códigos distintos entre si"""
+    codes = set()
+    while len(codes) < count:
+        codes.add(new_code())
+    return list(codes)
+
+
+def is_referral_code_conflict(error):
+    return 'referral_code' in str(error)
+
+
+def assign_codes(users):
+    """Atribuir códigos aos usuários (ainda não gravados) que não têm um"""
+    missing = [user for user in users if not user.referral_code]
+    for user, code in zip(missing, new_codes(len(missing))):
+        user.referral_code = code
+    return users
+
+
+def save_with_code(user, save, *args, **kwargs):
+    """
+    Gravar `user` com `save(*args, **kwargs)`, gerando o código se faltar e repetindo
+    num savepoint se o código gerado colidir com um existente
+    """
+    if user.referral_code:
+        return save(*args, **kwargs)
+    for attempt in range(MAX_ATTEMPTS):
+        user.referral_code = new_code()
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError as e:
+            if not is_referral_code_conflict(e) or attempt == MAX_ATTEMPTS - 1:
+                user.referral_code = None
+                raise
+
+
+def bulk_create_with_codes(model, users, batch_size=None):
+    """bulk_create de usuários com códigos atribuídos em lote (repete o lote se um código colidir)"""
+    generated = [user for user in users if not user.referral_code]
+    for attempt in range(MAX_ATTEMPTS):
+        for user in generated:
+            user.referral_code = None
+        assign_codes(generated)
+        try:
+            with transaction.atomic():
+                return model.objects.bulk_create(users, batch_size=batch_size)
+        except IntegrityError as e:
+            if not is_referral_code_conflict(e) or attempt == MAX_ATTEMPTS - 1:
+                raise
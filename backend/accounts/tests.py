@@ -0,0 +1,140 @@
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from courses.models import Course, Enrollment
+from subscriptions.models import MobileAppSubscription
+
+from .hashing import hash_passwords
+from .importing import import_users, read_csv
+from .referral_codes import MAX_ATTEMPTS, bulk_create_with_codes
+
+User = get_user_model()
+
+TAKEN = 'AAAAAAAAAA'
+
+
+class ReferralCodeTests(TestCase):
+    def setUp(self):
+        User.objects.create(email='ana@example.com', username='ana', referral_code=TAKEN)
+
+    def test_new_user_gets_a_code(self):
+        user = User.objects.create(email='rui@example.com', username='rui')
+        self.assertEqual(len(user.referral_code), 10)
+
+    def test_collision_is_retried_with_a_new_code(self):
+        with mock.patch('accounts.referral_codes.new_code', side_effect=[TAKEN, 'BBBBBBBBBB']) as new_code:
+            user = User.objects.create(email='rui@example.com', username='rui')
+        self.assertEqual(new_code.call_count, 2)
+        self.assertEqual(User.objects.get(pk=user.pk).referral_code, 'BBBBBBBBBB')
+
+    def test_gives_up_after_max_attempts(self):
+        with mock.patch('accounts.referral_codes.new_code', return_value=TAKEN) as new_code:
+            with self.assertRaises(IntegrityError):
+                User.objects.create(email='rui@example.com', username='rui')
+        self.assertEqual(new_code.call_count, MAX_ATTEMPTS)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_other_integrity_errors_are_not_retried(self):
+        with mock.patch('accounts.referral_codes.new_code', return_value='CCCCCCCCCC') as new_code:
+            with self.assertRaises(IntegrityError):
+                User.objects.create(email='ana@example.com', username='ana2')
+        self.assertEqual(new_code.call_count, 1)
+
+    def test_bulk_create_retries_the_batch_on_collision(self):
+        users = [User(email=f'aluno{i}@example.com', username=f'aluno{i}') for i in range(2)]
+        codes = [TAKEN, 'CCCCCCCCCC', 'DDDDDDDDDD', 'EEEEEEEEEE']
+        with mock.patch('accounts.referral_codes.new_code', side_effect=codes):
+            bulk_create_with_codes(User, users)
+        self.assertEqual(
+            set(User.objects.filter(username__startswith='aluno').values_list('referral_code', flat=True)),
+            {'DDDDDDDDDD', 'EEEEEEEEEE'},
+        )
+
+
+CSV = """email,username,first_name,password
+ana@example.com,ana,Ana,segredo123
+rui@example.com,RUI,Rui,
+eva@example.com,eva,Eva,segredo456
+nao-e-email,x,X,
+eva@example.com,eva2,Eva,
+"""
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportUsersTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(title='Finanças', slug='financas', description='...', price=10)
+
+    def test_read_csv_reports_invalid_and_repeated_lines(self):
+        rows, errors = read_csv(CSV.encode())
+        self.assertEqual([row['email'] for row in rows], ['ana@example.com', 'rui@example.com', 'eva@example.com'])
+        self.assertEqual([error['line'] for error in errors], [5, 6])
+        self.assertEqual(read_csv('nome\nAna\n')[1], [{'line': 1, 'error': 'Coluna email em falta.'}])
+
+    def test_existing_emails_and_usernames_are_skipped_ignoring_case(self):
+        User.objects.create(email='Ana@Example.com', username='outra')
+        User.objects.create(email='outro@example.com', username='rui')
+        rows, _ = read_csv(CSV)
+
+        result = import_users(rows, courses=[self.course], workers=1)
+        self.assertEqual(result, {'created': 1, 'skipped': ['ana@example.com', 'rui@example.com']})
+        eva = User.objects.get(email='eva@example.com')
+        self.assertTrue(eva.check_password('segredo456'))
+        self.assertTrue(eva.referral_code)
+        self.assertTrue(Token.objects.filter(user=eva).exists())
+        self.assertEqual(MobileAppSubscription.objects.get(user=eva).status, 'trial')
+        self.assertEqual(Enrollment.objects.get(user=eva).status, 'active')
+
+    def test_parallel_hashing_stores_each_users_password(self):
+        rows = [
+            {'email': f'aluno{i}@example.com', 'username': f'aluno{i}', 'password': f'segredo-{i}'}
+            for i in range(3)
+        ] + [{'email': 'sem@example.com', 'username': 'sem', 'password': ''}]
+        # workers=2: hash nos processos filhos (ProcessPoolExecutor)
+        with mock.patch('accounts.hashing.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            self.assertEqual(import_users(rows, trial=False, workers=2)['created'], 4)
+        pool.assert_called_once()
+        for i in range(3):
+            user = User.objects.get(email=f'aluno{i}@example.com')
+            self.assertTrue(user.check_password(f'segredo-{i}'))
+            self.assertFalse(user.check_password(f'segredo-{(i + 1) % 3}'))
+        self.assertFalse(User.objects.get(email='sem@example.com').has_usable_password())
+
+    def test_rows_without_password_get_an_unusable_one(self):
+        rows, _ = read_csv(CSV)
+        import_users(rows, trial=False, workers=1, batch_size=1)
+        self.assertFalse(User.objects.get(email='rui@example.com').has_usable_password())
+        self.assertFalse(MobileAppSubscription.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AdminImportUsersTests(TestCase):
+    url = '/api/course/admin/users/import/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(email='admin@example.com', username='admin', is_staff=True))
+
+    def _upload(self, content):
+        return self.client.post(self.url, {'file': SimpleUploadedFile('turma.csv', content.encode())}, format='multipart')
+
+    def test_imports_in_the_request_process(self):
+        with mock.patch('accounts.importing.hash_passwords', wraps=hash_passwords) as hashing:
+            response = self._upload(CSV)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(len(response.data['errors']), 2)
+        self.assertEqual(hashing.call_args.kwargs['workers'], 1)
+
+    @override_settings(USER_IMPORT_MAX_ROWS=2)
+    def test_large_cohorts_are_refused(self):
+        response = self._upload(CSV)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(email='ana@example.com').exists())
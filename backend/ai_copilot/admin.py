@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Conversation, Message
+from .models import Conversation, Message, GenerationJob, CopilotUsage
 
 
 @admin.register(Conversation)
@@ -9,18 +9,44 @@ class ConversationAdmin(admin.ModelAdmin):
     search_fields = ['user__email', 'title']
     readonly_fields = ['created_at', 'updated_at']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user').with_summary()
+
     def message_count(self, obj):
-        return obj.messages.count()
+        return obj.message_count
     message_count.short_description = 'Mensagens'
+    message_count.admin_order_field = 'message_count'
 
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
-    list_display = ['id', 'conversation', 'role', 'content_preview', 'created_at']
-    list_filter = ['role', 'created_at']
+    list_display = ['id', 'conversation', 'role', 'content_preview', 'prompt_tokens', 'completion_tokens', 'latency_ms', 'created_at']
+    list_filter = ['role', 'model', 'created_at']
     search_fields = ['content', 'conversation__user__email']
     readonly_fields = ['created_at']
 
     def content_preview(self, obj):
         return obj.content[:100] + '...' if len(obj.content) > 100 else obj.content
     content_preview.short_description = 'Conteúdo'
+
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'conversation', 'status', 'attempts', 'run_after', 'locked_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['conversation__user__email', 'last_error']
+    readonly_fields = ['created_at', 'updated_at', 'finished_at']
+    raw_id_fields = ['conversation', 'user_message', 'assistant_message']
+
+
+@admin.register(CopilotUsage)
+class CopilotUsageAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'requests', 'prompt_tokens', 'completion_tokens', 'total_tokens']
+    list_filter = ['date']
+    search_fields = ['user__email']
+    date_hierarchy = 'date'
+    readonly_fields = ['updated_at']
+
+    def total_tokens(self, obj):
+        return obj.total_tokens
+    total_tokens.short_description = 'Total de tokens'
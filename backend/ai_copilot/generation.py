@@ -0,0 +1,256 @@
+"""
+Geração de respostas do AI Financial Copilot (contexto financeiro, prompt e chamada à OpenAI).
+Usado tanto pelo worker da fila de jobs como pelo processamento inline do chat.
+"""
+import logging
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from . import insights
+
+# Try to import OpenAI - if not available, will use fallback responses
+try:
+    import openai
+    from openai import OpenAI
+    OPENAI_AVAILABLE = True
+    TRANSIENT_OPENAI_ERRORS = (
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+except ImportError:
+    OPENAI_AVAILABLE = False
+    TRANSIENT_OPENAI_ERRORS = ()
+
+logger = logging.getLogger(__name__)
+
+HISTORY_LIMIT = 10
+
+ERROR_NOTE = "\n\nNota: O serviço de IA avançada pode estar temporariamente indisponível. Tente novamente em alguns instantes."
+
+
+class TransientGenerationError(Exception):
+    """Erro temporário da OpenAI (rede, timeout, rate limit, 5xx) - o job pode ser repetido"""
+
+
+@dataclass
+class GenerationResult:
+    """Resposta gerada e métricas de uso (tokens a zero quando é resposta fallback)"""
+    content: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: int = 0
+    model: str = ''
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+
+def get_financial_context(user):
+    """Obter contexto financeiro do usuário para o AI"""
+    context = {
+        'user_name': user.get_full_name() or user.first_name or user.email.split('@')[0],
+    }
+
+    try:
+        from finance.models import PersonalExpense, Budget, Goal, Debt
+        from django.db.models import Sum, F
+        from django.utils import timezone
+
+        current_month = timezone.now().month
+        current_year = timezone.now().year
+
+        expenses = PersonalExpense.objects.filter(
+            user=user,
+            date__month=current_month,
+            date__year=current_year
+        ).aggregate(total=Sum('amount'))['total'] or 0
+
+        budgets = Budget.objects.filter(
+            user=user,
+            month=current_month,
+            year=current_year
+        ).aggregate(total=Sum('amount'))['total'] or 0
+
+        goals = Goal.objects.filter(user=user, status='active').count()
+        # Total restante das dívidas ativas/vencidas (total_amount - paid_amount, nunca negativo)
+        debts = Debt.objects.filter(
+            user=user,
+            status__in=['active', 'overdue'],
+            total_amount__gt=F('paid_amount'),
+        ).aggregate(total=Sum(F('total_amount') - F('paid_amount')))['total'] or 0
+
+        context.update({
+            'monthly_expenses': float(expenses),
+            'monthly_budgets': float(budgets),
+            'active_goals': goals,
+            'active_debts': float(debts),
+        })
+    except Exception:
+        # Se houver erro ao obter dados financeiros, continuar sem contexto
+        logger.exception("Error loading financial context for AI Copilot")
+
+    return context
+
+
+def prepare_messages(conversation, financial_context, user_message=None):
+    """
+    Preparar mensagens para o AI incluindo contexto financeiro. Com `user_message`,
+    o histórico termina nessa mensagem (as enviadas depois têm o seu próprio job)
+    """
+    messages = [
+        {
+            'role': 'system',
+            'content': f"""Você é um assistente financeiro especializado e preciso chamado AI Financial Copilot.
+Você ajuda usuários com educação financeira, planejamento, orçamento e gestão de dinheiro.
+
+IMPORTANTE - PRECISÃO E EXATIDÃO:
+- Sempre forneça informações financeiras precisas e baseadas em melhores práticas reconhecidas
+- Use apenas dados e estatísticas verificáveis quando mencionar números
+- Se não tiver certeza sobre algo específico, seja honesto e sugira consultar um profissional financeiro
+- Evite fazer previsões específicas sobre mercados ou investimentos
+- Foque em educação financeira e estratégias comprovadas
+
+CONTEXTO DO USUÁRIO:
+- Nome: {financial_context.get('user_name', 'Usuário')}
+- Despesas do mês atual: {financial_context.get('monthly_expenses', 0):.2f} AOA (Kwanza Angolano)
+- Orçamentos do mês: {financial_context.get('monthly_budgets', 0):.2f} AOA
+- Metas ativas: {financial_context.get('active_goals', 0)}
+- Dívidas ativas: {financial_context.get('active_debts', 0):.2f} AOA
+
+DIRETRIZES DE RESPOSTA:
+1. Forneça conselhos financeiros práticos, personalizados e baseados em evidências
+2. Ajudar com planejamento de orçamento usando métodos reconhecidos (ex: Regra 50/30/20)
+3. Explicar conceitos financeiros de forma clara e precisa
+4. Sugerir estratégias de poupança e investimento adequadas ao contexto do usuário
+5. Ajudar a definir e alcançar metas financeiras realistas
+6. Sempre mencione a moeda AOA (Kwanza Angolano) quando falar de valores
+7. Seja específico e acionável - evite generalidades vagas
+8. Quando apropriado, mencione ferramentas do app que podem ajudar
+
+ESTILO:
+- Seja positivo, encorajador e prático
+- Use linguagem clara e acessível
+- Estruture respostas com pontos claros quando apropriado
+- Responda sempre em português (português de Angola quando relevante)
+- Mantenha respostas focadas e relevantes à pergunta do usuário"""
+        }
+    ]
+
+    # Adicionar histórico da conversa (últimas mensagens, em ordem cronológica)
+    history = conversation.messages.all()
+    if user_message is not None:
+        history = history.filter(id__lte=user_message.id)
+    previous_messages = list(history.order_by('-created_at', '-id')[:HISTORY_LIMIT])
+    for msg in reversed(previous_messages):
+        messages.append({
+            'role': msg.role,
+            'content': msg.content
+        })
+
+    return messages
+
+
+def call_openai(messages, raise_transient=False):
+    """
+    Chamar OpenAI API - sempre tenta usar OpenAI primeiro se disponível.
+    Devolve um GenerationResult com o conteúdo, tokens usados e latência.
+    Com raise_transient=True, erros temporários levantam TransientGenerationError
+    (para o worker repetir o job) em vez de devolver a resposta fallback.
+    """
+    api_key = getattr(settings, 'OPENAI_API_KEY', None)
+    user_message = messages[-1]['content'].lower() if messages else ""
+
+    # Se não houver API key ou OpenAI não disponível, usar fallback
+    if not api_key:
+        logger.warning("OPENAI_API_KEY not configured - using fallback responses")
+        return GenerationResult(get_fallback_response(user_message))
+
+    if not OPENAI_AVAILABLE:
+        logger.warning("OpenAI package not installed - using fallback responses")
+        return GenerationResult(get_fallback_response(user_message))
+
+    model = getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini')
+    started = time.monotonic()
+    try:
+        logger.info("Calling OpenAI API for AI Copilot response")
+        client = OpenAI(api_key=api_key)
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=800,
+            temperature=0.5,  # Lower temperature for more accurate, consistent responses
+            top_p=0.9,  # Nucleus sampling for better quality
+        )
+        latency_ms = int((time.monotonic() - started) * 1000)
+        ai_content = (response.choices[0].message.content or '').strip()
+        if not ai_content:
+            raise TransientGenerationError("Empty response from OpenAI")
+
+        logger.info(f"OpenAI API response received successfully ({len(ai_content)} characters, {latency_ms}ms)")
+        usage = getattr(response, 'usage', None)
+        return GenerationResult(
+            content=ai_content,
+            prompt_tokens=getattr(usage, 'prompt_tokens', 0) or 0,
+            completion_tokens=getattr(usage, 'completion_tokens', 0) or 0,
+            latency_ms=latency_ms,
+            model=getattr(response, 'model', None) or model,
+        )
+
+    except TRANSIENT_OPENAI_ERRORS + (TransientGenerationError,) as e:
+        logger.warning(f"Transient OpenAI API error: {str(e)}")
+        if raise_transient:
+            raise TransientGenerationError(str(e)) from e
+        return GenerationResult(get_fallback_response(user_message, include_error_note=True))
+
+    except Exception as e:
+        # Log error for debugging
+        logger.error(f"OpenAI API error: {str(e)}", exc_info=True)
+        logger.warning("Falling back to contextual response due to OpenAI error")
+        return GenerationResult(get_fallback_response(user_message, include_error_note=True))
+
+
+def answer_locally(conversation, user_message=None):
+    """
+    Responder com o motor de insights (sem OpenAI) quando a mensagem (padrão: a última
+    do usuário) é uma pergunta comum sobre orçamento, poupança, dívidas ou metas; senão None.
+    """
+    if not getattr(settings, 'AI_COPILOT_INSIGHTS_ENABLED', True):
+        return None
+    if user_message is None:
+        user_message = conversation.messages.filter(role='user').order_by('-created_at', '-id').first()
+    if user_message is None:
+        return None
+    started = time.monotonic()
+    content = insights.answer(conversation.user, user_message.content)
+    if content is None:
+        return None
+    return GenerationResult(
+        content=content,
+        latency_ms=int((time.monotonic() - started) * 1000),
+        model=insights.INSIGHTS_MODEL,
+    )
+
+
+def generate_reply(conversation, user_message=None, raise_transient=False):
+    """
+    Gerar a resposta do assistente para `user_message` (padrão: a última mensagem da
+    conversa). Os jobs passam a sua mensagem: com várias na fila, cada um responde à sua
+    """
+    local_result = answer_locally(conversation, user_message)
+    if local_result is not None:
+        return local_result
+
+    financial_context = get_financial_context(conversation.user)
+    messages = prepare_messages(conversation, financial_context, user_message)
+    return call_openai(messages, raise_transient=raise_transient)
+
+
+def get_fallback_response(user_message, include_error_note=False, user=None):
+    """Gerar resposta fallback (motor de insights local) baseada na mensagem do usuário"""
+    reply = insights.fallback_reply(user_message, user=user)
+    return reply + ERROR_NOTE if include_error_note else reply
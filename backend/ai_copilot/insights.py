@@ -0,0 +1,368 @@
+"""
+Motor de insights local do AI Copilot (regras sobre os dados financeiros do usuário).
+
+Perguntas curtas sobre os dados do próprio usuário (orçamento, poupança, dívidas, metas)
+são respondidas aqui, sem chamar a OpenAI: os tópicos são detetados com uma única regex
+de palavras inteiras compilada no import, os dados do usuário são carregados de uma vez
+(FinanceSnapshot, 4 queries) e todas as regras dos tópicos pedidos são avaliadas sobre
+esse snapshot.
+
+Regras: orçamentos ultrapassados, ranking de dívidas por juros, ritmo das metas e
+picos de gasto por categoria.
+"""
+import calendar
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Callable
+
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+INSIGHTS_MODEL = 'insights'
+
+# Palavras-chave por tópico, com as flexões explícitas (sem acentos; a mensagem é
+# normalizada antes da pesquisa). Só palavras inteiras: 'meta' não apanha 'metade'.
+TOPIC_KEYWORDS = {
+    'budget': [
+        'orcamento', 'orcamentos', 'budget', 'gasto', 'gastos', 'gastar', 'gastei', 'gastamos',
+        'despesa', 'despesas',
+    ],
+    'savings': [
+        'poupanca', 'poupancas', 'poupar', 'poupo', 'poupei', 'economizar', 'economizo',
+        'economizei', 'economias', 'guardar dinheiro',
+    ],
+    'debt': [
+        'divida', 'dividas', 'debito', 'debitos', 'emprestimo', 'emprestimos', 'juros',
+        'credor', 'credores', 'cartao de credito', 'cartoes de credito',
+    ],
+    'goals': ['meta', 'metas', 'objetivo', 'objetivos'],
+}
+
+# Marcas de uma pergunta sobre os dados do próprio usuário; sem elas (ex.: "a meta de
+# inflação do BNA") a mensagem segue para a OpenAI
+OWN_DATA_WORDS = [
+    'meu', 'meus', 'minha', 'minhas', 'eu', 'tenho', 'estou', 'devo', 'quero', 'gastei',
+    'poupei', 'paguei',
+]
+# Mensagens longas costumam ser pedidos compostos: ficam para a OpenAI
+MAX_LOCAL_MESSAGE_WORDS = 30
+
+# Ordem das secções de dicas na resposta
+TOPIC_ORDER = ['budget', 'savings', 'debt', 'goals']
+
+BUDGET_WARNING_RATIO = Decimal('0.8')
+SPIKE_RATIO = Decimal('1.5')
+SPIKE_MIN_INCREASE = Decimal('5000')
+SPIKE_HISTORY_MONTHS = 3
+MAX_DEBTS_LISTED = 3
+MAX_INSIGHTS = 8
+
+SEVERITY_ALERT = 0
+SEVERITY_WARNING = 1
+SEVERITY_INFO = 2
+
+
+def _normalize(text):
+    """Minúsculas e sem acentos ('Dívida' → 'divida')"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _words_pattern(words):
+    return rf"\b(?:{'|'.join(map(re.escape, words))})\b"
+
+
+# Uma única regex com um grupo nomeado por tópico (compilada uma vez)
+_TOPIC_RE = re.compile('|'.join(
+    rf"(?P<{topic}>{_words_pattern(words)})"
+    for topic, words in TOPIC_KEYWORDS.items()
+))
+_OWN_DATA_RE = re.compile(_words_pattern(OWN_DATA_WORDS))
+
+
+def detect_topics(message):
+    """Tópicos mencionados na mensagem, na ordem de TOPIC_ORDER"""
+    found = {match.lastgroup for match in _TOPIC_RE.finditer(_normalize(message))}
+    return [topic for topic in TOPIC_ORDER if topic in found]
+
+
+def is_own_data_question(message):
+    """Pergunta curta sobre os dados do próprio usuário (pode ser respondida localmente)"""
+    normalized = _normalize(message)
+    return len(normalized.split()) <= MAX_LOCAL_MESSAGE_WORDS and bool(_OWN_DATA_RE.search(normalized))
+
+
+def _money(value):
+    return f"{value:.2f} AOA"
+
+
+@dataclass
+class FinanceSnapshot:
+    """Dados financeiros do usuário necessários às regras, carregados em lote"""
+    today: date
+    budgets: list = field(default_factory=list)
+    # {category_id: {primeiro dia do mês: total}}
+    spending: dict = field(default_factory=dict)
+    category_names: dict = field(default_factory=dict)
+    debts: list = field(default_factory=list)
+    goals: list = field(default_factory=list)
+
+    @property
+    def month_start(self):
+        return self.today.replace(day=1)
+
+    @classmethod
+    def load(cls, user, today=None):
+        from finance.models import Budget, Debt, Goal, PersonalExpense
+
+        today = today or timezone.localdate()
+        snapshot = cls(today=today)
+        history_start = snapshot.month_start
+        for _ in range(SPIKE_HISTORY_MONTHS):
+            history_start = (history_start - timedelta(days=1)).replace(day=1)
+
+        snapshot.budgets = list(
+            Budget.objects.filter(
+                user=user, period_type='monthly', month=today.month, year=today.year
+            ).values('category_id', 'category__name', 'amount')
+        )
+
+        rows = (
+            PersonalExpense.objects.filter(user=user, date__gte=history_start, date__lte=today)
+            .annotate(month=TruncMonth('date'))
+            .values('category_id', 'category__name', 'month')
+            .annotate(total=Sum('amount'))
+        )
+        spending = defaultdict(dict)
+        for row in rows:
+            month = row['month'].date() if hasattr(row['month'], 'date') else row['month']
+            spending[row['category_id']][month] = row['total']
+            snapshot.category_names[row['category_id']] = row['category__name'] or 'Sem categoria'
+        snapshot.spending = dict(spending)
+
+        snapshot.debts = list(
+            Debt.objects.filter(
+                user=user, status__in=['active', 'overdue'], total_amount__gt=F('paid_amount')
+            ).values('creditor', 'total_amount', 'paid_amount', 'interest_rate', 'due_date', 'status')
+        )
+        snapshot.goals = list(
+            Goal.objects.filter(user=user, status='active')
+            .values('title', 'target_amount', 'current_amount', 'target_date', 'created_at')
+        )
+        return snapshot
+
+    def spent_this_month(self, category_id):
+        return self.spending.get(category_id, {}).get(self.month_start, Decimal('0'))
+
+
+@dataclass(frozen=True)
+class Insight:
+    severity: int
+    text: str
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    topics: frozenset
+    evaluate: Callable[[FinanceSnapshot], list]
+
+
+def budget_overruns(snapshot):
+    """Orçamentos mensais ultrapassados, perto do limite ou que vão ser ultrapassados ao ritmo atual"""
+    insights = []
+    days_in_month = calendar.monthrange(snapshot.today.year, snapshot.today.month)[1]
+    for budget in snapshot.budgets:
+        amount = budget['amount']
+        spent = snapshot.spent_this_month(budget['category_id'])
+        name = budget['category__name'] or 'Geral'
+        if spent > amount:
+            insights.append(Insight(SEVERITY_ALERT, (
+                f"Orçamento de **{name}** ultrapassado: gastou {_money(spent)} de {_money(amount)} "
+                f"({_money(spent - amount)} acima)."
+            )))
+        elif spent >= amount * BUDGET_WARNING_RATIO:
+            insights.append(Insight(SEVERITY_WARNING, (
+                f"Orçamento de **{name}** quase esgotado: {spent / amount * 100:.0f}% usado, "
+                f"restam {_money(amount - spent)}."
+            )))
+        elif spent and spent / snapshot.today.day * days_in_month > amount:
+            projected = spent / snapshot.today.day * days_in_month
+            insights.append(Insight(SEVERITY_WARNING, (
+                f"Ao ritmo atual, o orçamento de **{name}** chega a {_money(projected)} "
+                f"no fim do mês (limite {_money(amount)})."
+            )))
+    return insights
+
+
+def category_spikes(snapshot):
+    """Categorias com gasto este mês bem acima da média dos meses anteriores"""
+    insights = []
+    previous_months = []
+    month = snapshot.month_start
+    for _ in range(SPIKE_HISTORY_MONTHS):
+        month = (month - timedelta(days=1)).replace(day=1)
+        previous_months.append(month)
+
+    for category_id, by_month in snapshot.spending.items():
+        current = by_month.get(snapshot.month_start, Decimal('0'))
+        history = [by_month[m] for m in previous_months if m in by_month]
+        if not current or not history:
+            continue
+        average = sum(history) / len(history)
+        if current > average * SPIKE_RATIO and current - average >= SPIKE_MIN_INCREASE:
+            insights.append(Insight(SEVERITY_WARNING, (
+                f"Gastos em **{snapshot.category_names[category_id]}** subiram: {_money(current)} este mês "
+                f"contra uma média de {_money(average)} nos meses anteriores."
+            )))
+    return insights
+
+
+def debt_interest_ranking(snapshot):
+    """Dívidas por ordem de pagamento recomendada (método avalanche: maior taxa de juros primeiro)"""
+    if not snapshot.debts:
+        return []
+    ranked = sorted(
+        snapshot.debts,
+        key=lambda d: (-d['interest_rate'], -(d['total_amount'] - d['paid_amount']))
+    )
+    insights = []
+    overdue = [d for d in ranked if d['status'] == 'overdue' or d['due_date'] < snapshot.today]
+    if overdue:
+        insights.append(Insight(SEVERITY_ALERT, (
+            f"Tem {len(overdue)} dívida(s) vencida(s): "
+            + ', '.join(f"**{d['creditor']}**" for d in overdue) + '. Contacte os credores para renegociar.'
+        )))
+    total = sum(d['total_amount'] - d['paid_amount'] for d in ranked)
+    order = '; '.join(
+        f"{i}. **{d['creditor']}** ({d['interest_rate']:.2f}% de juros, faltam {_money(d['total_amount'] - d['paid_amount'])})"
+        for i, d in enumerate(ranked[:MAX_DEBTS_LISTED], start=1)
+    )
+    insights.append(Insight(SEVERITY_INFO, (
+        f"Dívidas em aberto: {_money(total)}. Ordem sugerida (juros mais altos primeiro): {order}."
+    )))
+    return insights
+
+
+def goal_velocity(snapshot):
+    """Ritmo de cada meta ativa comparado com o necessário para chegar ao valor na data alvo"""
+    insights = []
+    for goal in snapshot.goals:
+        remaining = goal['target_amount'] - goal['current_amount']
+        if remaining <= 0:
+            continue
+        days_left = (goal['target_date'] - snapshot.today).days
+        if days_left <= 0:
+            insights.append(Insight(SEVERITY_ALERT, (
+                f"A meta **{goal['title']}** passou da data alvo com {_money(remaining)} em falta. "
+                f"Considere definir uma nova data."
+            )))
+            continue
+        days_elapsed = max((snapshot.today - timezone.localtime(goal['created_at']).date()).days, 1)
+        daily_velocity = goal['current_amount'] / days_elapsed
+        needed_monthly = remaining / days_left * 30
+        if daily_velocity * days_left >= remaining:
+            insights.append(Insight(SEVERITY_INFO, (
+                f"Meta **{goal['title']}** no bom caminho: ao ritmo atual atinge {_money(goal['target_amount'])} "
+                f"até {goal['target_date']:%d/%m/%Y}."
+            )))
+        else:
+            insights.append(Insight(SEVERITY_WARNING, (
+                f"Meta **{goal['title']}** atrasada: precisa de guardar cerca de {_money(needed_monthly)} por mês "
+                f"para atingir {_money(goal['target_amount'])} até {goal['target_date']:%d/%m/%Y}."
+            )))
+    return insights
+
+
+RULES = (
+    Rule('budget_overruns', frozenset({'budget', 'savings'}), budget_overruns),
+    Rule('category_spikes', frozenset({'budget', 'savings'}), category_spikes),
+    Rule('debt_interest_ranking', frozenset({'debt'}), debt_interest_ranking),
+    Rule('goal_velocity', frozenset({'goals', 'savings'}), goal_velocity),
+)
+
+_RULES_BY_TOPIC = {
+    topic: tuple(rule for rule in RULES if topic in rule.topics)
+    for topic in TOPIC_ORDER
+}
+
+
+def evaluate(snapshot, topics):
+    """Avaliar (uma vez cada) as regras dos tópicos pedidos; insights mais graves primeiro"""
+    rules = {rule.name: rule for topic in topics for rule in _RULES_BY_TOPIC[topic]}
+    insights = [insight for rule in rules.values() for insight in rule.evaluate(snapshot)]
+    return sorted(insights, key=lambda insight: insight.severity)[:MAX_INSIGHTS]
+
+
+TIPS = {
+    'budget': """**Dicas de orçamento:**
+1. **Regra 50/30/20**: 50% da renda para necessidades essenciais, 30% para desejos e estilo de vida, 20% para poupança e investimentos.
+2. **Rastreamento de gastos**: registe todas as despesas na secção de Finanças Pessoais do app Zenda para identificar padrões.
+3. **Revisão mensal**: analise os gastos todos os meses e ajuste o orçamento.
+4. **Priorização**: cubra primeiro as necessidades essenciais.""",
+
+    'savings': """**Dicas de poupança:**
+1. **Pague-se primeiro**: transfira 10-20% da renda para a poupança assim que receber o salário.
+2. **Fundo de emergência**: tenha 3-6 meses de despesas essenciais guardados em AOA, em conta de fácil acesso.
+3. **Metas específicas**: use a secção de Metas do app Zenda com valores e prazos claros.
+4. **Consistência**: mesmo 5.000-10.000 AOA/mês fazem diferença ao longo do tempo.""",
+
+    'debt': """**Dicas para dívidas:**
+1. **Método avalanche**: pague o mínimo em todas e o máximo na de juros mais altos (economiza mais).
+2. **Método bola de neve**: quite primeiro a menor dívida para ganhar motivação.
+3. **Negociação**: peça aos credores redução de taxas, mais prazo ou um plano de pagamento.
+4. **Evite novas dívidas** enquanto paga as existentes.
+
+Se a situação estiver fora de controle, considere consultar um profissional financeiro.""",
+
+    'goals': """**Dicas para metas:**
+1. Defina metas específicas, com valor e data alvo realistas.
+2. Divida o valor em contribuições mensais e automatize-as.
+3. Acompanhe o progresso na secção de Metas do app Zenda e ajuste quando necessário.""",
+}
+
+DEFAULT_REPLY = """Olá! Sou o AI Financial Copilot. Estou aqui para ajudá-lo com suas finanças.
+
+Posso ajudá-lo com:
+- Planejamento de orçamento
+- Estratégias de poupança
+- Gestão de dívidas
+- Definição de metas financeiras
+- Educação financeira
+
+Como posso ajudá-lo hoje?"""
+
+
+def compose_reply(topics, insights=None):
+    """Texto da resposta: insights personalizados (se houver) seguidos das dicas dos tópicos"""
+    sections = []
+    if insights:
+        sections.append('**A sua situação:**\n' + '\n'.join(f"- {insight.text}" for insight in insights))
+    sections.extend(TIPS[topic] for topic in topics)
+    return '\n\n'.join(sections)
+
+
+def answer(user, message, today=None):
+    """
+    Resposta personalizada para perguntas sobre os dados do usuário nos tópicos
+    conhecidos, ou None (a mensagem deve então seguir para a OpenAI).
+    """
+    topics = detect_topics(message)
+    if not topics or not is_own_data_question(message):
+        return None
+    snapshot = FinanceSnapshot.load(user, today=today)
+    return compose_reply(topics, evaluate(snapshot, topics))
+
+
+def fallback_reply(message, user=None):
+    """Resposta quando a OpenAI não está disponível (personalizada se houver usuário)"""
+    reply = answer(user, message) if user is not None else None
+    if reply is None:
+        topics = detect_topics(message)
+        reply = compose_reply(topics) if topics else DEFAULT_REPLY
+    return reply
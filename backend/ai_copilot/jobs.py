@@ -0,0 +1,157 @@
+"""
+Fila de jobs de geração do AI Copilot (base de dados, sem broker externo).
+
+O endpoint de chat cria um GenerationJob e devolve o id; o comando
+`run_copilot_worker` reclama jobs da fila, chama a OpenAI e grava a resposta.
+Erros temporários são repetidos com backoff exponencial.
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .generation import GenerationResult, TransientGenerationError, generate_reply, get_fallback_response
+from .metering import record_usage
+from .models import GenerationJob, Message
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_generation(conversation, user_message):
+    """Criar um job de geração para a mensagem do usuário"""
+    return GenerationJob.objects.create(
+        conversation=conversation,
+        user_message=user_message,
+        max_attempts=_setting('AI_COPILOT_JOB_MAX_ATTEMPTS', 3),
+    )
+
+
+def retry_delay(attempts):
+    """Backoff exponencial com jitter (em segundos) após `attempts` tentativas"""
+    base = _setting('AI_COPILOT_JOB_RETRY_BASE_SECONDS', 5)
+    cap = _setting('AI_COPILOT_JOB_RETRY_MAX_SECONDS', 300)
+    delay = min(base * (2 ** max(attempts - 1, 0)), cap)
+    return delay + random.uniform(0, delay / 2)
+
+
+def requeue_stale_jobs(now=None):
+    """Devolver à fila jobs 'running' cujo worker morreu (lock expirado)"""
+    now = now or timezone.now()
+    timeout = _setting('AI_COPILOT_JOB_LOCK_TIMEOUT_SECONDS', 300)
+    return GenerationJob.objects.filter(
+        status='running',
+        locked_at__lt=now - timedelta(seconds=timeout),
+    ).update(status='queued', locked_by='', locked_at=None, run_after=now)
+
+
+def claim_jobs(worker_id, limit=1, now=None):
+    """
+    Reclamar até `limit` jobs prontos. O UPDATE condicional (status='queued')
+    garante que dois workers nunca processam o mesmo job, em SQLite ou PostgreSQL.
+    """
+    now = now or timezone.now()
+    candidate_ids = list(
+        GenerationJob.objects.filter(status='queued', run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:limit * 2]
+    )
+    claimed = []
+    for job_id in candidate_ids:
+        updated = GenerationJob.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if updated:
+            claimed.append(job_id)
+            if len(claimed) >= limit:
+                break
+    return list(
+        GenerationJob.objects.filter(id__in=claimed)
+        .select_related('conversation__user', 'user_message')
+        .order_by('run_after', 'id')
+    )
+
+
+def _finish(job, result, status, error=''):
+    with transaction.atomic():
+        assistant_msg = Message.objects.create(
+            conversation=job.conversation,
+            role='assistant',
+            content=result.content,
+            prompt_tokens=result.prompt_tokens,
+            completion_tokens=result.completion_tokens,
+            latency_ms=result.latency_ms,
+            model=result.model,
+        )
+        job.assistant_message = assistant_msg
+        job.status = status
+        job.last_error = error
+        job.locked_by = ''
+        job.locked_at = None
+        job.finished_at = timezone.now()
+        job.save(update_fields=[
+            'assistant_message', 'status', 'last_error', 'locked_by', 'locked_at', 'finished_at', 'updated_at'
+        ])
+        record_usage(job.conversation.user, result)
+    return job
+
+
+def run_job(job, retry=True):
+    """
+    Processar um job já reclamado. Erros temporários voltam a pôr o job na fila
+    com backoff; esgotadas as tentativas (ou com retry=False), grava a resposta
+    fallback e marca o job como falhado.
+    """
+    try:
+        result = generate_reply(job.conversation, job.user_message, raise_transient=True)
+    except TransientGenerationError as e:
+        if retry and job.attempts < job.max_attempts:
+            delay = retry_delay(job.attempts)
+            job.status = 'queued'
+            job.last_error = str(e)
+            job.locked_by = ''
+            job.locked_at = None
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+            job.save(update_fields=['status', 'last_error', 'locked_by', 'locked_at', 'run_after', 'updated_at'])
+            logger.warning(f"Generation job {job.id} failed (attempt {job.attempts}), retrying in {delay:.0f}s: {e}")
+            return job
+        logger.error(f"Generation job {job.id} gave up after {job.attempts} attempt(s): {e}")
+        fallback = get_fallback_response(
+            job.user_message.content, include_error_note=True, user=job.conversation.user
+        )
+        return _finish(job, GenerationResult(fallback), 'failed', error=str(e))
+    except Exception as e:
+        logger.error(f"Generation job {job.id} crashed: {e}", exc_info=True)
+        error_message = "Desculpe, ocorreu um erro ao processar sua mensagem. Por favor, tente novamente."
+        if settings.DEBUG:
+            error_message += f" Erro: {str(e)}"
+        return _finish(job, GenerationResult(error_message), 'failed', error=str(e))
+
+    return _finish(job, result, 'succeeded')
+
+
+def run_job_inline(job):
+    """
+    Processar um job no próprio pedido (clientes que pedem `wait`), sem repetições.
+    Se um worker já o reclamou, devolve o job no estado atual.
+    """
+    updated = GenerationJob.objects.filter(id=job.id, status='queued').update(
+        status='running',
+        locked_by='inline',
+        locked_at=timezone.now(),
+        attempts=F('attempts') + 1,
+    )
+    job.refresh_from_db()
+    if not updated:
+        return job
+    return run_job(job, retry=False)
@@ -0,0 +1,62 @@
+"""
+Worker da fila de geração do AI Copilot.
+Executar como processo de longa duração (pode haver vários em paralelo):
+    python manage.py run_copilot_worker
+"""
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ai_copilot.jobs import claim_jobs, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Processa os jobs de geração do AI Copilot (fila na base de dados)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Processar os jobs prontos e sair (útil para cron/testes)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5,
+            help='Número de jobs reclamados de cada vez',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Segundos de espera quando a fila está vazia',
+        )
+
+    def handle(self, *args, **options):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        batch_size = max(options['batch_size'], 1)
+        processed = 0
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker_id} iniciado.'))
+        try:
+            while True:
+                close_old_connections()
+                requeue_stale_jobs()
+                jobs = claim_jobs(worker_id, limit=batch_size)
+
+                for job in jobs:
+                    job = run_job(job)
+                    processed += 1
+                    self.stdout.write(f'  Job {job.id}: {job.status} (tentativa {job.attempts})')
+
+                if options['once'] and not jobs:
+                    break
+                if not jobs:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Worker interrompido.')
+
+        self.stdout.write(self.style.SUCCESS(f'Total de {processed} job(s) processado(s).'))
@@ -0,0 +1,113 @@
+"""
+Medição de uso e limites do AI Copilot.
+
+- Cada resposta gerada grava tokens/latência na Message e soma ao agregado diário (CopilotUsage)
+- Limite de pedidos por usuário numa janela deslizante (contadores atómicos na cache, sem query)
+- Quota diária de tokens, maior para subscritores ativos do app (MobileAppSubscription)
+"""
+import math
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CopilotUsage
+
+
+class UsageLimitExceeded(Exception):
+    """Pedido recusado por limite de uso (rate limit ou quota diária)"""
+
+    def __init__(self, message, code, retry_after):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        # Arredondar para cima: voltar antes do instante calculado seria recusado outra vez
+        self.retry_after = max(math.ceil(retry_after), 1)
+
+
+def _rate_limit_key(user):
+    return f'ai_copilot:requests:{user.pk}'
+
+
+def record_usage(user, result):
+    """Somar um pedido (e os tokens/latência do resultado) ao uso diário do usuário"""
+    usage, _ = CopilotUsage.objects.get_or_create(user=user, date=timezone.localdate())
+    CopilotUsage.objects.filter(pk=usage.pk).update(
+        requests=F('requests') + 1,
+        prompt_tokens=F('prompt_tokens') + result.prompt_tokens,
+        completion_tokens=F('completion_tokens') + result.completion_tokens,
+        total_latency_ms=F('total_latency_ms') + result.latency_ms,
+        updated_at=timezone.now(),
+    )
+
+
+def daily_token_quota(user):
+    """Quota diária de tokens: maior para quem tem subscrição paga ativa do app"""
+    quota = getattr(settings, 'AI_COPILOT_DAILY_TOKEN_QUOTA', 20000)
+    try:
+        from subscriptions.models import MobileAppSubscription
+        subscription = MobileAppSubscription.objects.filter(user=user).first()
+    except ImportError:
+        subscription = None
+    if subscription and subscription.status == 'active' and subscription.has_access:
+        quota = getattr(settings, 'AI_COPILOT_DAILY_TOKEN_QUOTA_SUBSCRIBER', 100000)
+    return quota
+
+
+def tokens_used_today(user):
+    usage = CopilotUsage.objects.filter(user=user, date=timezone.localdate()).first()
+    return usage.total_tokens if usage else 0
+
+
+def _seconds_until_midnight():
+    now = timezone.localtime()
+    midnight = timezone.make_aware(datetime.combine(now.date() + timedelta(days=1), dt_time.min))
+    return (midnight - now).total_seconds()
+
+
+def check_rate_limit(user, now=None):
+    """
+    Janela deslizante aproximada: no máximo AI_COPILOT_RATE_LIMIT_REQUESTS pedidos nos
+    últimos AI_COPILOT_RATE_LIMIT_WINDOW_SECONDS segundos. Dois contadores por janela fixa
+    (atual e anterior, este ponderado pela parte da janela ainda coberta), somados com
+    cache.incr, que é atómico: pedidos concorrentes nunca ultrapassam o limite.
+    Regista o pedido quando aceite.
+    """
+    limit = getattr(settings, 'AI_COPILOT_RATE_LIMIT_REQUESTS', 10)
+    window = getattr(settings, 'AI_COPILOT_RATE_LIMIT_WINDOW_SECONDS', 60)
+    now = now if now is not None else time.time()
+    bucket = int(now // window)
+    elapsed = now - bucket * window
+    key = f'{_rate_limit_key(user)}:{bucket}'
+
+    cache.add(key, 0, timeout=window * 2)
+    count = cache.incr(key)
+    previous = cache.get(f'{_rate_limit_key(user)}:{bucket - 1}', 0)
+    weight = 1 - elapsed / window
+    if count + previous * weight > limit:
+        cache.decr(key)
+        # Até a janela anterior pesar o suficiente menos (ou até à próxima janela): o pedido
+        # repetido volta a contar `count`, por isso o peso tem de descer a (limit - count) / previous
+        if previous and count <= limit:
+            retry_after = window * (count + previous - limit) / previous - elapsed
+        else:
+            retry_after = window - elapsed
+        raise UsageLimitExceeded(
+            'Muitas mensagens em pouco tempo. Aguarde um momento e tente novamente.',
+            code='rate_limited',
+            retry_after=retry_after,
+        )
+
+
+def check_usage_limits(user):
+    """Verificar quota diária de tokens e rate limit antes de aceitar um pedido de chat"""
+    if tokens_used_today(user) >= daily_token_quota(user):
+        raise UsageLimitExceeded(
+            'Atingiu o limite diário de utilização do AI Copilot. Tente novamente amanhã.',
+            code='daily_quota_exceeded',
+            retry_after=_seconds_until_midnight(),
+        )
+    check_rate_limit(user)
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_copilot', '0002_generationjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='completion_tokens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='latency_ms',
+            field=models.PositiveIntegerField(default=0, help_text='Latência da chamada à OpenAI (ms)'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='model',
+            field=models.CharField(blank=True, help_text='Modelo OpenAI usado (vazio = resposta fallback)', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='prompt_tokens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CopilotUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('total_latency_ms', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_copilot_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Uso do Copilot',
+                'verbose_name_plural': 'Uso do Copilot',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='ai_copilot__date_84fe7a_idx')],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_copilot', '0003_copilot_usage_metering'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='ai_copilot__user_id_f4e30e_idx'),
+        ),
+    ]
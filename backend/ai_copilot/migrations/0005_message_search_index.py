@@ -0,0 +1,59 @@
+"""
+Índice full-text das mensagens (ver ai_copilot/search.py).
+
+- SQLite: tabela FTS5 com rowid = Message.id, preenchida com as mensagens existentes
+  e mantida por triggers em INSERT/UPDATE/DELETE de ai_copilot_message
+- PostgreSQL: índice GIN de expressão, atualizado pela própria base de dados
+"""
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS ai_copilot_message_fts USING fts5("
+    "content, content='ai_copilot_message', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO ai_copilot_message_fts(ai_copilot_message_fts) VALUES ('rebuild')",
+    "CREATE TRIGGER IF NOT EXISTS ai_copilot_message_fts_ai AFTER INSERT ON ai_copilot_message BEGIN "
+    "INSERT INTO ai_copilot_message_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS ai_copilot_message_fts_ad AFTER DELETE ON ai_copilot_message BEGIN "
+    "INSERT INTO ai_copilot_message_fts(ai_copilot_message_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS ai_copilot_message_fts_au AFTER UPDATE OF content ON ai_copilot_message BEGIN "
+    "INSERT INTO ai_copilot_message_fts(ai_copilot_message_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO ai_copilot_message_fts(rowid, content) VALUES (new.id, new.content); END",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS ai_copilot_message_fts_au",
+    "DROP TRIGGER IF EXISTS ai_copilot_message_fts_ad",
+    "DROP TRIGGER IF EXISTS ai_copilot_message_fts_ai",
+    "DROP TABLE IF EXISTS ai_copilot_message_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX IF NOT EXISTS ai_copilot_message_content_fts ON ai_copilot_message "
+    "USING GIN (to_tsvector('portuguese'::regconfig, content))",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS ai_copilot_message_content_fts",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_copilot', '0004_conversation_user_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
@@ -1,10 +1,35 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Substr
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
 User = get_user_model()
 
 
+PREVIEW_LENGTH = 100
+
+
+class ConversationQuerySet(models.QuerySet):
+    def with_summary(self):
+        """
+        Anotar message_count e o início da última mensagem numa única query
+        (evita uma query por conversa ao listar o histórico).
+        """
+        last_message = Message.objects.filter(
+            conversation=OuterRef('pk')
+        ).order_by('-created_at', '-id')
+        return self.annotate(
+            message_count=Count('messages'),
+            # Um carácter a mais que a pré-visualização para saber se foi truncada
+            last_message_snippet=Subquery(
+                last_message.annotate(
+                    snippet=Substr('content', 1, PREVIEW_LENGTH + 1)
+                ).values('snippet')[:1]
+            ),
+        )
+
+
 class Conversation(models.Model):
     """Conversa com o AI Financial Copilot"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_conversations')
@@ -12,10 +37,15 @@ class Conversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ConversationQuerySet.as_manager()
+
     class Meta:
         ordering = ['-updated_at']
         verbose_name = 'Conversa'
         verbose_name_plural = 'Conversas'
+        indexes = [
+            models.Index(fields=['user', '-updated_at', '-id']),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.title or 'Conversa sem título'}"
@@ -32,6 +62,11 @@ class Message(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
     content = models.TextField()
+    # Métricas de uso da OpenAI (apenas mensagens do assistente)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    latency_ms = models.PositiveIntegerField(default=0, help_text="Latência da chamada à OpenAI (ms)")
+    model = models.CharField(max_length=100, blank=True, help_text="Modelo OpenAI usado (vazio = resposta fallback)")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -41,3 +76,75 @@ class Message(models.Model):
 
     def __str__(self):
         return f"{self.role} - {self.content[:50]}..."
+
+
+class CopilotUsage(models.Model):
+    """Uso diário agregado do AI Copilot por usuário (pedidos, tokens e latência)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_copilot_usage')
+    date = models.DateField()
+    requests = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    total_latency_ms = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Uso do Copilot'
+        verbose_name_plural = 'Uso do Copilot'
+        unique_together = ['user', 'date']
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.date} - {self.total_tokens} tokens"
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+
+class GenerationJob(models.Model):
+    """Job de geração de resposta do AI (fila na base de dados, processada pelo worker)"""
+    STATUS_CHOICES = [
+        ('queued', 'Na fila'),
+        ('running', 'Em processamento'),
+        ('succeeded', 'Concluído'),
+        ('failed', 'Falhou'),
+    ]
+
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='generation_jobs')
+    user_message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='generation_jobs')
+    assistant_message = models.ForeignKey(
+        Message,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Não processar antes desta data (backoff)")
+    locked_by = models.CharField(max_length=100, blank=True, help_text="Worker que está a processar o job")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Job de Geração'
+        verbose_name_plural = 'Jobs de Geração'
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} - {self.get_status_display()}"
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
@@ -0,0 +1,160 @@
+"""
+Pesquisa full-text nas mensagens do AI Copilot.
+
+O índice invertido é mantido pela própria base de dados a cada gravação de Message
+(migração 0005_message_search_index):
+- SQLite: tabela virtual FTS5 `ai_copilot_message_fts` atualizada por triggers
+- PostgreSQL: índice GIN sobre to_tsvector('portuguese', content)
+
+get_search_backend() escolhe a implementação conforme a base de dados em uso; nas
+outras bases de dados, MessageSearchBackend pesquisa com icontains (sem índice).
+
+Os excertos vêm da base de dados com marcadores de uso privado à volta dos termos
+encontrados; highlight() escapa o conteúdo (HTML) e só depois troca os marcadores
+por <mark>…</mark>, para o texto das mensagens nunca ser interpretado como markup.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+
+from .models import Message
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+# Marcadores internos (Unicode de uso privado) trocados por HIGHLIGHT_* depois de escapar
+MARK_START = '\ue000'
+MARK_END = '\ue001'
+SNIPPET_WORDS = 12
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def highlight(snippet):
+    """Excerto com marcadores internos -> HTML seguro com <mark>…</mark>"""
+    return escape(snippet).replace(MARK_START, HIGHLIGHT_START).replace(MARK_END, HIGHLIGHT_END)
+
+
+def _strip_marks(text):
+    return text.replace(MARK_START, '').replace(MARK_END, '')
+
+
+def make_snippet(content, terms, words=SNIPPET_WORDS):
+    """Excerto de `words` palavras à volta do primeiro termo encontrado, com os termos marcados"""
+    content = _strip_marks(content)
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    tokens = content.split()
+    first = next((i for i, token in enumerate(tokens) if pattern.search(token)), 0)
+    start = max(0, min(first - words // 2, len(tokens) - words))
+    excerpt = ' '.join(tokens[start:start + words])
+    excerpt = pattern.sub(lambda match: f'{MARK_START}{match.group(0)}{MARK_END}', excerpt)
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + words < len(tokens) else ''
+    return f'{prefix}{excerpt}{suffix}'
+
+
+class MessageSearchBackend:
+    """
+    Interface comum: search() devolve [(message_id, rank, snippet)] do melhor para o pior.
+    A implementação base (bases de dados sem índice full-text) exige todos os termos
+    com icontains e ordena das mais recentes para as mais antigas.
+    """
+
+    def search(self, user, query, limit=20):
+        terms = _TERM_RE.findall(query)
+        if not terms:
+            return []
+        match = Q()
+        for term in terms:
+            match &= Q(content__icontains=term)
+        rows = (
+            Message.objects.filter(conversation__user=user).filter(match)
+            .order_by('-created_at', '-id')
+            .values_list('id', 'content')[:limit]
+        )
+        return [(message_id, 1.0, make_snippet(content, terms)) for message_id, content in rows]
+
+
+class SQLiteFTS5SearchBackend(MessageSearchBackend):
+    table = 'ai_copilot_message_fts'
+
+    @staticmethod
+    def build_match_query(query):
+        """Cada termo entre aspas (sem operadores FTS5 vindos do usuário); o último termo faz prefixo"""
+        terms = _TERM_RE.findall(query)
+        if not terms:
+            return None
+        quoted = ['"%s"' % term.replace('"', '""') for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def search(self, user, query, limit=20):
+        match = self.build_match_query(query)
+        if not match:
+            return []
+        sql = f"""
+            SELECT f.rowid,
+                   bm25({self.table}) AS rank,
+                   snippet({self.table}, 0, %s, %s, '…', %s)
+            FROM {self.table} f
+            JOIN ai_copilot_message m ON m.id = f.rowid
+            JOIN ai_copilot_conversation c ON c.id = m.conversation_id
+            WHERE {self.table} MATCH %s AND c.user_id = %s
+            ORDER BY rank
+            LIMIT %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [MARK_START, MARK_END, SNIPPET_WORDS, match, user.pk, limit])
+            # bm25 é negativo (menor = melhor); expor como pontuação positiva
+            return [(row[0], -row[1], row[2]) for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(MessageSearchBackend):
+    config = 'portuguese'
+
+    def search(self, user, query, limit=20):
+        if not _TERM_RE.search(query):
+            return []
+        # A expressão to_tsvector(...) tem de coincidir com a do índice GIN para ser usada
+        sql = """
+            SELECT m.id,
+                   ts_rank(to_tsvector(%(config)s::regconfig, m.content), q) AS rank,
+                   ts_headline(%(config)s::regconfig, m.content, q, %(headline)s)
+            FROM ai_copilot_message m
+            JOIN ai_copilot_conversation c ON c.id = m.conversation_id,
+                 websearch_to_tsquery(%(config)s::regconfig, %(query)s) q
+            WHERE c.user_id = %(user_id)s
+              AND to_tsvector(%(config)s::regconfig, m.content) @@ q
+            ORDER BY rank DESC, m.id DESC
+            LIMIT %(limit)s
+        """
+        headline = f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords={SNIPPET_WORDS * 2}, MinWords={SNIPPET_WORDS // 2}'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {
+                'config': self.config,
+                'headline': headline,
+                'query': query,
+                'user_id': user.pk,
+                'limit': limit,
+            })
+            return [(row[0], float(row[1]), row[2]) for row in cursor.fetchall()]
+
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTS5SearchBackend()
+    return MessageSearchBackend()
+
+
+def search_messages(user, query, limit=20):
+    """Pesquisar nas mensagens do usuário; devolve resultados ordenados por relevância"""
+    hits = get_search_backend().search(user, query, limit=limit)
+    messages = Message.objects.select_related('conversation').in_bulk([hit[0] for hit in hits])
+    return [
+        {'message': messages[message_id], 'rank': rank, 'snippet': highlight(snippet)}
+        for message_id, rank, snippet in hits
+        if message_id in messages
+    ]
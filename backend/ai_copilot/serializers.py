@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Conversation, Message
+from django.conf import settings
+from .models import Conversation, Message, GenerationJob, PREVIEW_LENGTH
 
 
 class MessageSerializer(serializers.ModelSerializer):
@@ -9,6 +10,15 @@ class MessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class MessageSearchResultSerializer(serializers.Serializer):
+    """Resultado de pesquisa: mensagem, conversa, relevância e excerto com <mark>…</mark>"""
+    message = MessageSerializer()
+    conversation_id = serializers.IntegerField(source='message.conversation_id')
+    conversation_title = serializers.CharField(source='message.conversation.title')
+    rank = serializers.FloatField()
+    snippet = serializers.CharField()
+
+
 class ConversationSerializer(serializers.ModelSerializer):
     messages = MessageSerializer(many=True, read_only=True)
     message_count = serializers.SerializerMethodField()
@@ -19,12 +29,17 @@ class ConversationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
     def get_message_count(self, obj):
+        if hasattr(obj, 'message_count'):
+            return obj.message_count
         return obj.messages.count()
 
 
 class ConversationListSerializer(serializers.ModelSerializer):
-    """Serializer simplificado para listagem"""
-    message_count = serializers.SerializerMethodField()
+    """
+    Serializer simplificado para listagem.
+    Espera um queryset com Conversation.objects.with_summary() (message_count e last_message_snippet anotados).
+    """
+    message_count = serializers.IntegerField(read_only=True)
     last_message_preview = serializers.SerializerMethodField()
 
     class Meta:
@@ -32,17 +47,38 @@ class ConversationListSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'created_at', 'updated_at', 'message_count', 'last_message_preview']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
-    def get_message_count(self, obj):
-        return obj.messages.count()
-
     def get_last_message_preview(self, obj):
-        last_message = obj.messages.last()
-        if last_message:
-            return last_message.content[:100] + '...' if len(last_message.content) > 100 else last_message.content
-        return None
+        snippet = obj.last_message_snippet
+        if snippet is None:
+            return None
+        return snippet[:PREVIEW_LENGTH] + '...' if len(snippet) > PREVIEW_LENGTH else snippet
 
 
 class ChatRequestSerializer(serializers.Serializer):
     """Serializer para requisição de chat"""
     message = serializers.CharField(required=True, allow_blank=False)
     conversation_id = serializers.IntegerField(required=False, allow_null=True)
+    wait = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Processar no próprio pedido e devolver a resposta (clientes antigos)"
+    )
+
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    """Estado de um job de geração (para polling pelo cliente)"""
+    conversation_id = serializers.IntegerField(read_only=True)
+    user_message = MessageSerializer(read_only=True)
+    assistant_message = MessageSerializer(read_only=True)
+    error = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GenerationJob
+        fields = [
+            'id', 'conversation_id', 'status', 'attempts', 'user_message', 'assistant_message',
+            'error', 'created_at', 'updated_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_error(self, obj):
+        return (obj.last_error or None) if settings.DEBUG else None
@@ -1,3 +1,322 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from subscriptions.models import MobileAppSubscription
+
+from . import insights
+from .generation import GenerationResult, TransientGenerationError, generate_reply
+from .jobs import claim_jobs, run_job
+from .models import Conversation, CopilotUsage, GenerationJob, Message
+from .search import MessageSearchBackend, highlight
+
+User = get_user_model()
+
+
+def create_app_user(**kwargs):
+    """Usuário com trial do app móvel (as APIs do copilot exigem HasAppAccess)"""
+    user = User.objects.create_user(**kwargs)
+    MobileAppSubscription.objects.create(user=user, status='trial')
+    return user
+
+
+@override_settings(OPENAI_API_KEY=None)
+class GenerationJobQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_app_user(email='ana@example.com', username='ana', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _chat(self, **data):
+        return self.client.post('/api/ai-copilot/conversations/chat/', {'message': 'Como fazer um orçamento?', **data}, format='json')
+
+    def test_chat_enqueues_job_and_returns_job_id(self):
+        response = self._chat()
+        self.assertEqual(response.status_code, 202)
+        job = GenerationJob.objects.get(id=response.data['job_id'])
+        self.assertEqual(job.status, 'queued')
+        self.assertIsNone(response.data['assistant_message'])
+        self.assertEqual(Message.objects.filter(role='assistant').count(), 0)
+
+    def test_worker_processes_job_and_poll_returns_reply(self):
+        job_id = self._chat().data['job_id']
+        jobs = claim_jobs('test-worker', limit=5)
+        self.assertEqual([job.id for job in jobs], [job_id])
+        run_job(jobs[0])
+
+        response = self.client.get(f'/api/ai-copilot/jobs/{job_id}/')
+        self.assertEqual(response.data['status'], 'succeeded')
+        self.assertIn('50/30/20', response.data['assistant_message']['content'])
+
+    def test_each_queued_job_answers_its_own_message(self):
+        first = self._chat(message='Primeira pergunta')
+        second = self._chat(message='Segunda pergunta', conversation_id=first.data['conversation_id'])
+
+        def echo(messages, raise_transient=False):
+            history = [message['content'] for message in messages[1:]]
+            return GenerationResult(f'{messages[-1]["content"]} | histórico: {len(history)}')
+
+        with mock.patch('ai_copilot.generation.call_openai', side_effect=echo):
+            for job in claim_jobs('worker', limit=5):
+                run_job(job)
+
+        replies = {
+            job_id: GenerationJob.objects.get(id=job_id).assistant_message.content
+            for job_id in (first.data['job_id'], second.data['job_id'])
+        }
+        self.assertEqual(replies[first.data['job_id']], 'Primeira pergunta | histórico: 1')
+        self.assertEqual(replies[second.data['job_id']], 'Segunda pergunta | histórico: 2')
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        self._chat()
+        self.assertEqual(len(claim_jobs('worker-a', limit=5)), 1)
+        self.assertEqual(claim_jobs('worker-b', limit=5), [])
+
+    def test_transient_error_requeues_with_backoff_then_fails(self):
+        job_id = self._chat().data['job_id']
+        with mock.patch('ai_copilot.jobs.generate_reply', side_effect=TransientGenerationError('timeout')):
+            job = run_job(claim_jobs('w', limit=1)[0])
+            self.assertEqual(job.status, 'queued')
+            self.assertGreater(job.run_after, timezone.now())
+
+            GenerationJob.objects.filter(id=job_id).update(run_after=timezone.now(), attempts=job.max_attempts - 1)
+            job = run_job(claim_jobs('w', limit=1)[0])
+
+        self.assertEqual(job.status, 'failed')
+        self.assertIsNotNone(job.assistant_message)
+
+    def test_wait_processes_inline_for_legacy_clients(self):
+        response = self._chat(wait=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['assistant_message']['role'], 'assistant')
+        self.assertEqual(GenerationJob.objects.get(id=response.data['job_id']).status, 'succeeded')
+
+    def test_poll_wait_is_clamped(self):
+        job_id = self._chat().data['job_id']
+        with mock.patch('ai_copilot.views.time.sleep') as sleep:
+            for wait in ('-5', 'nan', 'abc'):
+                self.assertEqual(self.client.get(f'/api/ai-copilot/jobs/{job_id}/', {'wait': wait}).status_code, 200)
+        sleep.assert_not_called()
+
+    def test_jobs_are_scoped_to_owner(self):
+        job_id = self._chat().data['job_id']
+        other = create_app_user(email='rui@example.com', username='rui', password='pass12345')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'/api/ai-copilot/jobs/{job_id}/').status_code, 404)
+        self.assertFalse(Conversation.objects.filter(user=other).exists())
+
+
+@override_settings(OPENAI_API_KEY=None, AI_COPILOT_RATE_LIMIT_REQUESTS=2, AI_COPILOT_DAILY_TOKEN_QUOTA=1000)
+class UsageMeteringTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_app_user(email='ana@example.com', username='ana', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _chat(self):
+        return self.client.post('/api/ai-copilot/conversations/chat/', {'message': 'Olá'}, format='json')
+
+    def test_sliding_window_rate_limit(self):
+        self.assertEqual(self._chat().status_code, 202)
+        self.assertEqual(self._chat().status_code, 202)
+        response = self._chat()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.data['code'], 'rate_limited')
+        self.assertIn('Retry-After', response)
+
+    def test_rate_limit_counts_only_accepted_requests_and_slides(self):
+        from .metering import check_rate_limit, UsageLimitExceeded
+
+        start = 1_000_000 * 60  # início de uma janela de 60s
+        check_rate_limit(self.user, now=start + 10)
+        check_rate_limit(self.user, now=start + 20)
+        for _ in range(3):
+            with self.assertRaises(UsageLimitExceeded):
+                check_rate_limit(self.user, now=start + 30)
+        # Metade da janela seguinte: a anterior (2 pedidos) ainda pesa 1 -> cabe mais um
+        check_rate_limit(self.user, now=start + 90)
+        with self.assertRaises(UsageLimitExceeded):
+            check_rate_limit(self.user, now=start + 90)
+        check_rate_limit(self.user, now=start + 125)
+
+    def test_retry_after_points_to_the_first_accepted_moment(self):
+        from .metering import check_rate_limit, UsageLimitExceeded
+
+        start = 1_000_000 * 60
+        check_rate_limit(self.user, now=start + 10)
+        check_rate_limit(self.user, now=start + 20)
+        # 10s na janela seguinte: 1 + 2 * 50/60 > 2; cabe quando a anterior pesar 1/2 (aos 30s)
+        with self.assertRaises(UsageLimitExceeded) as raised:
+            check_rate_limit(self.user, now=start + 70)
+        self.assertEqual(raised.exception.retry_after, 20)
+        with self.assertRaises(UsageLimitExceeded):
+            check_rate_limit(self.user, now=start + 70 + raised.exception.retry_after - 1)
+        check_rate_limit(self.user, now=start + 70 + raised.exception.retry_after)
+
+    def test_daily_token_quota(self):
+        CopilotUsage.objects.create(user=self.user, date=timezone.localdate(), prompt_tokens=900, completion_tokens=100)
+        response = self._chat()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.data['code'], 'daily_quota_exceeded')
+
+    def test_completed_job_records_usage(self):
+        self._chat()
+        run_job(claim_jobs('w', limit=1)[0])
+        usage = CopilotUsage.objects.get(user=self.user, date=timezone.localdate())
+        self.assertEqual(usage.requests, 1)
+
+    def test_admin_usage_requires_staff(self):
+        self.assertEqual(self.client.get('/api/ai-copilot/admin/usage/').status_code, 403)
+        CopilotUsage.objects.create(user=self.user, date=timezone.localdate(), requests=3, prompt_tokens=50, completion_tokens=25)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get('/api/ai-copilot/admin/usage/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totals']['requests'], 3)
+        self.assertEqual(response.data['users'][0]['total_tokens'], 75)
+        self.assertEqual(self.client.get('/api/ai-copilot/admin/usage/', {'limit': -1}).status_code, 200)
+
+
+@override_settings(SHARED_CACHE=True)
+class ConversationListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_app_user(email='ana@example.com', username='ana', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(25):
+            conversation = Conversation.objects.create(user=self.user, title=f'Conversa {i}')
+            Message.objects.create(conversation=conversation, role='user', content=f'Pergunta {i}')
+            Message.objects.create(conversation=conversation, role='assistant', content='x' * 150 + f' resposta {i}')
+
+    def test_list_uses_single_query_and_cursor_pagination(self):
+        # 1 query para a página (autenticação forçada; acesso ao app já em cache partilhada)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/ai-copilot/conversations/')
+        self.assertEqual(len(response.data['results']), 20)
+        first = response.data['results'][0]
+        self.assertEqual(first['title'], 'Conversa 24')
+        self.assertEqual(first['message_count'], 2)
+        self.assertEqual(first['last_message_preview'], 'x' * 100 + '...')
+        self.assertNotIn('count', response.data)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([c['title'] for c in response.data['results']], [f'Conversa {i}' for i in range(4, -1, -1)])
+
+
+class MessageSearchTests(TestCase):
+    def setUp(self):
+        self.user = create_app_user(email='ana@example.com', username='ana', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        conversation = Conversation.objects.create(user=self.user, title='Dívidas')
+        self.hit = Message.objects.create(conversation=conversation, role='user', content='Como pagar a dívida do cartão de crédito?')
+        Message.objects.create(conversation=conversation, role='assistant', content='Comece pelo orçamento mensal.')
+        other = create_app_user(email='rui@example.com', username='rui', password='pass12345')
+        other_conversation = Conversation.objects.create(user=other, title='Cartão')
+        Message.objects.create(conversation=other_conversation, role='user', content='Cartão de crédito em atraso')
+
+    def _search(self, q):
+        return self.client.get('/api/ai-copilot/conversations/search/', {'q': q})
+
+    def test_search_is_ranked_highlighted_and_scoped_to_user(self):
+        response = self._search('cartao credito')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([r['message']['id'] for r in results], [self.hit.id])
+        self.assertEqual(results[0]['conversation_title'], 'Dívidas')
+        self.assertIn('<mark>cartão</mark>', results[0]['snippet'])
+
+    def test_index_follows_message_updates_and_deletes(self):
+        self.hit.content = 'Quero investir em ações'
+        self.hit.save()
+        self.assertEqual(self._search('cartão').data['results'], [])
+        self.assertEqual(len(self._search('invest').data['results']), 1)
+        self.hit.conversation.delete()
+        self.assertEqual(self._search('invest').data['results'], [])
+
+    def test_query_too_short(self):
+        self.assertEqual(self._search('a').status_code, 400)
+
+    def test_snippet_escapes_message_markup(self):
+        Message.objects.create(
+            conversation=self.hit.conversation, role='user',
+            content='<script>alert(1)</script> poupança <b>mensal</b>',
+        )
+        snippet = self._search('poupança').data['results'][0]['snippet']
+        self.assertNotIn('<script>', snippet)
+        self.assertNotIn('<b>', snippet)
+        self.assertIn('&lt;script&gt;', snippet)
+        self.assertIn('<mark>poupança</mark>', snippet)
+
+    def test_generic_backend_without_full_text_index(self):
+        Message.objects.create(conversation=self.hit.conversation, role='user', content='<i>Cartão</i> bloqueado')
+        hits = MessageSearchBackend().search(self.user, 'cartão')
+        self.assertEqual(len(hits), 2)
+        self.assertEqual(highlight(hits[0][2]), '&lt;i&gt;<mark>Cartão</mark>&lt;/i&gt; bloqueado')
+
+
+class InsightsEngineTests(TestCase):
+    def setUp(self):
+        from finance.models import Budget, Category, Debt, Goal, PersonalExpense
+
+        self.today = timezone.localdate().replace(day=15)
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+        food = Category.objects.create(name='Alimentação')
+        transport = Category.objects.create(name='Transporte')
+        Budget.objects.create(user=self.user, category=food, amount=Decimal('30000'), month=self.today.month, year=self.today.year)
+        previous_month = (self.today.replace(day=1) - timedelta(days=1)).replace(day=10)
+        expenses = []
+        for i in range(40):
+            expenses.append(PersonalExpense(user=self.user, category=food, amount=Decimal('1000'), description='Mercado', date=self.today - timedelta(days=i % 10)))
+            expenses.append(PersonalExpense(user=self.user, category=transport, amount=Decimal('100'), description='Táxi', date=previous_month))
+        expenses.append(PersonalExpense(user=self.user, category=transport, amount=Decimal('20000'), description='Táxi', date=self.today))
+        PersonalExpense.objects.bulk_create(expenses)
+        Debt.objects.create(user=self.user, creditor='Banco A', total_amount=Decimal('100000'), interest_rate=Decimal('5'), due_date=self.today + timedelta(days=90))
+        Debt.objects.create(user=self.user, creditor='Cartão B', total_amount=Decimal('50000'), interest_rate=Decimal('24'), due_date=self.today + timedelta(days=90))
+        Goal.objects.create(user=self.user, title='Carro', target_amount=Decimal('1000000'), current_amount=Decimal('1000'), target_date=self.today + timedelta(days=60))
+
+    def test_detect_topics_ignores_accents(self):
+        self.assertEqual(insights.detect_topics('Como pago as DÍVIDAS e a meta?'), ['debt', 'goals'])
+        self.assertEqual(insights.detect_topics('Olá, tudo bem?'), [])
+
+    def test_keywords_match_whole_words_only(self):
+        for message in ('Quero a metade da conta', 'O metabolismo acelera?', 'Devo investir em ações?',
+                        'Fiz um cartão de visita'):
+            self.assertEqual(insights.detect_topics(message), [], message)
+        self.assertEqual(insights.detect_topics('Pago o cartão de crédito?'), ['debt'])
+
+    def test_only_own_data_questions_are_answered_locally(self):
+        self.assertIsNone(insights.answer(self.user, 'Qual é a meta de inflação do BNA?', today=self.today))
+        self.assertIsNone(insights.answer(self.user, 'Explique juros compostos', today=self.today))
+        self.assertIsNotNone(insights.answer(self.user, 'Como vão as minhas metas?', today=self.today))
+
+    def test_rules_use_user_data(self):
+        reply = insights.answer(self.user, 'Quero organizar o orçamento e as dívidas', today=self.today)
+        self.assertIn('Orçamento de **Alimentação** ultrapassado', reply)
+        self.assertIn('Gastos em **Transporte** subiram', reply)
+        self.assertLess(reply.index('Cartão B'), reply.index('Banco A'))
+        self.assertIn('50/30/20', reply)
+        self.assertIn('Meta **Carro** atrasada', insights.answer(self.user, 'E a minha meta?', today=self.today))
+
+    @override_settings(OPENAI_API_KEY='sk-test')
+    def test_common_question_answered_without_openai(self):
+        conversation = Conversation.objects.create(user=self.user, title='Orçamento')
+        Message.objects.create(conversation=conversation, role='user', content='Como está o meu orçamento?')
+        with mock.patch('ai_copilot.generation.call_openai') as call_openai:
+            result = generate_reply(conversation)
+        call_openai.assert_not_called()
+        self.assertEqual(result.model, insights.INSIGHTS_MODEL)
+        self.assertEqual(result.total_tokens, 0)
+
+    def test_answer_loads_snapshot_in_fixed_queries(self):
+        with self.assertNumQueries(4):
+            insights.answer(self.user, 'Como estão o meu orçamento, poupança, dívidas e metas?', today=self.today)
@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ConversationViewSet
+from .views import ConversationViewSet, GenerationJobViewSet, admin_usage
 
 router = DefaultRouter()
 router.register(r'conversations', ConversationViewSet, basename='conversation')
+router.register(r'jobs', GenerationJobViewSet, basename='generation-job')
 
 urlpatterns = [
+    path('admin/usage/', admin_usage, name='ai-copilot-admin-usage'),
     path('', include(router.urls)),
 ]
@@ -1,5 +1,9 @@
 """
 ASGI config for Rubiane Joaquim Educação Financeira project.
+
+Necessário para o stream de notificações em tempo real
+(/api/tasks/notifications/stream/, ver tasks/realtime.py), por exemplo:
+    uvicorn config.asgi:application --host 0.0.0.0 --port 8000
 """
 
 import os
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'tasks',
     'ai_copilot',
     'subscriptions',
+    'mailer',
 ]
 
 MIDDLEWARE = [
@@ -103,6 +104,22 @@ DATABASES = {
 }
 
 
+# Cache (per-process memory by default; set CACHE_BACKEND/CACHE_LOCATION to share it, e.g. Redis)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='rubiane-default'),
+    }
+}
+# Caches por usuário invalidadas em escritas (estatísticas de tarefas) só são usadas com uma
+# cache partilhada entre processos; com a cache em memória são calculadas a cada pedido
+SHARED_CACHE = config(
+    'SHARED_CACHE',
+    default=not CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache')),
+    cast=bool,
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -181,6 +198,12 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='Rubiane Joaquim <noreply@rubianejoaquim.com>')
 
+# Outbound email queue (processed by: python manage.py run_mail_worker)
+MAILER_MAX_ATTEMPTS = config('MAILER_MAX_ATTEMPTS', default=5, cast=int)
+MAILER_RETRY_BASE_SECONDS = config('MAILER_RETRY_BASE_SECONDS', default=30, cast=int)
+MAILER_RETRY_MAX_SECONDS = config('MAILER_RETRY_MAX_SECONDS', default=3600, cast=int)
+MAILER_LOCK_TIMEOUT_SECONDS = config('MAILER_LOCK_TIMEOUT_SECONDS', default=600, cast=int)
+
 # Frontend URL for email links (production: https://www.rubianejoaquim.com)
 FRONTEND_URL = config('FRONTEND_URL', default='https://www.rubianejoaquim.com')
 
@@ -190,7 +213,42 @@ FRONTEND_URL = config('FRONTEND_URL', default='https://www.rubianejoaquim.com')
 OPENAI_API_KEY = config('OPENAI_API_KEY', default=None)
 OPENAI_MODEL = config('OPENAI_MODEL', default='gpt-4o-mini')
 
+# AI Copilot generation queue (processed by: python manage.py run_copilot_worker)
+AI_COPILOT_JOB_MAX_ATTEMPTS = config('AI_COPILOT_JOB_MAX_ATTEMPTS', default=3, cast=int)
+AI_COPILOT_JOB_RETRY_BASE_SECONDS = config('AI_COPILOT_JOB_RETRY_BASE_SECONDS', default=5, cast=int)
+AI_COPILOT_JOB_RETRY_MAX_SECONDS = config('AI_COPILOT_JOB_RETRY_MAX_SECONDS', default=300, cast=int)
+AI_COPILOT_JOB_LOCK_TIMEOUT_SECONDS = config('AI_COPILOT_JOB_LOCK_TIMEOUT_SECONDS', default=300, cast=int)
+
+# AI Copilot usage limits (per user)
+AI_COPILOT_RATE_LIMIT_REQUESTS = config('AI_COPILOT_RATE_LIMIT_REQUESTS', default=10, cast=int)
+AI_COPILOT_RATE_LIMIT_WINDOW_SECONDS = config('AI_COPILOT_RATE_LIMIT_WINDOW_SECONDS', default=60, cast=int)
+AI_COPILOT_DAILY_TOKEN_QUOTA = config('AI_COPILOT_DAILY_TOKEN_QUOTA', default=20000, cast=int)
+AI_COPILOT_DAILY_TOKEN_QUOTA_SUBSCRIBER = config('AI_COPILOT_DAILY_TOKEN_QUOTA_SUBSCRIBER', default=100000, cast=int)
+
+# Answer common budget/savings/debt/goal questions with the local insights engine (no OpenAI call)
+AI_COPILOT_INSIGHTS_ENABLED = config('AI_COPILOT_INSIGHTS_ENABLED', default=True, cast=bool)
+
+# Per-user task/target stats snapshot (invalidated on every task/target write)
+TASK_STATS_CACHE_SECONDS = config('TASK_STATS_CACHE_SECONDS', default=300, cast=int)
+
+# Real-time notifications (SSE, tasks/realtime.py): database poll interval for multi-process deployments
+NOTIFICATION_STREAM_POLL_SECONDS = config('NOTIFICATION_STREAM_POLL_SECONDS', default=5, cast=int)
+NOTIFICATION_STREAM_KEEPALIVE_SECONDS = config('NOTIFICATION_STREAM_KEEPALIVE_SECONDS', default=15, cast=int)
+# Validity of the single-use stream tickets (POST notifications/stream_ticket/)
+NOTIFICATION_STREAM_TICKET_SECONDS = config('NOTIFICATION_STREAM_TICKET_SECONDS', default=60, cast=int)
+
+# Read notifications older than this are moved to NotificationArchive (python manage.py archive_notifications)
+NOTIFICATION_RETENTION_DAYS = config('NOTIFICATION_RETENTION_DAYS', default=90, cast=int)
+
+# Bulk user import via the admin API, hashed inside the web request (larger cohorts: python manage.py import_users)
+USER_IMPORT_MAX_ROWS = config('USER_IMPORT_MAX_ROWS', default=50, cast=int)
+
+# Hour (TIME_ZONE) of the weekly goal reminders sent by run_reminder_daemon
+GOAL_REMINDER_HOUR = config('GOAL_REMINDER_HOUR', default=9, cast=int)
+
 # Mobile App (Zenda) subscription payment
+# Per-user app access cache (subscriptions/access.py, HasAppAccess); use a shared CACHE_BACKEND with several processes
+SUBSCRIPTION_ACCESS_CACHE_SECONDS = config('SUBSCRIPTION_ACCESS_CACHE_SECONDS', default=300, cast=int)
 SUBSCRIPTION_MONTHLY_PRICE_KZ = config('SUBSCRIPTION_MONTHLY_PRICE_KZ', default=10000, cast=int)
 SUBSCRIPTION_IBAN = config('SUBSCRIPTION_IBAN', default='0040 0000 4047.9796.1015.9')
 SUBSCRIPTION_PAYEE_NAME = config('SUBSCRIPTION_PAYEE_NAME', default='Rubiane Patricia Fernando Joaquim')
@@ -1,3 +1,5 @@
+import logging
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -5,7 +7,12 @@ from rest_framework.response import Response
 from django.db.models import Count, Q
 from django.utils import timezone
 from django.utils.text import slugify
-from .utils import send_enrollment_approval_email
+from django.db import transaction
+from django.conf import settings
+from . import leaderboard
+from .bulk import BULK_IDS_ERROR, parse_bulk_ids
+from .referrals import award_referral_points_bulk
+from .utils import send_enrollment_approval_email, send_enrollment_approval_emails
 from .models import (
     Course, Lesson, Enrollment, PaymentProof, Progress, LessonAttachment,
     Question, Choice, LessonQuiz, LessonQuizQuestion, FinalExam, FinalExamQuestion,
@@ -20,9 +27,11 @@ from .serializers import (
     UserQuizAnswerSerializer, UserExamAnswerSerializer,
     QuizResultSerializer, ExamResultSerializer,
     ReferralShareSerializer, ReferralPointsSerializer, UserPointsSerializer,
-    AdminUserPointsSerializer,
+    AdminUserPointsSerializer, ReferralLeaderboardSerializer,
 )
+from accounts.importing import import_users, read_csv as read_users_csv, resolve_courses
 from accounts.models import User
+from subscriptions.access import invalidate_access
 from accounts.serializers import UserSerializer
 
 # Try to import mentorship models if available
@@ -241,6 +250,42 @@ class AdminLessonAttachmentViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
+logger = logging.getLogger(__name__)
+
+
+def bulk_approve_payment_proofs(ids, reviewer):
+    """
+    Aprovar os comprovantes pendentes de `ids` e ativar as inscrições com UPDATEs em
+    conjunto, atribuir os pontos de referência e pôr os emails na fila, tudo numa
+    transação. Devolve os IDs aprovados.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pending = dict(
+            PaymentProof.objects.select_for_update()
+            .filter(id__in=ids, status='pending')
+            .values_list('id', 'enrollment_id')
+        )
+        if not pending:
+            return []
+        PaymentProof.objects.filter(id__in=pending).update(
+            status='approved', reviewed_by=reviewer, reviewed_at=now
+        )
+        Enrollment.objects.filter(id__in=pending.values()).update(status='active', activated_at=now)
+        enrollments = list(
+            Enrollment.objects.filter(id__in=pending.values()).select_related('user', 'user__referred_by', 'course')
+        )
+        invalidate_access({enrollment.user_id for enrollment in enrollments})
+        try:
+            award_referral_points_bulk(enrollments)
+        except Exception as e:
+            # Não falhar a aprovação se a atribuição de pontos falhar (savepoint desfeito)
+            logger.error(f'Error awarding referral points: {e}')
+        # Na mesma transação: os emails só existem se a aprovação for gravada
+        send_enrollment_approval_emails(enrollments)
+    return sorted(pending)
+
+
 class AdminEnrollmentViewSet(viewsets.ReadOnlyModelViewSet):
     """Visualização e gerenciamento de matrículas para admin"""
     queryset = Enrollment.objects.all()
@@ -392,6 +437,25 @@ class AdminPaymentProofViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(proof)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'], url_path='bulk-approve')
+    def bulk_approve(self, request):
+        """Aprovar vários comprovantes pendentes numa só transação. Body: ids (lista)"""
+        check = self.check_admin()
+        if check:
+            return check
+        
+        ids = parse_bulk_ids(request.data.get('ids'))
+        if ids is None:
+            return Response(
+                {'error': BULK_IDS_ERROR},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        approved = bulk_approve_payment_proofs(ids, request.user)
+        return Response({
+            'approved': approved,
+            'skipped': sorted(set(ids) - set(approved)),
+        })
+    
     @action(detail=True, methods=['post'], url_path='reject')
     def reject(self, request, pk=None):
         """Rejeitar comprovante de pagamento"""
@@ -449,6 +513,44 @@ class AdminUserViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(user)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_users(self, request):
+        """
+        Importar uma turma de um CSV (multipart: file, course=<id|slug> repetível,
+        trial=true|false). As palavras-passe são processadas neste processo (sem pool de
+        processos no worker web); turmas maiores que USER_IMPORT_MAX_ROWS: comando import_users.
+        """
+        check = self.check_admin()
+        if check:
+            return check
+
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'Ficheiro CSV é obrigatório.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows, errors = read_users_csv(upload.read())
+        except UnicodeDecodeError:
+            return Response({'error': 'O ficheiro deve estar em UTF-8.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_rows = getattr(settings, 'USER_IMPORT_MAX_ROWS', 50)
+        if len(rows) > max_rows:
+            return Response(
+                {'error': f'Máximo de {max_rows} usuários por pedido. Use o comando import_users para turmas maiores.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        courses, missing = resolve_courses(request.data.getlist('course'))
+        if missing:
+            return Response({'error': f'Curso(s) não encontrado(s): {", ".join(missing)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        trial = str(request.data.get('trial', 'true')).lower() not in ('false', '0', 'no')
+        result = import_users(rows, courses=courses, trial=trial, workers=1)
+        return Response({
+            'created': result['created'],
+            'skipped': result['skipped'],
+            'errors': errors,
+        }, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -488,6 +590,60 @@ def admin_stats(request):
     return Response(stats)
 
 
+
+MAX_LEADERBOARD_LIMIT = 100
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_referral_leaderboard(request):
+    """Top de referenciadores: ?period=all|YYYY-MM&limit=10"""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return Response(
+            {'error': 'Acesso negado. Apenas administradores.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    period = leaderboard.parse_period(request.query_params.get('period'))
+    if period is None:
+        return Response({'error': "period deve ser 'all' ou 'YYYY-MM'."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), MAX_LEADERBOARD_LIMIT)
+    except (TypeError, ValueError):
+        return Response({'error': 'limit deve ser um número.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    entries = ReferralLeaderboardSerializer(leaderboard.top(period, limit), many=True).data
+    for position, entry in enumerate(entries, start=1):
+        entry['rank'] = position
+    return Response({'period': period, 'results': entries})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_referral_rank(request):
+    """Posição de um referenciador: ?user_id=&period=all|YYYY-MM"""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return Response(
+            {'error': 'Acesso negado. Apenas administradores.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    period = leaderboard.parse_period(request.query_params.get('period'))
+    if period is None:
+        return Response({'error': "period deve ser 'all' ou 'YYYY-MM'."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        user_id = int(request.query_params.get('user_id'))
+    except (TypeError, ValueError):
+        return Response({'error': 'user_id é obrigatório.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    rank, entry = leaderboard.rank_of(user_id, period)
+    return Response({
+        'period': period,
+        'user_id': user_id,
+        'rank': rank,
+        'entry': ReferralLeaderboardSerializer(entry).data if entry else None,
+    })
+
 # Quiz and Exam Admin Views
 class AdminQuestionViewSet(viewsets.ModelViewSet):
     """CRUD de perguntas para admin"""
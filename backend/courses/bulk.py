@@ -0,0 +1,19 @@
+"""
+Pedidos de aprovação em lote do admin (comprovantes de cursos, mentorias e
+subscrições): limite e validação da lista de IDs do corpo do pedido.
+"""
+
+# Máximo de comprovantes por pedido de aprovação em lote
+MAX_BULK_APPROVE = 500
+
+BULK_IDS_ERROR = f'Envie "ids": uma lista de 1 a {MAX_BULK_APPROVE} IDs.'
+
+
+def parse_bulk_ids(ids):
+    """Lista de IDs inteiros (sem repetidos) do corpo do pedido, ou None se inválida"""
+    if not isinstance(ids, list) or not 0 < len(ids) <= MAX_BULK_APPROVE:
+        return None
+    try:
+        return list(dict.fromkeys(int(i) for i in ids))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,177 @@
+"""
+Leaderboard de referências: partilhas, conversões e pontos aprovados por
+referenciador, para todo o período ('all') e por mês ('YYYY-MM').
+
+ReferralLeaderboard é mantido de forma incremental: cada escrita em ReferralShare /
+ReferralPoints (signals em courses/signals.py, ou explicitamente nos caminhos com
+bulk_create) aplica a diferença entre a contribuição antiga e a nova com UPDATEs
+atómicos (F). As consultas de top-N e de posição de um usuário usam o índice
+(period, -approved_points, -conversions, -shares, referrer) e não tocam nas linhas
+de partilhas/pontos.
+
+Se os totais divergirem (ex.: updates em massa fora destes caminhos), o comando
+rebuild_referral_leaderboard recalcula tudo a partir das linhas de origem.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import ReferralLeaderboard, ReferralPoints, ReferralShare
+
+ALL_TIME = 'all'
+FIELDS = ('shares', 'conversions', 'approved_points')
+RANKING = ['-approved_points', '-conversions', '-shares', 'referrer_id']
+BATCH_SIZE = 1000
+
+
+def parse_period(value):
+    """'all' ou 'YYYY-MM' validado (None se inválido)"""
+    value = (value or ALL_TIME).strip()
+    if value == ALL_TIME:
+        return value
+    try:
+        datetime.strptime(value, '%Y-%m')
+    except ValueError:
+        return None
+    return value
+
+
+def month_of(value):
+    return timezone.localtime(value).strftime('%Y-%m')
+
+
+def _add(deltas, referrer_id, when, field, amount):
+    for period in (ALL_TIME, month_of(when)):
+        deltas[(referrer_id, period)][field] += amount
+
+
+def new_deltas():
+    return defaultdict(lambda: defaultdict(Decimal))
+
+
+def share_contribution(deltas, share, sign=1):
+    _add(deltas, share.referrer_id, share.shared_at, 'shares', sign)
+    return deltas
+
+
+def points_state(points):
+    """Estado de um ReferralPoints relevante para o leaderboard"""
+    return (points.referrer_id, points.status, points.points, points.created_at, points.approved_at)
+
+
+def points_contribution(deltas, state, sign=1):
+    """Conversão (se não rejeitada) no mês de criação; pontos aprovados no mês de aprovação"""
+    if state is None:
+        return deltas
+    referrer_id, status, amount, created_at, approved_at = state
+    if status != 'rejected':
+        _add(deltas, referrer_id, created_at, 'conversions', sign)
+    if status == 'approved':
+        _add(deltas, referrer_id, approved_at or created_at, 'approved_points', sign * Decimal(amount))
+    return deltas
+
+
+def apply(deltas):
+    """Aplicar {(referrer_id, period): {campo: delta}} (um UPDATE por combinação de deltas)"""
+    changes = {
+        key: tuple(values.get(field, 0) for field in FIELDS)
+        for key, values in deltas.items()
+        if any(values.get(field, 0) for field in FIELDS)
+    }
+    if not changes:
+        return
+    ReferralLeaderboard.objects.bulk_create(
+        [ReferralLeaderboard(referrer_id=referrer_id, period=period) for referrer_id, period in changes],
+        ignore_conflicts=True,
+    )
+    grouped = defaultdict(list)
+    for key, change in changes.items():
+        grouped[change].append(key)
+    for (shares, conversions, approved_points), keys in grouped.items():
+        match = Q()
+        for referrer_id, period in keys:
+            match |= Q(referrer_id=referrer_id, period=period)
+        ReferralLeaderboard.objects.filter(match).update(
+            shares=F('shares') + int(shares),
+            conversions=F('conversions') + int(conversions),
+            approved_points=F('approved_points') + approved_points,
+            updated_at=timezone.now(),
+        )
+
+
+def record_conversions(points_list):
+    """Contabilizar ReferralPoints criados com bulk_create (sem signals)"""
+    deltas = new_deltas()
+    for points in points_list:
+        points_contribution(deltas, points_state(points))
+    apply(deltas)
+
+
+def top(period=ALL_TIME, limit=10):
+    return list(
+        ReferralLeaderboard.objects.filter(period=period)
+        .select_related('referrer')
+        .order_by(*RANKING)[:limit]
+    )
+
+
+def rank_of(user_id, period=ALL_TIME):
+    """(posição, entrada) do usuário no período, ou (None, None) sem referências"""
+    entry = ReferralLeaderboard.objects.filter(referrer_id=user_id, period=period).first()
+    if entry is None:
+        return None, None
+    ahead = ReferralLeaderboard.objects.filter(period=period).filter(
+        Q(approved_points__gt=entry.approved_points)
+        | Q(approved_points=entry.approved_points, conversions__gt=entry.conversions)
+        | Q(approved_points=entry.approved_points, conversions=entry.conversions, shares__gt=entry.shares)
+        | Q(approved_points=entry.approved_points, conversions=entry.conversions, shares=entry.shares,
+            referrer_id__lt=user_id)
+    ).count()
+    return ahead + 1, entry
+
+
+def rebuild():
+    """Recalcular o leaderboard a partir das partilhas e pontos (agregações agrupadas); devolve o nº de linhas"""
+    totals = new_deltas()
+
+    def collect(rows, field):
+        for row in rows:
+            for period in (ALL_TIME, month_of(row['month'])):
+                totals[(row['referrer_id'], period)][field] += row['total']
+
+    collect(
+        ReferralShare.objects.order_by().values('referrer_id', month=TruncMonth('shared_at'))
+        .annotate(total=Count('id')),
+        'shares',
+    )
+    collect(
+        ReferralPoints.objects.exclude(status='rejected').order_by()
+        .values('referrer_id', month=TruncMonth('created_at'))
+        .annotate(total=Count('id')),
+        'conversions',
+    )
+    collect(
+        ReferralPoints.objects.filter(status='approved').order_by()
+        .values('referrer_id', month=TruncMonth(Coalesce('approved_at', 'created_at')))
+        .annotate(total=Sum('points')),
+        'approved_points',
+    )
+    rows = [
+        ReferralLeaderboard(
+            referrer_id=referrer_id,
+            period=period,
+            shares=int(values['shares']),
+            conversions=int(values['conversions']),
+            approved_points=values['approved_points'],
+        )
+        for (referrer_id, period), values in totals.items()
+    ]
+    with transaction.atomic():
+        ReferralLeaderboard.objects.all().delete()
+        ReferralLeaderboard.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
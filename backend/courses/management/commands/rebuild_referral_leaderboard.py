@@ -0,0 +1,15 @@
+"""
+Management command para recalcular o leaderboard de referências (ReferralLeaderboard)
+a partir das partilhas e pontos - após o deploy inicial ou se os totais divergirem.
+"""
+from django.core.management.base import BaseCommand
+
+from courses.leaderboard import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o leaderboard de referências (total e por mês)'
+
+    def handle(self, *args, **options):
+        total = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Total de {total} linha(s) do leaderboard recalculada(s).'))
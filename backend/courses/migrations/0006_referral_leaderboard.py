@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_referral_points'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferralLeaderboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(help_text="'all' (all time) or month 'YYYY-MM'", max_length=7)),
+                ('shares', models.IntegerField(default=0, help_text='Course shares')),
+                ('conversions', models.IntegerField(default=0, help_text='Referred enrollments (not rejected)')),
+                ('approved_points', models.DecimalField(decimal_places=2, default=0, help_text='Approved referral points', max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('referrer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='referral_leaderboard', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', '-approved_points', '-conversions', '-shares', 'referrer'], name='courses_leaderboard_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('referrer', 'period'), name='courses_leaderboard_unique_period')],
+            },
+        ),
+    ]
@@ -509,5 +509,42 @@ class UserPoints(models.Model):
     @classmethod
     def get_user_balance(cls, user):
         """Get current point balance for a user"""
-        latest = cls.objects.filter(user=user).order_by('-created_at').first()
+        latest = cls.objects.filter(user=user).order_by('-created_at', '-id').first()
         return latest.balance_after if latest else 0
+
+
+class ReferralLeaderboard(models.Model):
+    """Per-referrer referral totals by period (maintained incrementally, see courses/leaderboard.py)"""
+    referrer = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='referral_leaderboard',
+        on_delete=models.CASCADE
+    )
+    period = models.CharField(
+        max_length=7,
+        help_text="'all' (all time) or month 'YYYY-MM'"
+    )
+    shares = models.IntegerField(default=0, help_text="Course shares")
+    conversions = models.IntegerField(default=0, help_text="Referred enrollments (not rejected)")
+    approved_points = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Approved referral points"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['referrer', 'period'], name='courses_leaderboard_unique_period'),
+        ]
+        indexes = [
+            # Top-N and rank-of-user within a period
+            models.Index(
+                fields=['period', '-approved_points', '-conversions', '-shares', 'referrer'],
+                name='courses_leaderboard_rank_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.referrer_id} - {self.period}: {self.approved_points} points"
@@ -0,0 +1,98 @@
+"""
+Pontos de referência (referral) atribuídos quando inscrições são aprovadas.
+
+A atribuição é feita em conjunto para qualquer número de inscrições, com um número
+fixo de queries:
+
+- inscrições já premiadas são excluídas com um anti-join (NOT EXISTS)
+- os referenciadores por código são resolvidos com uma query IN
+- os saldos atuais dos referenciadores são lidos numa query (linhas bloqueadas até
+  ao fim da transação, para os saldos acumulados não se cruzarem com outra atribuição)
+- ReferralPoints e UserPoints são gravados com bulk_create (o leaderboard é
+  atualizado aqui, já que bulk_create não dispara signals)
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery
+
+from accounts.models import User
+
+from . import leaderboard
+from .models import Enrollment, ReferralPoints, UserPoints
+
+# 1 ponto = 1000 KZ
+POINTS_PER_REFERRAL = Decimal('1.0')
+
+
+def _resolve_referrers(rows):
+    """{enrollment_id: referrer_id}: código da inscrição (link partilhado) ou quem indicou o usuário"""
+    codes = {row['referral_code'] for row in rows if row['referral_code']}
+    by_code = dict(User.objects.filter(referral_code__in=codes).values_list('referral_code', 'id')) if codes else {}
+    referrers = {}
+    for row in rows:
+        referrer_id = by_code.get(row['referral_code']) or row['user__referred_by_id']
+        if referrer_id:
+            referrers[row['id']] = referrer_id
+    return referrers
+
+
+def award_referral_points_bulk(enrollments):
+    """
+    Atribuir os pontos de referência das inscrições aprovadas (pendentes de aprovação
+    do admin) e registar os movimentos no histórico de pontos com saldos corretos.
+    Devolve os ReferralPoints criados.
+    """
+    enrollment_ids = [enrollment.id for enrollment in enrollments]
+    if not enrollment_ids:
+        return []
+    with transaction.atomic():
+        rows = list(
+            Enrollment.objects.filter(id__in=enrollment_ids)
+            .filter(~Exists(ReferralPoints.objects.filter(enrollment=OuterRef('pk'))))
+            .order_by('id')
+            .values('id', 'user_id', 'referral_code', 'user__referred_by_id', 'course__title')
+        )
+        referrers = _resolve_referrers(rows)
+        if not referrers:
+            return []
+
+        latest_balance = (
+            UserPoints.objects.filter(user=OuterRef('pk'))
+            .order_by('-created_at', '-id')
+            .values('balance_after')[:1]
+        )
+        balances = {
+            user_id: balance or Decimal('0')
+            for user_id, balance in User.objects.select_for_update()
+            .filter(id__in=set(referrers.values()))
+            .annotate(balance=Subquery(latest_balance))
+            .values_list('id', 'balance')
+        }
+
+        awarded_rows = [row for row in rows if row['id'] in referrers]
+        awarded = ReferralPoints.objects.bulk_create([
+            ReferralPoints(
+                referrer_id=referrers[row['id']],
+                referred_user_id=row['user_id'],
+                enrollment_id=row['id'],
+                points=POINTS_PER_REFERRAL,
+                status='pending',  # Admin needs to approve
+            )
+            for row in awarded_rows
+        ])
+
+        ledger = []
+        for row, points in zip(awarded_rows, awarded):
+            balances[points.referrer_id] += POINTS_PER_REFERRAL
+            ledger.append(UserPoints(
+                user_id=points.referrer_id,
+                transaction_type='earned',
+                points=POINTS_PER_REFERRAL,
+                balance_after=balances[points.referrer_id],
+                description=f'Pontos ganhos por referência: {row["course__title"]}',
+                referral_points=points,
+            ))
+        UserPoints.objects.bulk_create(ledger)
+        leaderboard.record_conversions(awarded)
+    return awarded
@@ -4,7 +4,7 @@ from .models import (
     Course, Lesson, LessonAttachment, Enrollment, PaymentProof, Progress,
     Question, Choice, LessonQuiz, LessonQuizQuestion, FinalExam, FinalExamQuestion,
     UserQuizAnswer, UserExamAnswer, QuizResult, ExamResult,
-    ReferralShare, ReferralPoints, UserPoints
+    ReferralShare, ReferralPoints, UserPoints, ReferralLeaderboard
 )
 
 
@@ -413,6 +413,22 @@ class ReferralPointsSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'approved_at', 'approved_by']
 
 
+class ReferralLeaderboardSerializer(serializers.ModelSerializer):
+    referrer_email = serializers.CharField(source='referrer.email', read_only=True)
+    referrer_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReferralLeaderboard
+        fields = [
+            'referrer', 'referrer_email', 'referrer_name', 'period',
+            'shares', 'conversions', 'approved_points', 'updated_at'
+        ]
+        read_only_fields = fields
+
+    def get_referrer_name(self, obj):
+        return obj.referrer.get_full_name() or obj.referrer.username
+
+
 class UserPointsSerializer(serializers.ModelSerializer):
     course_title = serializers.SerializerMethodField()
     
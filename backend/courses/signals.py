@@ -0,0 +1,45 @@
+"""
+Signals dos cursos - manter o leaderboard de referências a cada escrita em
+ReferralShare / ReferralPoints (os caminhos com bulk_create chamam
+courses.leaderboard diretamente)
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import leaderboard
+from .models import ReferralPoints, ReferralShare
+
+
+@receiver(post_save, sender=ReferralShare)
+def count_share(sender, instance, created, **kwargs):
+    if created:
+        leaderboard.apply(leaderboard.share_contribution(leaderboard.new_deltas(), instance))
+
+
+@receiver(post_delete, sender=ReferralShare)
+def uncount_share(sender, instance, **kwargs):
+    leaderboard.apply(leaderboard.share_contribution(leaderboard.new_deltas(), instance, sign=-1))
+
+
+@receiver(pre_save, sender=ReferralPoints)
+def remember_points_state(sender, instance, **kwargs):
+    """Estado antes da gravação (uma leitura por chave primária) para aplicar só a diferença"""
+    previous = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).first()
+    instance._leaderboard_previous = leaderboard.points_state(previous) if previous else None
+
+
+@receiver(post_save, sender=ReferralPoints)
+def count_points(sender, instance, **kwargs):
+    deltas = leaderboard.new_deltas()
+    leaderboard.points_contribution(deltas, getattr(instance, '_leaderboard_previous', None), sign=-1)
+    leaderboard.points_contribution(deltas, leaderboard.points_state(instance))
+    leaderboard.apply(deltas)
+
+
+@receiver(post_delete, sender=ReferralPoints)
+def uncount_points(sender, instance, **kwargs):
+    leaderboard.apply(leaderboard.points_contribution(
+        leaderboard.new_deltas(), leaderboard.points_state(instance), sign=-1
+    ))
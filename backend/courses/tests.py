@@ -0,0 +1,218 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from mailer.models import OutboundEmail
+
+from . import leaderboard
+from .bulk import MAX_BULK_APPROVE, parse_bulk_ids
+from .models import Course, Enrollment, PaymentProof, ReferralLeaderboard, ReferralPoints, ReferralShare, UserPoints
+from .referrals import POINTS_PER_REFERRAL, award_referral_points_bulk
+
+User = get_user_model()
+
+
+def create_course(slug='financas'):
+    return Course.objects.create(title=f'Curso {slug}', slug=slug, description='Descrição', price=Decimal('10000'))
+
+
+def create_pending_proof(user, course):
+    enrollment = Enrollment.objects.create(user=user, course=course, status='pending')
+    return PaymentProof.objects.create(enrollment=enrollment, file='payment_proofs/comprovativo.pdf')
+
+
+class BulkIdsTests(TestCase):
+    def test_parse_bulk_ids(self):
+        self.assertEqual(parse_bulk_ids([3, '1', 3]), [3, 1])
+        self.assertIsNone(parse_bulk_ids([]))
+        self.assertIsNone(parse_bulk_ids('1,2'))
+        self.assertIsNone(parse_bulk_ids([1, 'x']))
+        self.assertIsNone(parse_bulk_ids(list(range(MAX_BULK_APPROVE + 1))))
+
+
+class PaymentProofBulkApproveTests(TestCase):
+    url = '/api/course/admin/payment-proofs/bulk-approve/'
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass12345', is_staff=True
+        )
+        self.referrer = User.objects.create_user(email='rui@example.com', username='rui', password='pass12345')
+        self.course = create_course()
+        self.students = [
+            User.objects.create_user(
+                email=f'aluno{i}@example.com', username=f'aluno{i}', password='pass12345', referred_by=self.referrer
+            )
+            for i in range(2)
+        ]
+        self.proofs = [create_pending_proof(user, self.course) for user in self.students]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(self.students[0])
+        response = self.client.post(self.url, {'ids': [self.proofs[0].id]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_rejects_invalid_ids(self):
+        response = self.client.post(self.url, {'ids': 'todos'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_approves_pending_proofs_and_skips_the_rest(self):
+        ids = [proof.id for proof in self.proofs]
+        response = self.client.post(self.url, {'ids': ids + [9999]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'approved': sorted(ids), 'skipped': [9999]})
+
+        self.assertEqual(Enrollment.objects.filter(status='active').count(), 2)
+        self.assertEqual(PaymentProof.objects.filter(status='approved', reviewed_by=self.admin).count(), 2)
+        self.assertEqual(ReferralPoints.objects.filter(referrer=self.referrer).count(), 2)
+        self.assertEqual(OutboundEmail.objects.filter(template_name='emails/enrollment_approved.html').count(), 2)
+
+        response = self.client.post(self.url, {'ids': ids}, format='json')
+        self.assertEqual(response.data, {'approved': [], 'skipped': sorted(ids)})
+        self.assertEqual(ReferralPoints.objects.count(), 2)
+
+
+class ReferralAwardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.referrer = User.objects.create_user(email='rui@example.com', username='rui', password='pass12345')
+        self.course = create_course()
+        UserPoints.objects.create(
+            user=self.referrer, transaction_type='admin_adjustment', points=Decimal('5'), balance_after=Decimal('5')
+        )
+
+    def _enrollments(self, count, start=0, **kwargs):
+        enrollments = []
+        for i in range(start, start + count):
+            user = User.objects.create_user(
+                email=f'aluno{i}@example.com', username=f'aluno{i}', password='pass12345', referred_by=self.referrer
+            )
+            enrollments.append(Enrollment.objects.create(user=user, course=self.course, status='active', **kwargs))
+        return enrollments
+
+    def test_balances_accumulate_from_the_latest_entry(self):
+        awarded = award_referral_points_bulk(self._enrollments(3))
+        self.assertEqual(len(awarded), 3)
+        balances = list(
+            UserPoints.objects.filter(user=self.referrer, transaction_type='earned')
+            .order_by('id').values_list('balance_after', flat=True)
+        )
+        self.assertEqual(balances, [Decimal('5') + POINTS_PER_REFERRAL * n for n in (1, 2, 3)])
+
+    def test_already_awarded_enrollments_are_skipped(self):
+        enrollments = self._enrollments(2)
+        award_referral_points_bulk(enrollments[:1])
+        self.assertEqual(len(award_referral_points_bulk(enrollments)), 1)
+        self.assertEqual(ReferralPoints.objects.count(), 2)
+
+    def test_shared_link_code_wins_over_referred_by(self):
+        sharer = User.objects.create_user(email='eva@example.com', username='eva', password='pass12345')
+        enrollment, = self._enrollments(1, referral_code=sharer.referral_code)
+        points, = award_referral_points_bulk([enrollment])
+        self.assertEqual(points.referrer, sharer)
+        self.assertEqual(points.status, 'pending')
+
+    def test_enrollments_without_referrer_get_nothing(self):
+        user = User.objects.create_user(email='solo@example.com', username='solo', password='pass12345')
+        enrollment = Enrollment.objects.create(user=user, course=self.course, status='active')
+        self.assertEqual(award_referral_points_bulk([enrollment]), [])
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        small_batch, large_batch = self._enrollments(2), self._enrollments(8, start=2)
+        with CaptureQueriesContext(connection) as small:
+            award_referral_points_bulk(small_batch)
+        with CaptureQueriesContext(connection) as large:
+            award_referral_points_bulk(large_batch)
+        self.assertEqual(len(small), len(large))
+
+
+class ReferralLeaderboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.ana, self.rui = [
+            User.objects.create_user(email=f'{name}@example.com', username=name, password='pass12345')
+            for name in ('ana', 'rui')
+        ]
+        self.points = [self._convert(self.ana, i) for i in range(3)] + [self._convert(self.rui, 3)]
+        ReferralShare.objects.create(referrer=self.ana, course=self.course, platform='whatsapp')
+        ReferralShare.objects.create(referrer=self.rui, course=self.course, platform='facebook')
+
+    def _convert(self, referrer, i):
+        user = User.objects.create_user(email=f'aluno{i}@example.com', username=f'aluno{i}', password='pass12345')
+        enrollment = Enrollment.objects.create(user=user, course=self.course, status='active')
+        return ReferralPoints.objects.create(
+            referrer=referrer, referred_user=user, enrollment=enrollment, points=Decimal('1.0')
+        )
+
+    def _totals(self):
+        return {
+            (row.referrer_id, row.period): (row.shares, row.conversions, row.approved_points)
+            for row in ReferralLeaderboard.objects.all()
+            if row.shares or row.conversions or row.approved_points
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self._totals()
+        leaderboard.rebuild()
+        self.assertEqual(incremental, self._totals())
+        return incremental
+
+    def _review(self, points, status):
+        points.status = status
+        points.approved_at = timezone.now() if status == 'approved' else None
+        points.save()
+
+    def test_totals_follow_approve_reject_and_delete(self):
+        approved, rejected, deleted, other = self.points
+        self._review(approved, 'approved')
+        self._review(rejected, 'rejected')
+        self._review(other, 'approved')
+        deleted.delete()
+        ReferralShare.objects.filter(referrer=self.rui).first().delete()
+
+        totals = self.assertMatchesRebuild()
+        self.assertEqual(totals[(self.ana.id, leaderboard.ALL_TIME)], (1, 1, Decimal('1.0')))
+        self.assertEqual(totals[(self.rui.id, leaderboard.ALL_TIME)], (0, 1, Decimal('1.0')))
+        month = leaderboard.month_of(timezone.now())
+        self.assertEqual(totals[(self.ana.id, month)], totals[(self.ana.id, leaderboard.ALL_TIME)])
+
+    def test_reverting_an_approval_removes_the_points(self):
+        approved = self.points[0]
+        self._review(approved, 'approved')
+        self._review(approved, 'pending')
+        totals = self.assertMatchesRebuild()
+        self.assertEqual(totals[(self.ana.id, leaderboard.ALL_TIME)], (1, 3, Decimal('0')))
+
+    def test_rank_of_and_top(self):
+        self._review(self.points[3], 'approved')
+        self.assertEqual([entry.referrer for entry in leaderboard.top()], [self.rui, self.ana])
+        self.assertEqual(leaderboard.rank_of(self.rui.id)[0], 1)
+        self.assertEqual(leaderboard.rank_of(self.ana.id)[0], 2)
+        self.assertEqual(leaderboard.rank_of(self.rui.id, period='2000-01'), (None, None))
+
+    def test_my_rank_only_exposes_the_caller(self):
+        self._review(self.points[3], 'approved')
+        client = APIClient()
+        client.force_authenticate(self.ana)
+        response = client.get('/api/course/referral-points/my-rank/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'period': leaderboard.ALL_TIME, 'rank': 2, 'conversions': 3, 'approved_points': 0.0,
+        })
+        self.assertEqual(client.get('/api/course/referral-points/leaderboard/').status_code, 404)
+        self.assertEqual(client.get('/api/course/referral-points/my-rank/', {'period': 'x'}).status_code, 400)
+
+    def test_parse_period(self):
+        self.assertEqual(leaderboard.parse_period(None), leaderboard.ALL_TIME)
+        self.assertEqual(leaderboard.parse_period('2026-03'), '2026-03')
+        self.assertIsNone(leaderboard.parse_period('2026-13'))
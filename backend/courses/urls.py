@@ -8,6 +8,7 @@ from .views import (
 from .admin_views import (
     AdminCourseViewSet, AdminLessonViewSet, AdminLessonAttachmentViewSet,
     AdminEnrollmentViewSet, AdminPaymentProofViewSet, AdminUserViewSet, admin_stats,
+    admin_referral_leaderboard, admin_referral_rank,
     AdminQuestionViewSet, AdminChoiceViewSet, AdminLessonQuizViewSet, AdminFinalExamViewSet,
     AdminReferralShareViewSet, AdminReferralPointsViewSet, AdminUserPointsViewSet
 )
@@ -43,4 +44,6 @@ urlpatterns = [
     path('', include(router.urls)),
     path('admin/', include(admin_router.urls)),
     path('admin/stats/', admin_stats, name='admin-stats'),
+    path('admin/referral-leaderboard/', admin_referral_leaderboard, name='admin-referral-leaderboard'),
+    path('admin/referral-leaderboard/rank/', admin_referral_rank, name='admin-referral-rank'),
 ]
@@ -1,15 +1,14 @@
 """
 Email templates and utilities for sending emails
 """
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
 from django.conf import settings
-from django.utils.html import strip_tags
 
+from mailer.outbox import enqueue_email, enqueue_emails
 
-def send_enrollment_approval_email(enrollment):
+
+def enrollment_approval_email(enrollment):
     """
-    Envia email de aprovação de inscrição no curso
+    Argumentos do email de aprovação de inscrição no curso (para enqueue_email)
     """
     user = enrollment.user
     course = enrollment.course
@@ -23,25 +22,25 @@ def send_enrollment_approval_email(enrollment):
         'mobile_app_info': 'Você também pode acessar todo o conteúdo através do nosso aplicativo móvel Zenda, disponível para iOS e Android.',
     }
     
-    # Renderizar template HTML
-    html_content = render_to_string('emails/enrollment_approved.html', context)
-    text_content = strip_tags(html_content)
-    
-    # Criar email
-    subject = f'🎉 Bem-vindo(a) ao curso {course.title}!'
-    
-    email = EmailMultiAlternatives(
-        subject=subject,
-        body=text_content,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        to=[user.email],
-    )
-    
-    email.attach_alternative(html_content, "text/html")
-    
-    try:
-        email.send()
-        return True
-    except Exception as e:
-        print(f"Erro ao enviar email: {e}")
-        return False
+    return {
+        'to_email': user.email,
+        'subject': f'🎉 Bem-vindo(a) ao curso {course.title}!',
+        'template_name': 'emails/enrollment_approved.html',
+        'context': context,
+    }
+
+
+def send_enrollment_approval_email(enrollment):
+    """
+    Põe na fila o email de aprovação de inscrição no curso
+    """
+    # Renderizado e enviado pelo worker da fila (run_mail_worker); o pedido não espera pelo SMTP
+    enqueue_email(**enrollment_approval_email(enrollment))
+    return True
+
+
+def send_enrollment_approval_emails(enrollments):
+    """
+    Põe na fila os emails de aprovação de várias inscrições (um só INSERT)
+    """
+    return len(enqueue_emails([enrollment_approval_email(enrollment) for enrollment in enrollments]))
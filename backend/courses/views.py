@@ -20,6 +20,7 @@ from .serializers import (
     ReferralShareSerializer, ReferralPointsSerializer, UserPointsSerializer
 )
 from django.utils import timezone
+from . import leaderboard as referral_leaderboard
 
 
 class CourseViewSet(viewsets.ReadOnlyModelViewSet):
@@ -567,51 +568,9 @@ class FinalExamViewSet(viewsets.ReadOnlyModelViewSet):
 
 def award_referral_points(enrollment):
     """Award points to referrer when enrollment is approved"""
-    from decimal import Decimal
-    from accounts.models import User
-    
-    # Check if points already awarded for this enrollment
-    if ReferralPoints.objects.filter(enrollment=enrollment).exists():
-        return None
-    
-    # First check course-specific referral code (from shared link)
-    referrer = None
-    if enrollment.referral_code:
-        try:
-            referrer = User.objects.get(referral_code=enrollment.referral_code)
-        except User.DoesNotExist:
-            pass
-    
-    # Fallback to user's general referrer (from registration)
-    if not referrer:
-        referrer = enrollment.user.referred_by
-    
-    if not referrer:
-        return None
-    
-    # Create referral points record (1 point = 1000 KZ)
-    referral_points = ReferralPoints.objects.create(
-        referrer=referrer,
-        referred_user=enrollment.user,
-        enrollment=enrollment,
-        points=Decimal('1.0'),
-        status='pending'  # Admin needs to approve
-    )
-    
-    # Update user's point balance
-    current_balance = UserPoints.get_user_balance(referrer)
-    new_balance = current_balance + Decimal('1.0')
-    
-    UserPoints.objects.create(
-        user=referrer,
-        transaction_type='earned',
-        points=Decimal('1.0'),
-        balance_after=new_balance,
-        description=f'Pontos ganhos por referência: {enrollment.course.title}',
-        referral_points=referral_points
-    )
-    
-    return referral_points
+    from .referrals import award_referral_points_bulk
+    awarded = award_referral_points_bulk([enrollment])
+    return awarded[0] if awarded else None
 
 
 class ReferralShareViewSet(viewsets.ModelViewSet):
@@ -657,6 +616,23 @@ class ReferralPointsViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         return ReferralPoints.objects.filter(referrer=self.request.user)
 
+    @action(detail=False, methods=['get'], url_path='my-rank')
+    def my_rank(self, request):
+        """
+        Posição do próprio usuário no leaderboard de referências (total ou ?period=YYYY-MM).
+        O ranking completo, com nomes, só está disponível para admin
+        """
+        period = referral_leaderboard.parse_period(request.query_params.get('period'))
+        if period is None:
+            return Response({'error': "period deve ser 'all' ou 'YYYY-MM'."}, status=status.HTTP_400_BAD_REQUEST)
+        rank, entry = referral_leaderboard.rank_of(request.user.id, period)
+        return Response({
+            'period': period,
+            'rank': rank,
+            'conversions': entry.conversions if entry else 0,
+            'approved_points': float(entry.approved_points) if entry else 0.0,
+        })
+
 
 class UserPointsViewSet(viewsets.ReadOnlyModelViewSet):
     """View user points balance and history"""
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_alter_budget_options_budget_date_budget_end_date_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='budget',
+            options={'ordering': ['-year', '-month', '-created_at'], 'verbose_name': 'Orçamento', 'verbose_name_plural': 'Orçamentos'},
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['updated_at'], name='finance_goal_updated_at_idx'),
+        ),
+    ]
@@ -187,6 +187,10 @@ class Goal(models.Model):
         verbose_name = "Objetivo"
         verbose_name_plural = "Objetivos"
         ordering = ['-created_at']
+        indexes = [
+            # Refresh incremental do run_reminder_daemon
+            models.Index(fields=['updated_at'], name='finance_goal_updated_at_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
@@ -0,0 +1,99 @@
+"""
+Lembretes semanais dos objetivos (Goal): adicionar dinheiro aos objetivos ativos.
+
+Cada objetivo é lembrado uma vez por semana, no dia da semana em que foi criado,
+à hora GOAL_REMINDER_HOUR (fuso TIME_ZONE): o comando check_goal_reminders corre
+todos os dias e o run_reminder_daemon dispara à hora exata.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import CharField, DecimalField, Exists, ExpressionWrapper, F, OuterRef, Value
+from django.db.models.functions import Cast, Concat, NullIf
+from django.utils import timezone
+
+from tasks.models import Notification
+from tasks.notifications import NotificationBuffer
+
+from .models import Goal
+
+
+def reminder_hour():
+    return getattr(settings, 'GOAL_REMINDER_HOUR', 9)
+
+
+def reminder_slots(start, end):
+    """Momentos de lembrete (um por dia, à hora configurada) entre start (exclusivo) e end (inclusivo)"""
+    day = timezone.localtime(start).date()
+    slots = []
+    while day <= timezone.localtime(end).date():
+        slot = timezone.make_aware(datetime.combine(day, time(reminder_hour())))
+        if start < slot <= end:
+            slots.append(slot)
+        day += timedelta(days=1)
+    return slots
+
+
+def reminder_week(now=None):
+    """Semana ISO local (parte da chave de deduplicação: um lembrete por objetivo e semana)"""
+    year, week, _ = timezone.localdate(now).isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+def reminder_context(goal, week=None):
+    """Contexto do modelo 'goal_reminder' (progress/remaining anotados por eligible_goals)"""
+    return {
+        'progress': goal.progress or 0,
+        'remaining': goal.remaining,
+        'week': week or reminder_week(),
+    }
+
+
+def eligible_goals(queryset=None, now=None):
+    """
+    Objetivos ativos por alcançar sem lembrete nesta semana, numa só query: o lembrete
+    existente é excluído com um anti-join (NOT EXISTS) pela dedupe_key e o progresso é
+    calculado na própria query
+    """
+    week = reminder_week(now)
+    queryset = Goal.objects.all() if queryset is None else queryset
+    reminded = Notification.objects.filter(
+        dedupe_key=Concat(
+            Value('goal_reminder:'), Cast(OuterRef('pk'), CharField()), Value(f':{week}'),
+            output_field=CharField(),
+        ),
+    ).exclude(dedupe_key='')  # mesma condição do índice único parcial, para o poder usar
+    return (
+        queryset.filter(status='active', current_amount__lt=F('target_amount'))
+        .filter(~Exists(reminded))
+        .annotate(
+            progress=ExpressionWrapper(
+                F('current_amount') * 100 / NullIf(F('target_amount'), Value(0)),
+                output_field=DecimalField(),
+            ),
+            remaining=ExpressionWrapper(F('target_amount') - F('current_amount'), output_field=DecimalField()),
+        )
+        .only('id', 'user_id', 'title')
+        .order_by('pk')
+    )
+
+
+def goals_due_on(day):
+    """Objetivos cujo lembrete semanal calha em `day` (dia da semana em que foram criados)"""
+    return Goal.objects.filter(created_at__iso_week_day=day.isoweekday())
+
+
+def create_goal_reminders(queryset=None, now=None):
+    """
+    Criar os lembretes dos objetivos elegíveis do queryset (bulk_create em lotes).
+    Um lembrete por objetivo e semana ISO: além do anti-join, os repetidos (execuções
+    concorrentes) são ignorados pelo índice único de Notification.dedupe_key.
+    Devolve os objetivos processados.
+    """
+    week = reminder_week(now)
+    goals = []
+    with NotificationBuffer() as buffer:
+        for goal in eligible_goals(queryset, now).iterator(chunk_size=buffer.batch_size):
+            buffer.add('goal_reminder', goal.user_id, obj=goal, **reminder_context(goal, week))
+            goals.append(goal)
+    return goals
@@ -0,0 +1,67 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from tasks.models import Notification
+
+from .models import Goal
+from .reminders import create_goal_reminders, eligible_goals, goals_due_on
+
+User = get_user_model()
+
+
+class GoalReminderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+        self.goal = self._goal('Carro')
+
+    def _goal(self, title, current='100', **kwargs):
+        return Goal.objects.create(
+            user=self.user, title=title, target_amount=Decimal('1000'), current_amount=Decimal(current),
+            target_date=timezone.localdate() + timedelta(days=90), **kwargs
+        )
+
+    def _reminders(self):
+        return Notification.objects.filter(notification_type='goal_reminder')
+
+    def test_eligible_goals_skips_reached_inactive_and_reminded(self):
+        self._goal('Alcançado', current='1000')
+        self._goal('Cancelado', status='cancelled')
+        reminded = self._goal('Já lembrado')
+        create_goal_reminders(Goal.objects.filter(pk=reminded.pk))
+
+        with self.assertNumQueries(1):
+            goals = list(eligible_goals())
+        self.assertEqual(goals, [self.goal])
+        self.assertEqual(goals[0].progress, Decimal('10'))
+        self.assertEqual(goals[0].remaining, Decimal('900'))
+
+    def test_one_reminder_per_goal_and_week(self):
+        self.assertEqual(create_goal_reminders(), [self.goal])
+        self.assertEqual(create_goal_reminders(), [])
+        reminder = self._reminders().get()
+        self.assertIn('10%', reminder.message)
+
+        next_week = timezone.now() + timedelta(days=7)
+        self.assertEqual(create_goal_reminders(now=next_week), [self.goal])
+        self.assertEqual(self._reminders().count(), 2)
+
+    def test_goals_are_due_on_the_weekday_they_were_created(self):
+        today = timezone.localdate()
+        self.assertEqual(list(goals_due_on(today)), [self.goal])
+        self.assertFalse(goals_due_on(today + timedelta(days=1)).exists())
+
+    def test_day_of_week_uses_python_weekday(self):
+        today = timezone.localdate().weekday()
+        call_command('check_goal_reminders', day_of_week=(today + 1) % 7, stdout=StringIO())
+        self.assertFalse(self._reminders().exists())
+
+        call_command('check_goal_reminders', day_of_week=today, stdout=StringIO())
+        self.assertEqual(self._reminders().count(), 1)
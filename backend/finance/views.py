@@ -1,6 +1,7 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from subscriptions.permissions import HasAppAccess
 from rest_framework.response import Response
 from django.db.models import Sum, Q, Count
 from django.utils import timezone
@@ -58,7 +59,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     """ViewSet para categorias - permite criar, editar e deletar"""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, HasAppAccess]
 
     def get_queryset(self):
         queryset = Category.objects.all()
@@ -78,7 +79,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
 class PersonalExpenseViewSet(viewsets.ModelViewSet):
     """ViewSet para despesas pessoais"""
     serializer_class = PersonalExpenseSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, HasAppAccess]
 
     def get_queryset(self):
         user = self.request.user
@@ -135,7 +136,7 @@ class PersonalExpenseViewSet(viewsets.ModelViewSet):
 class BudgetViewSet(viewsets.ModelViewSet):
     """ViewSet para orçamentos"""
     serializer_class = BudgetSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, HasAppAccess]
 
     def get_queryset(self):
         user = self.request.user
@@ -245,7 +246,7 @@ class BudgetViewSet(viewsets.ModelViewSet):
 class GoalViewSet(viewsets.ModelViewSet):
     """ViewSet para objetivos"""
     serializer_class = GoalSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, HasAppAccess]
 
     def get_queryset(self):
         user = self.request.user
@@ -315,7 +316,7 @@ class GoalViewSet(viewsets.ModelViewSet):
 class DebtViewSet(viewsets.ModelViewSet):
     """ViewSet para dívidas"""
     serializer_class = DebtSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, HasAppAccess]
 
     def get_queryset(self):
         user = self.request.user
@@ -336,7 +337,7 @@ class DebtViewSet(viewsets.ModelViewSet):
 class SaleViewSet(viewsets.ModelViewSet):
     """ViewSet para vendas"""
     serializer_class = SaleSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, HasAppAccess]
 
     def get_queryset(self):
         user = self.request.user
@@ -376,7 +377,7 @@ class SaleViewSet(viewsets.ModelViewSet):
 class BusinessExpenseViewSet(viewsets.ModelViewSet):
     """ViewSet para despesas do negócio"""
     serializer_class = BusinessExpenseSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, HasAppAccess]
 
     def get_queryset(self):
         user = self.request.user
@@ -421,7 +422,7 @@ class BusinessExpenseViewSet(viewsets.ModelViewSet):
 
 class BusinessMetricsViewSet(viewsets.ViewSet):
     """ViewSet para métricas do negócio"""
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, HasAppAccess]
 
     @action(detail=False, methods=['get'])
     def overview(self, request):
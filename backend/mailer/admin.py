@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import OutboundEmail
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'to_email', 'subject', 'status', 'attempts', 'run_after', 'created_at', 'sent_at']
+    list_filter = ['status', 'template_name', 'created_at']
+    search_fields = ['to_email', 'subject']
+    readonly_fields = ['attempts', 'locked_by', 'locked_at', 'last_error', 'created_at', 'updated_at', 'sent_at']
@@ -0,0 +1,68 @@
+"""
+Benchmark da renderização de emails personalizados:
+    python manage.py benchmark_email_rendering --count 10000
+
+Compara render_to_string + strip_tags por destinatário (envio antigo) com
+render_many (template compilado uma vez, Context reutilizado, texto numa passagem).
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+
+from mailer.rendering import render_many
+
+TEMPLATE = 'emails/enrollment_approved.html'
+
+
+class Command(BaseCommand):
+    help = 'Mede o débito (emails/s) da renderização de emails personalizados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000, help='Número de emails a renderizar')
+        parser.add_argument('--template', default=TEMPLATE, help='Template a renderizar')
+        parser.add_argument(
+            '--skip-baseline',
+            action='store_true',
+            help='Não medir o método antigo (render_to_string + strip_tags)',
+        )
+
+    def _contexts(self, count):
+        return [
+            {
+                'user_name': f'Aluno {i}',
+                'course_title': f'Curso {i % 20}',
+                'course_description': 'Aprenda a organizar as suas finanças pessoais.',
+            }
+            for i in range(count)
+        ]
+
+    def _report(self, label, count, elapsed):
+        self.stdout.write(f'  {label}: {elapsed:.2f}s ({count / elapsed:,.0f} emails/s)')
+
+    def handle(self, *args, **options):
+        count = max(options['count'], 1)
+        template_name = options['template']
+        contexts = self._contexts(count)
+        base_context = {
+            'area_do_aluno_url': 'https://rubianejoaquim.com/area-do-aluno',
+            'mobile_app_info': 'Disponível para iOS e Android.',
+        }
+        self.stdout.write(f'Renderização de {count} email(s) com {template_name}:')
+
+        if not options['skip_baseline']:
+            start = time.perf_counter()
+            for context in contexts:
+                html = render_to_string(template_name, {**base_context, **context})
+                strip_tags(html)
+            baseline = time.perf_counter() - start
+            self._report('render_to_string + strip_tags', count, baseline)
+
+        start = time.perf_counter()
+        rendered = sum(1 for _ in render_many(template_name, contexts, base_context=base_context))
+        elapsed = time.perf_counter() - start
+        self._report('render_many', rendered, elapsed)
+
+        if not options['skip_baseline']:
+            self.stdout.write(self.style.SUCCESS(f'Ganho: {baseline / elapsed:.1f}x'))
@@ -0,0 +1,84 @@
+"""
+Worker da fila de emails.
+Executar como processo de longa duração (pode haver vários em paralelo):
+    python manage.py run_mail_worker
+"""
+import os
+import socket
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from mailer.outbox import claim_emails, release_emails, requeue_stale_emails, send_emails
+
+
+class Command(BaseCommand):
+    help = 'Envia os emails da fila (OutboundEmail) por uma ligação SMTP reutilizada'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Enviar os emails prontos e sair (útil para cron/testes)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Número de emails reclamados de cada vez',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Segundos de espera quando a fila está vazia',
+        )
+
+    def handle(self, *args, **options):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        batch_size = max(options['batch_size'], 1)
+        sent = failed = 0
+        # Ligação aberta enquanto houver trabalho; fechada quando a fila fica vazia
+        connection = get_connection(fail_silently=False)
+        connected = False
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker_id} iniciado.'))
+        try:
+            while True:
+                close_old_connections()
+                requeue_stale_emails()
+                emails = claim_emails(worker_id, limit=batch_size)
+
+                if emails:
+                    if not connected:
+                        try:
+                            connection.open()
+                        except Exception as e:
+                            # Servidor SMTP em baixo: o lote volta à fila com backoff e o worker continua
+                            failed += release_emails(emails, e)
+                            self.stdout.write(self.style.ERROR(f'  Erro ao ligar ao servidor SMTP: {e}'))
+                            if options['once']:
+                                break
+                            time.sleep(options['sleep'])
+                            continue
+                        connected = True
+                    batch_sent, batch_failed = send_emails(emails, connection)
+                    sent += batch_sent
+                    failed += batch_failed
+                    self.stdout.write(f'  Lote: {batch_sent} enviado(s), {batch_failed} com erro')
+                    continue
+
+                if connected:
+                    connection.close()
+                    connected = False
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Worker interrompido.')
+        finally:
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Total: {sent} email(s) enviado(s), {failed} com erro.'))
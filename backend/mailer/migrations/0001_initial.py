@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('to_email', models.EmailField(help_text='Destinatário', max_length=254)),
+                ('from_email', models.CharField(blank=True, help_text='Remetente (vazio = DEFAULT_FROM_EMAIL)', max_length=254)),
+                ('subject', models.CharField(max_length=255)),
+                ('template_name', models.CharField(blank=True, help_text='Template HTML renderizado pelo worker (vazio = usar body_text/body_html)', max_length=200)),
+                ('context', models.JSONField(blank=True, default=dict, help_text='Contexto do template')),
+                ('locale', models.CharField(blank=True, help_text='Idioma do template (vazio = LANGUAGE_CODE)', max_length=10)),
+                ('body_text', models.TextField(blank=True)),
+                ('body_html', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('queued', 'Na fila'), ('sending', 'A enviar'), ('sent', 'Enviado'), ('failed', 'Falhou')], default='queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, help_text='Não enviar antes desta data (backoff)')),
+                ('locked_by', models.CharField(blank=True, help_text='Worker que está a enviar', max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Email',
+                'verbose_name_plural': 'Emails',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='mailer_outb_status_9a7ac2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboundEmail(models.Model):
+    """Email na fila de envio (processada pelo worker run_mail_worker)"""
+    STATUS_CHOICES = [
+        ('queued', 'Na fila'),
+        ('sending', 'A enviar'),
+        ('sent', 'Enviado'),
+        ('failed', 'Falhou'),
+    ]
+
+    to_email = models.EmailField(help_text="Destinatário")
+    from_email = models.CharField(max_length=254, blank=True, help_text="Remetente (vazio = DEFAULT_FROM_EMAIL)")
+    subject = models.CharField(max_length=255)
+    template_name = models.CharField(
+        max_length=200, blank=True,
+        help_text="Template HTML renderizado pelo worker (vazio = usar body_text/body_html)"
+    )
+    context = models.JSONField(default=dict, blank=True, help_text="Contexto do template")
+    locale = models.CharField(max_length=10, blank=True, help_text="Idioma do template (vazio = LANGUAGE_CODE)")
+    body_text = models.TextField(blank=True)
+    body_html = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Não enviar antes desta data (backoff)")
+    locked_by = models.CharField(max_length=100, blank=True, help_text="Worker que está a enviar")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Email'
+        verbose_name_plural = 'Emails'
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email} - {self.subject} ({self.get_status_display()})"
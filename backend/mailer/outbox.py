@@ -0,0 +1,186 @@
+"""
+Fila de emails na base de dados (sem broker externo).
+
+Os pedidos (ex.: aprovação de inscrições pelo admin) só gravam um OutboundEmail e
+respondem de imediato; o comando `run_mail_worker` reclama lotes da fila, renderiza os
+templates e envia-os por uma ligação SMTP reutilizada entre lotes. Erros temporários
+são repetidos com backoff exponencial; destinatários recusados falham de imediato.
+Os emails do mesmo template e idioma de cada lote são renderizados juntos (render_many).
+"""
+import logging
+import random
+import smtplib
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundEmail
+from .rendering import render_many
+
+logger = logging.getLogger(__name__)
+
+# Erros que não se resolvem com nova tentativa
+PERMANENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_email(to_email, subject, template_name='', context=None, locale='',
+                  body_text='', body_html='', from_email=''):
+    """Pôr um email na fila (template renderizado pelo worker, ou corpo já pronto)"""
+    return OutboundEmail.objects.create(
+        to_email=to_email,
+        from_email=from_email,
+        subject=subject,
+        template_name=template_name,
+        context=context or {},
+        locale=locale,
+        body_text=body_text,
+        body_html=body_html,
+        max_attempts=_setting('MAILER_MAX_ATTEMPTS', 5),
+    )
+
+
+def enqueue_emails(emails):
+    """Pôr vários emails na fila num só bulk_create; `emails` são dicts com os argumentos de enqueue_email"""
+    max_attempts = _setting('MAILER_MAX_ATTEMPTS', 5)
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(max_attempts=max_attempts, **email) for email in emails
+    ])
+
+
+def retry_delay(attempts):
+    """Backoff exponencial com jitter (em segundos) após `attempts` tentativas"""
+    base = _setting('MAILER_RETRY_BASE_SECONDS', 30)
+    cap = _setting('MAILER_RETRY_MAX_SECONDS', 3600)
+    delay = min(base * (2 ** max(attempts - 1, 0)), cap)
+    return delay + random.uniform(0, delay / 2)
+
+
+def requeue_stale_emails(now=None):
+    """Devolver à fila emails 'sending' cujo worker morreu (lock expirado)"""
+    now = now or timezone.now()
+    timeout = _setting('MAILER_LOCK_TIMEOUT_SECONDS', 600)
+    return OutboundEmail.objects.filter(
+        status='sending',
+        locked_at__lt=now - timedelta(seconds=timeout),
+    ).update(status='queued', locked_by='', locked_at=None, run_after=now)
+
+
+def claim_emails(worker_id, limit=50, now=None):
+    """
+    Reclamar até `limit` emails prontos com um UPDATE condicional (status='queued') e
+    um identificador de lote único, para dois workers nunca enviarem o mesmo email
+    """
+    now = now or timezone.now()
+    candidate_ids = list(
+        OutboundEmail.objects.filter(status='queued', run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    if not candidate_ids:
+        return []
+    claim = f'{worker_id}:{uuid.uuid4().hex[:8]}'
+    OutboundEmail.objects.filter(id__in=candidate_ids, status='queued').update(
+        status='sending',
+        locked_by=claim,
+        locked_at=now,
+        attempts=F('attempts') + 1,
+    )
+    return list(OutboundEmail.objects.filter(status='sending', locked_by=claim).order_by('run_after', 'id'))
+
+
+def render_bodies(emails):
+    """
+    (texto, html) de cada email, {id: partes}: os emails com template são agrupados por
+    template e idioma e renderizados em lote (render_many)
+    """
+    bodies = {}
+    groups = defaultdict(list)
+    for email in emails:
+        if email.template_name:
+            groups[(email.template_name, email.locale)].append(email)
+        else:
+            bodies[email.id] = (email.body_text, email.body_html)
+    for (template_name, locale), group in groups.items():
+        rendered = render_many(template_name, [email.context for email in group], locale=locale or None)
+        for email, parts in zip(group, rendered):
+            bodies[email.id] = parts
+    return bodies
+
+
+def build_message(email, body_text, body_html, connection=None):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=body_text,
+        from_email=email.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=[email.to_email],
+        connection=connection,
+    )
+    if body_html:
+        message.attach_alternative(body_html, 'text/html')
+    return message
+
+
+def _mark_failed_attempt(email, error, permanent=False):
+    email.last_error = str(error)
+    email.locked_by = ''
+    email.locked_at = None
+    if not permanent and email.attempts < email.max_attempts:
+        delay = retry_delay(email.attempts)
+        email.status = 'queued'
+        email.run_after = timezone.now() + timedelta(seconds=delay)
+        logger.warning(f"Email {email.id} failed (attempt {email.attempts}), retrying in {delay:.0f}s: {error}")
+    else:
+        email.status = 'failed'
+        logger.error(f"Email {email.id} gave up after {email.attempts} attempt(s): {error}")
+    email.save(update_fields=['status', 'last_error', 'locked_by', 'locked_at', 'run_after', 'updated_at'])
+
+
+def release_emails(emails, error):
+    """Devolver à fila (com backoff) emails reclamados que não chegaram a ser enviados"""
+    for email in emails:
+        _mark_failed_attempt(email, error)
+    return len(emails)
+
+
+def send_emails(emails, connection):
+    """
+    Enviar emails já reclamados pela ligação aberta `connection`. Os enviados são
+    marcados num só UPDATE; os falhados voltam à fila com backoff. Devolve (enviados, falhados).
+    """
+    sent_ids = []
+    failed = 0
+    try:
+        bodies = render_bodies(emails)
+    except Exception as e:
+        # Erro de template num lote: renderizar um a um para isolar os emails afetados
+        logger.warning(f"Batch rendering failed, rendering one by one: {e}")
+        bodies = {}
+    for email in emails:
+        try:
+            parts = bodies.get(email.id) or render_bodies([email])[email.id]
+            connection.send_messages([build_message(email, *parts, connection=connection)])
+        except Exception as e:
+            failed += 1
+            _mark_failed_attempt(email, e, permanent=isinstance(e, PERMANENT_ERRORS))
+            # A ligação pode ter ficado inutilizável: reabrir (fica fechada se o servidor estiver em baixo)
+            connection.close()
+            try:
+                connection.open()
+            except Exception as open_error:
+                logger.warning(f"Could not reopen SMTP connection: {open_error}")
+            continue
+        sent_ids.append(email.id)
+    if sent_ids:
+        OutboundEmail.objects.filter(id__in=sent_ids).update(
+            status='sent', locked_by='', locked_at=None, last_error='', sent_at=timezone.now()
+        )
+    return len(sent_ids), failed
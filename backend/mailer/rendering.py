@@ -0,0 +1,73 @@
+"""
+Renderização dos emails: os templates são carregados e compilados uma vez por
+processo, por template e idioma (emails/<locale>/<nome> se existir, senão <nome>).
+
+O HTML é renderizado uma vez e a parte de texto é derivada dele numa só passagem
+(expressões regulares compiladas, em vez do strip_tags iterativo, que além disso
+deixava o CSS do <style> no texto). Para envios em massa, render_many reutiliza o
+template e o mesmo Context para todos os destinatários.
+"""
+import html as html_lib
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.template import Context, TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils import translation
+
+# Blocos sem texto visível
+_INVISIBLE = re.compile(r'<(head|style|script|title)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+# Tags que terminam uma linha (blocos e <br>)
+_LINE_BREAK = re.compile(r'<br\s*/?>|</(p|div|h[1-6]|li|tr|table|ul|ol)\s*>', re.IGNORECASE)
+_TAG = re.compile(r'<[^>]+>')
+_SPACES = re.compile(r'[ \t\r\f\v]+')
+_BLANK_LINES = re.compile(r'\n\s*\n\s*')
+
+
+def default_locale():
+    return settings.LANGUAGE_CODE
+
+
+def _localized_name(template_name, locale):
+    head, _, tail = template_name.rpartition('/')
+    return f'{head}/{locale}/{tail}' if head else f'{locale}/{tail}'
+
+
+@lru_cache(maxsize=128)
+def load_template(template_name, locale):
+    """Template compilado para (nome, idioma); em cache durante a vida do processo"""
+    try:
+        return get_template(_localized_name(template_name, locale))
+    except TemplateDoesNotExist:
+        return get_template(template_name)
+
+
+def html_to_text(html):
+    """Parte de texto do email a partir do HTML renderizado (uma passagem)"""
+    text = _INVISIBLE.sub('', html)
+    text = _LINE_BREAK.sub('\n', text)
+    text = html_lib.unescape(_TAG.sub('', text))
+    text = _SPACES.sub(' ', text)
+    return _BLANK_LINES.sub('\n\n', text).strip()
+
+
+def render_email(template_name, context, locale=None):
+    """Devolve (texto, html) do template no idioma indicado"""
+    return next(render_many(template_name, [context], locale=locale))
+
+
+def render_many(template_name, contexts, locale=None, base_context=None):
+    """
+    Renderizar o template para vários destinatários: gera (texto, html) por contexto.
+    O contexto comum (base_context) é montado uma vez; o de cada destinatário é
+    empilhado e retirado do mesmo Context.
+    """
+    locale = locale or default_locale()
+    template = load_template(template_name, locale).template
+    context = Context(base_context or {}, autoescape=template.engine.autoescape)
+    with translation.override(locale):
+        for recipient_context in contexts:
+            with context.push(recipient_context):
+                html = template.render(context)
+            yield html_to_text(html), html
@@ -0,0 +1,147 @@
+import smtplib
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import OutboundEmail
+from .outbox import (
+    claim_emails, enqueue_email, enqueue_emails, render_bodies, requeue_stale_emails, send_emails,
+)
+from .rendering import html_to_text, render_email, render_many
+
+TEMPLATE = 'emails/enrollment_approved.html'
+
+
+class OutboxTests(TestCase):
+    def _enqueue(self, count=1, **kwargs):
+        return enqueue_emails([
+            dict(to_email=f'aluno{i}@example.com', subject='Olá', body_text='Texto', **kwargs)
+            for i in range(count)
+        ])
+
+    def test_an_email_is_never_claimed_twice(self):
+        self._enqueue(3)
+        first = claim_emails('worker-a', limit=2)
+        second = claim_emails('worker-b', limit=2)
+        third = claim_emails('worker-c')
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertEqual(third, [])
+        self.assertFalse({e.id for e in first} & {e.id for e in second})
+        self.assertTrue(all(e.status == 'sending' and e.attempts == 1 for e in first + second))
+
+    def test_claim_skips_emails_waiting_for_backoff(self):
+        enqueue_email('aluno@example.com', 'Olá', body_text='Texto')
+        OutboundEmail.objects.update(run_after=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(claim_emails('worker'), [])
+
+    def test_send_marks_emails_as_sent(self):
+        self._enqueue(2)
+        emails = claim_emails('worker')
+        self.assertEqual(send_emails(emails, get_connection()), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(OutboundEmail.objects.filter(status='sent', locked_by='').count(), 2)
+
+    @override_settings(MAILER_RETRY_BASE_SECONDS=30)
+    def test_temporary_failure_is_retried_with_backoff(self):
+        self._enqueue()
+        connection = mock.Mock()
+        connection.send_messages.side_effect = smtplib.SMTPServerDisconnected('ligação perdida')
+
+        before = timezone.now()
+        with self.assertLogs('mailer.outbox', 'WARNING'):
+            self.assertEqual(send_emails(claim_emails('worker'), connection), (0, 1))
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, 'queued')
+        self.assertEqual(email.locked_by, '')
+        self.assertIn('ligação perdida', email.last_error)
+        self.assertGreaterEqual(email.run_after, before + timedelta(seconds=30))
+        self.assertLessEqual(email.run_after, timezone.now() + timedelta(seconds=45))
+        connection.open.assert_called_once()
+
+    def test_refused_recipient_fails_permanently(self):
+        self._enqueue()
+        connection = mock.Mock()
+        connection.send_messages.side_effect = smtplib.SMTPRecipientsRefused({'aluno0@example.com': (550, b'no')})
+        with self.assertLogs('mailer.outbox', 'ERROR'):
+            send_emails(claim_emails('worker'), connection)
+        self.assertEqual(OutboundEmail.objects.get().status, 'failed')
+
+    def test_gives_up_after_max_attempts(self):
+        self._enqueue()
+        OutboundEmail.objects.update(attempts=4, max_attempts=5)
+        connection = mock.Mock()
+        connection.send_messages.side_effect = smtplib.SMTPServerDisconnected('ligação perdida')
+        with self.assertLogs('mailer.outbox', 'ERROR'):
+            send_emails(claim_emails('worker'), connection)
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('failed', 5))
+
+    @override_settings(MAILER_LOCK_TIMEOUT_SECONDS=600)
+    def test_stale_claims_are_requeued(self):
+        self._enqueue(2)
+        earlier = timezone.now() - timedelta(minutes=20)
+        OutboundEmail.objects.update(run_after=earlier)
+        self.assertEqual(len(claim_emails('worker', now=earlier)), 2)
+        self.assertEqual(requeue_stale_emails(), 2)
+        self.assertEqual(len(claim_emails('other')), 2)
+
+    @override_settings(MAILER_RETRY_BASE_SECONDS=30)
+    def test_worker_releases_the_batch_when_smtp_is_down(self):
+        self._enqueue(2)
+        connection = mock.Mock()
+        connection.open.side_effect = ConnectionRefusedError('servidor em baixo')
+        out = StringIO()
+        with mock.patch('mailer.management.commands.run_mail_worker.get_connection', return_value=connection), \
+                mock.patch('mailer.management.commands.run_mail_worker.time.sleep') as sleep, \
+                self.assertLogs('mailer.outbox', 'WARNING'):
+            # Sem --once: o worker sobrevive ao erro, dorme e volta ao ciclo (interrompido na 2.ª espera)
+            sleep.side_effect = [None, KeyboardInterrupt]
+            call_command('run_mail_worker', stdout=out)
+        self.assertIn('servidor em baixo', out.getvalue())
+        self.assertIn('2 com erro', out.getvalue())
+        for email in OutboundEmail.objects.all():
+            self.assertEqual((email.status, email.locked_by, email.attempts), ('queued', '', 1))
+            self.assertGreater(email.run_after, timezone.now())
+        connection.send_messages.assert_not_called()
+
+
+class RenderingTests(TestCase):
+    def _context(self, name):
+        return {
+            'user_name': name,
+            'course_title': 'Finanças <Pessoais>',
+            'course_description': 'Curso base',
+            'area_do_aluno_url': 'https://example.com/aluno',
+            'mobile_app_info': '',
+        }
+
+    def test_render_many_matches_render_email(self):
+        contexts = [self._context('Ana'), self._context('Rui')]
+        batch = list(render_many(TEMPLATE, contexts))
+        self.assertEqual(batch, [render_email(TEMPLATE, context) for context in contexts])
+        self.assertIn('Ana', batch[0][1])
+        self.assertNotIn('Ana', batch[1][1])
+        self.assertIn('Finanças &lt;Pessoais&gt;', batch[0][1])
+
+    def test_html_to_text_drops_invisible_blocks(self):
+        html = '<html><head><style>p { color: red; }</style></head><body><p>Olá&nbsp;Ana</p><p>Até já</p></body></html>'
+        self.assertEqual(html_to_text(html), 'Olá\xa0Ana\nAté já')
+
+    def test_outbox_renders_each_template_group_once(self):
+        emails = enqueue_emails([
+            dict(to_email=f'{name}@example.com', subject='Inscrição aprovada', template_name=TEMPLATE,
+                 context=self._context(name))
+            for name in ('ana', 'rui')
+        ])
+        with mock.patch('mailer.outbox.render_many', wraps=render_many) as batch:
+            bodies = render_bodies(emails)
+        batch.assert_called_once()
+        self.assertEqual(bodies[emails[1].id], render_email(TEMPLATE, self._context('rui')))
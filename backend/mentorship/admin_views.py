@@ -2,7 +2,10 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db import transaction
 from django.utils import timezone
+from courses.bulk import BULK_IDS_ERROR, parse_bulk_ids
+from subscriptions.access import invalidate_access
 from .models import MentorshipPackage, MentorshipRequest, MentorshipPaymentProof
 from .serializers import (
     MentorshipPackageSerializer, MentorshipRequestSerializer,
@@ -130,6 +133,31 @@ class AdminMentorshipRequestViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
+def bulk_approve_payment_proofs(ids, reviewer):
+    """
+    Aprovar os comprovantes pendentes de `ids` e aprovar os pedidos de mentoria com
+    UPDATEs em conjunto, numa transação. Devolve os IDs aprovados.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pending = dict(
+            MentorshipPaymentProof.objects.select_for_update()
+            .filter(id__in=ids, status='pending')
+            .values_list('id', 'request_id')
+        )
+        if not pending:
+            return []
+        MentorshipPaymentProof.objects.filter(id__in=pending).update(
+            status='approved', reviewed_by=reviewer, reviewed_at=now
+        )
+        MentorshipRequest.objects.filter(id__in=pending.values()).update(status='approved', updated_at=now)
+        # UPDATE não dispara signals: invalidar o acesso em cache destes usuários
+        invalidate_access(
+            MentorshipRequest.objects.filter(id__in=pending.values()).values_list('user_id', flat=True)
+        )
+    return sorted(pending)
+
+
 class AdminMentorshipPaymentProofViewSet(viewsets.ReadOnlyModelViewSet):
     """Gerenciamento de comprovantes de pagamento de mentoria para admin"""
     queryset = MentorshipPaymentProof.objects.all()
@@ -178,6 +206,25 @@ class AdminMentorshipPaymentProofViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(proof)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'], url_path='bulk-approve')
+    def bulk_approve(self, request):
+        """Aprovar vários comprovantes pendentes numa só transação. Body: ids (lista)"""
+        check = self.check_admin()
+        if check:
+            return check
+        
+        ids = parse_bulk_ids(request.data.get('ids'))
+        if ids is None:
+            return Response(
+                {'error': BULK_IDS_ERROR},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        approved = bulk_approve_payment_proofs(ids, request.user)
+        return Response({
+            'approved': approved,
+            'skipped': sorted(set(ids) - set(approved)),
+        })
+    
     @action(detail=True, methods=['post'], url_path='reject')
     def reject(self, request, pk=None):
         """Rejeitar comprovante de pagamento"""
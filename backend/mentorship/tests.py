@@ -0,0 +1,64 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from subscriptions.access import has_app_access
+
+from .admin_views import bulk_approve_payment_proofs
+from .models import MentorshipPackage, MentorshipPaymentProof, MentorshipRequest
+
+User = get_user_model()
+
+
+class MentorshipBulkApproveTests(TestCase):
+    url = '/api/mentorship/admin/payment-proofs/bulk-approve/'
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass12345', is_staff=True
+        )
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+        package = MentorshipPackage.objects.create(
+            title='Mentoria', description='Sessão individual', duration_minutes=60, price=Decimal('20000')
+        )
+        self.request = MentorshipRequest.objects.create(
+            user=self.user, package=package, objective='Organizar finanças', availability='Manhãs', contact='923000000'
+        )
+        self.proof = MentorshipPaymentProof.objects.create(request=self.request, file='proofs/comprovativo.pdf')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_approves_requests_and_grants_app_access(self):
+        self.assertFalse(has_app_access(self.user))
+
+        response = self.client.post(self.url, {'ids': [self.proof.id, 9999]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'approved': [self.proof.id], 'skipped': [9999]})
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.status, 'approved')
+        self.assertTrue(has_app_access(self.user))
+
+    def test_bulk_approve_helper_skips_reviewed_proofs(self):
+        other = MentorshipRequest.objects.create(
+            user=self.user, package=self.request.package, objective='Poupar', availability='Tardes', contact='923000000'
+        )
+        rejected = MentorshipPaymentProof.objects.create(request=other, file='proofs/outro.pdf', status='rejected')
+        with self.assertNumQueries(5):
+            approved = bulk_approve_payment_proofs([self.proof.id, rejected.id], self.admin)
+        self.assertEqual(approved, [self.proof.id])
+        self.proof.refresh_from_db()
+        rejected.refresh_from_db()
+        self.assertEqual((self.proof.status, self.proof.reviewed_by), ('approved', self.admin))
+        self.assertEqual(rejected.status, 'rejected')
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.status, 'approved')
+
+        self.assertEqual(bulk_approve_payment_proofs([self.proof.id], self.admin), [])
+
+    def test_rejects_invalid_ids(self):
+        response = self.client.post(self.url, {'ids': [None]}, format='json')
+        self.assertEqual(response.status_code, 400)
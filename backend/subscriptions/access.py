@@ -0,0 +1,119 @@
+"""
+Cache do acesso ao app móvel por usuário.
+
+Tem acesso quem tem uma inscrição ativa num curso, uma mentoria aprovada/agendada/
+concluída, ou subscrição do app com has_access (a mesma regra do app móvel, ver README).
+
+Guarda o instante (timestamp) até ao qual o usuário tem acesso, e não um booleano:
+a verificação em cada pedido é uma comparação com a hora atual, sem query, e o
+acesso termina sozinho quando o trial/período pago acaba. Cada gravação de uma
+subscrição, inscrição ou mentoria (signals) recalcula a entrada do usuário; os
+UPDATEs em massa apagam-na (invalidate_access). Sem nenhuma das duas, expira após
+SUBSCRIPTION_ACCESS_CACHE_SECONDS.
+
+Sem cache partilhada entre processos (settings.SHARED_CACHE), a atualização não
+chegaria aos outros workers: nesse caso o acesso é lido da base de dados a cada
+verificação (uma query) e nada é guardado em cache.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from courses.models import Enrollment
+from mentorship.models import MentorshipRequest
+
+NO_ACCESS = 0
+# Cursos/mentorias, e subscrições trial/ativas sem data de fim (como em MobileAppSubscription.has_access)
+UNLIMITED = float('inf')
+MENTORSHIP_ACCESS_STATUSES = ('approved', 'scheduled', 'completed')
+
+
+def _key(user_id):
+    return f'subscriptions:access:{user_id}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'SUBSCRIPTION_ACCESS_CACHE_SECONDS', 300)
+
+
+def _use_cache():
+    return getattr(settings, 'SHARED_CACHE', False)
+
+
+def _subscription_expires_at(status, trial_ends_at, subscription_ends_at):
+    if status not in ('trial', 'active'):
+        return NO_ACCESS
+    end = trial_ends_at if status == 'trial' else subscription_ends_at
+    return end.timestamp() if end else UNLIMITED
+
+
+def compute_access_until(user_id):
+    """Timestamp até ao qual o usuário tem acesso (uma query)"""
+    row = (
+        get_user_model().objects.filter(pk=user_id)
+        .annotate(
+            has_course=Exists(Enrollment.objects.filter(user=OuterRef('pk'), status='active')),
+            has_mentorship=Exists(MentorshipRequest.objects.filter(
+                user=OuterRef('pk'), status__in=MENTORSHIP_ACCESS_STATUSES
+            )),
+        )
+        .values(
+            'has_course', 'has_mentorship', 'mobile_app_subscription__status',
+            'mobile_app_subscription__trial_ends_at', 'mobile_app_subscription__subscription_ends_at',
+        )
+        .first()
+    )
+    if row is None:
+        return NO_ACCESS
+    if row['has_course'] or row['has_mentorship']:
+        return UNLIMITED
+    return _subscription_expires_at(
+        row['mobile_app_subscription__status'],
+        row['mobile_app_subscription__trial_ends_at'],
+        row['mobile_app_subscription__subscription_ends_at'],
+    )
+
+
+def access_until(user_id):
+    if not _use_cache():
+        return compute_access_until(user_id)
+    expires_at = cache.get(_key(user_id))
+    if expires_at is None:
+        expires_at = compute_access_until(user_id)
+        cache.set(_key(user_id), expires_at, timeout=_cache_timeout())
+    return expires_at
+
+
+def has_app_access(user):
+    """Usuário tem acesso ao app (admins têm sempre); sem query se estiver em cache partilhada"""
+    if user.is_staff or user.is_superuser:
+        return True
+    return time.time() < access_until(user.id)
+
+
+def _on_commit_too(action):
+    """Aplicar já e outra vez após o commit, para não ficar em cache o estado anterior"""
+    action()
+    transaction.on_commit(action)
+
+
+def refresh_access(user_id):
+    """Recalcular e gravar em cache o acesso do usuário (após save/delete)"""
+    if not _use_cache():
+        return
+    def refresh():
+        cache.set(_key(user_id), compute_access_until(user_id), timeout=_cache_timeout())
+    _on_commit_too(refresh)
+
+
+def invalidate_access(user_ids):
+    """Apagar o acesso em cache dos usuários (ex.: após um UPDATE em massa)"""
+    if not _use_cache():
+        return
+    keys = [_key(user_id) for user_id in user_ids]
+    if keys:
+        _on_commit_too(lambda: cache.delete_many(keys))
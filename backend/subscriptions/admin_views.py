@@ -6,10 +6,16 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
+from django.db.models import Case, F, When
 from django.utils import timezone
 from datetime import timedelta
+from collections import Counter
+
+from courses.bulk import BULK_IDS_ERROR, parse_bulk_ids
 
 from .models import MobileAppSubscription, MobileAppSubscriptionPaymentProof
+from .access import invalidate_access
 from .serializers import (
     AdminMobileAppSubscriptionSerializer,
     AdminMobileAppSubscriptionPaymentProofSerializer,
@@ -25,6 +31,46 @@ def check_admin(request):
     return None
 
 
+def bulk_approve_payment_proofs(ids, reviewer):
+    """
+    Aprovar os comprovativos pendentes de `ids` e ativar/renovar as subscrições com
+    UPDATEs em conjunto: +30 dias por comprovativo, a partir do fim atual se ainda
+    estiver no futuro (como na aprovação individual). Devolve os IDs aprovados.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pending = dict(
+            MobileAppSubscriptionPaymentProof.objects.select_for_update()
+            .filter(id__in=ids, status='pending')
+            .values_list('id', 'subscription_id')
+        )
+        if not pending:
+            return []
+        MobileAppSubscriptionPaymentProof.objects.filter(id__in=pending).update(
+            status='approved', reviewed_by=reviewer, reviewed_at=now
+        )
+        # Um UPDATE por número de comprovativos aprovados por subscrição (normalmente 1)
+        by_count = {}
+        for subscription_id, count in Counter(pending.values()).items():
+            by_count.setdefault(count, []).append(subscription_id)
+        for count, subscription_ids in by_count.items():
+            extension = timedelta(days=30 * count)
+            MobileAppSubscription.objects.filter(id__in=subscription_ids).update(
+                subscription_ends_at=Case(
+                    When(subscription_ends_at__gt=now, then=F('subscription_ends_at') + extension),
+                    default=now + extension,
+                ),
+                status='active',
+                expiry_reminder_sent_at=None,
+                updated_at=now,
+            )
+        # UPDATE não dispara signals: invalidar o acesso em cache destes usuários
+        invalidate_access(
+            MobileAppSubscription.objects.filter(id__in=set(pending.values())).values_list('user_id', flat=True)
+        )
+    return sorted(pending)
+
+
 class AdminMobileAppSubscriptionViewSet(viewsets.ReadOnlyModelViewSet):
     """List and manage mobile app subscriptions (admin only)."""
     queryset = MobileAppSubscription.objects.all().select_related('user').order_by('-created_at')
@@ -129,6 +175,23 @@ class AdminMobileAppSubscriptionPaymentProofViewSet(viewsets.ReadOnlyModelViewSe
         serializer = self.get_serializer(proof)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='bulk-approve')
+    def bulk_approve(self, request):
+        """Aprovar vários comprovativos pendentes numa só transação. Body: ids (lista)"""
+        if check_admin(request):
+            return check_admin(request)
+        ids = parse_bulk_ids(request.data.get('ids'))
+        if ids is None:
+            return Response(
+                {'error': BULK_IDS_ERROR},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        approved = bulk_approve_payment_proofs(ids, request.user)
+        return Response({
+            'approved': approved,
+            'skipped': sorted(set(ids) - set(approved)),
+        })
+
     @action(detail=True, methods=['post'], url_path='reject')
     def reject(self, request, pk=None):
         """Rejeitar comprovativo."""
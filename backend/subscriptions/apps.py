@@ -5,3 +5,7 @@ class SubscriptionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'subscriptions'
     verbose_name = 'Subscrições App Móvel'
+
+    def ready(self):
+        import subscriptions.checks  # noqa
+        import subscriptions.signals  # noqa
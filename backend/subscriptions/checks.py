@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """Em produção, avisar quando a cache não é partilhada entre processos"""
+    if settings.DEBUG or getattr(settings, 'SHARED_CACHE', False):
+        return []
+    return [
+        Warning(
+            'A cache não é partilhada entre processos: o acesso ao app (HasAppAccess) é lido da base de dados a cada pedido.',
+            hint='Configure CACHE_BACKEND/CACHE_LOCATION (ex.: Redis) e SHARED_CACHE=True.',
+            id='subscriptions.W001',
+        )
+    ]
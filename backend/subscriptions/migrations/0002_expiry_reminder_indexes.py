@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0001_mobile_app_subscription'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mobileappsubscription',
+            index=models.Index(fields=['status', 'trial_ends_at'], name='subs_status_trial_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mobileappsubscription',
+            index=models.Index(fields=['status', 'subscription_ends_at'], name='subs_status_sub_end_idx'),
+        ),
+    ]
@@ -3,6 +3,9 @@ from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 
+# Semana grátis ao subscrever
+TRIAL_DAYS = 7
+
 
 class MobileAppSubscription(models.Model):
     """
@@ -46,13 +49,18 @@ class MobileAppSubscription(models.Model):
         verbose_name = 'Subscrição App Móvel'
         verbose_name_plural = 'Subscrições App Móvel'
         ordering = ['-created_at']
+        indexes = [
+            # Seleção por intervalo de datas dos avisos de expiração (subscriptions/reminders.py)
+            models.Index(fields=['status', 'trial_ends_at'], name='subs_status_trial_end_idx'),
+            models.Index(fields=['status', 'subscription_ends_at'], name='subs_status_sub_end_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.get_status_display()}"
 
     def save(self, *args, **kwargs):
         if not self.pk and not self.trial_ends_at:
-            self.trial_ends_at = timezone.now() + timedelta(days=7)
+            self.trial_ends_at = timezone.now() + timedelta(days=TRIAL_DAYS)
         super().save(*args, **kwargs)
 
     @property
@@ -0,0 +1,12 @@
+from rest_framework.permissions import BasePermission
+
+from .access import has_app_access
+
+
+class HasAppAccess(BasePermission):
+    """Acesso às APIs do app móvel (finanças, tarefas, copilot): trial ou subscrição ativa"""
+    message = 'Subscrição do app necessária. O período de teste ou a subscrição terminou.'
+    code = 'subscription_required'
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and has_app_access(request.user))
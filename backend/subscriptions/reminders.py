@@ -0,0 +1,116 @@
+"""
+Aviso por email 3 dias antes do fim da subscrição do app móvel (trial ou paga).
+
+As subscrições são selecionadas com um filtro de intervalo de datas em SQL (fim entre
+agora e o fim do dia daqui a 3 dias, sem aviso enviado), por isso uma execução falhada
+ou em falta é recuperada na execução seguinte. Os emails saem por uma única ligação
+SMTP reutilizada, em lotes; após cada lote, as subscrições com envio bem-sucedido são
+marcadas (expiry_reminder_sent_at) num só UPDATE e as que falharam ficam para a
+próxima execução.
+
+Como a seleção inclui quem termina antes do dia+3 (execuções em falta, subscrições
+criadas perto do fim), o assunto indica os dias que faltam a cada destinatário.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import MobileAppSubscription
+
+REMINDER_DAYS = 3
+DEFAULT_BATCH_SIZE = 100
+
+SUBJECT = 'Zenda – A sua subscrição {when}'
+
+
+def expiring_subscriptions(now=None, days=REMINDER_DAYS):
+    """Subscrições ativas/trial que terminam até ao fim do dia `days` (TIME_ZONE), sem aviso"""
+    now = now or timezone.now()
+    limit = timezone.make_aware(
+        datetime.combine(timezone.localdate(now) + timedelta(days=days + 1), time.min)
+    )
+    return MobileAppSubscription.objects.filter(
+        Q(status='trial', trial_ends_at__gt=now, trial_ends_at__lt=limit)
+        | Q(status='active', subscription_ends_at__gt=now, subscription_ends_at__lt=limit),
+        expiry_reminder_sent_at__isnull=True,
+    ).select_related('user')
+
+
+def end_date(sub):
+    end = sub.trial_ends_at if sub.status == 'trial' else sub.subscription_ends_at
+    return timezone.localtime(end).date()
+
+
+def days_left(sub, now=None):
+    """Dias de calendário (TIME_ZONE) até ao fim da subscrição"""
+    return (end_date(sub) - timezone.localdate(now or timezone.now())).days
+
+
+def expires_in(days):
+    if days <= 0:
+        return 'expira hoje'
+    if days == 1:
+        return 'expira amanhã'
+    return f'expira em {days} dias'
+
+
+def build_subject(sub, now=None):
+    return SUBJECT.format(when=expires_in(days_left(sub, now)))
+
+
+def build_message(sub, connection=None, now=None):
+    user = sub.user
+    body = (
+        f'Olá {user.first_name or user.email},\n\n'
+        f'A sua subscrição do app Zenda expira no dia {end_date(sub)}.\n\n'
+        'Para continuar a usar o app, faça o pagamento da renovação mensal e '
+        'envie o comprovativo na aplicação (ou entre em contacto connosco).\n\n'
+        'Obrigado,\n'
+        'Equipa Rubiane Joaquim Educação Financeira'
+    )
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@rubianejoaquim.com')
+    return EmailMessage(build_subject(sub, now), body, from_email, [user.email], connection=connection)
+
+
+def send_expiry_reminders(now=None, days=REMINDER_DAYS, batch_size=DEFAULT_BATCH_SIZE, on_result=None):
+    """
+    Enviar os avisos em lotes por uma única ligação. `on_result(sub, error)` é chamado
+    por subscrição (error=None se enviado). Devolve (enviados, falhados).
+    """
+    now = now or timezone.now()
+    queryset = expiring_subscriptions(now, days)
+    sent = failed = 0
+    last_pk = 0
+    connection = get_connection(fail_silently=False)
+    with connection:
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            delivered = []
+            try:
+                for sub in batch:
+                    try:
+                        # Uma mensagem por chamada, para saber exatamente quais foram enviadas
+                        connection.send_messages([build_message(sub, connection, now)])
+                    except Exception as exc:
+                        failed += 1
+                        if on_result:
+                            on_result(sub, exc)
+                        # A ligação pode ter ficado inutilizável: reabrir para o resto do lote
+                        connection.close()
+                        connection.open()
+                        continue
+                    delivered.append(sub.pk)
+                    if on_result:
+                        on_result(sub, None)
+            finally:
+                # Marcar os enviados mesmo se o lote for interrompido (sem avisos repetidos)
+                if delivered:
+                    MobileAppSubscription.objects.filter(pk__in=delivered).update(expiry_reminder_sent_at=now)
+                sent += len(delivered)
+    return sent, failed
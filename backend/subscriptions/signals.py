@@ -0,0 +1,22 @@
+"""
+Signals das subscrições - manter o acesso ao app em cache (subscriptions/access.py)
+quando mudam subscrições, inscrições em cursos ou mentorias
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from courses.models import Enrollment
+from mentorship.models import MentorshipRequest
+
+from .access import refresh_access
+from .models import MobileAppSubscription
+
+
+@receiver(post_save, sender=MobileAppSubscription)
+@receiver(post_delete, sender=MobileAppSubscription)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_save, sender=MentorshipRequest)
+@receiver(post_delete, sender=MentorshipRequest)
+def refresh_app_access(sender, instance, **kwargs):
+    refresh_access(instance.user_id)
@@ -0,0 +1,172 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from django.utils import timezone
+
+from courses.models import Course, Enrollment
+
+from .access import has_app_access
+from .admin_views import bulk_approve_payment_proofs
+from .models import MobileAppSubscription, MobileAppSubscriptionPaymentProof
+from .reminders import send_expiry_reminders
+
+User = get_user_model()
+
+
+class ExpiryReminderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+
+    def _subscription(self, name, days, status='trial'):
+        user = User.objects.create_user(email=f'{name}@example.com', username=name, password='pass12345')
+        end = self.now + timedelta(days=days)
+        if status == 'trial':
+            return MobileAppSubscription.objects.create(user=user, status=status, trial_ends_at=end)
+        return MobileAppSubscription.objects.create(user=user, status=status, subscription_ends_at=end)
+
+    def test_reminds_subscriptions_ending_within_three_days_once(self):
+        trial = self._subscription('ana', 2)
+        paid = self._subscription('rui', 1, status='active')
+        self._subscription('later', 10)
+        self._subscription('ended', -1)
+
+        self.assertEqual(send_expiry_reminders(now=self.now, batch_size=1), (2, 0))
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['ana@example.com', 'rui@example.com'])
+        subjects = {m.to[0]: m.subject for m in mail.outbox}
+        self.assertEqual(subjects['ana@example.com'], 'Zenda – A sua subscrição expira em 2 dias')
+        self.assertEqual(subjects['rui@example.com'], 'Zenda – A sua subscrição expira amanhã')
+        for sub in (trial, paid):
+            sub.refresh_from_db()
+            self.assertEqual(sub.expiry_reminder_sent_at, self.now)
+
+        self.assertEqual(send_expiry_reminders(now=self.now), (0, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_failed_sends_are_retried_on_the_next_run(self):
+        self._subscription('ana', 2)
+        failing = self._subscription('rui', 2)
+        backend = 'django.core.mail.backends.locmem.EmailBackend.send_messages'
+
+        def send(messages):
+            if messages[0].to == ['rui@example.com']:
+                raise ConnectionError('SMTP indisponível')
+            mail.outbox.extend(messages)
+            return len(messages)
+
+        results = []
+        with mock.patch(backend, side_effect=send):
+            sent = send_expiry_reminders(now=self.now, on_result=lambda sub, error: results.append(error))
+        self.assertEqual(sent, (1, 1))
+        self.assertEqual(sum(error is not None for error in results), 1)
+        failing.refresh_from_db()
+        self.assertIsNone(failing.expiry_reminder_sent_at)
+
+        self.assertEqual(send_expiry_reminders(now=self.now), (1, 0))
+        self.assertEqual([m.to[0] for m in mail.outbox], ['ana@example.com', 'rui@example.com'])
+
+
+class SubscriptionBulkApproveTests(TestCase):
+    url = '/api/subscriptions/admin/payment-proofs/bulk-approve/'
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass12345', is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _proof(self, name, **subscription):
+        user = User.objects.create_user(email=f'{name}@example.com', username=name, password='pass12345')
+        sub = MobileAppSubscription.objects.create(user=user, **subscription)
+        return MobileAppSubscriptionPaymentProof.objects.create(subscription=sub, file='proofs/comprovativo.pdf')
+
+    def test_extends_from_the_current_end_or_from_now(self):
+        now = timezone.now()
+        renewing = self._proof('ana', status='active', subscription_ends_at=now + timedelta(days=10))
+        expired = self._proof('rui', status='expired', subscription_ends_at=now - timedelta(days=10))
+
+        response = self.client.post(self.url, {'ids': [renewing.id, expired.id, renewing.id]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['approved'], sorted([renewing.id, expired.id]))
+
+        renewing.subscription.refresh_from_db()
+        expired.subscription.refresh_from_db()
+        self.assertEqual(renewing.subscription.status, 'active')
+        self.assertEqual(renewing.subscription.subscription_ends_at, now + timedelta(days=40))
+        self.assertEqual(expired.subscription.status, 'active')
+        self.assertGreaterEqual(expired.subscription.subscription_ends_at, now + timedelta(days=30))
+
+    def test_rejects_too_many_ids(self):
+        response = self.client.post(self.url, {'ids': list(range(501))}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class AppAccessPermissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _list(self):
+        return self.client.get('/api/ai-copilot/conversations/')
+
+    def test_requires_trial_or_active_subscription(self):
+        response = self._list()
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['detail'].code, 'subscription_required')
+
+        subscription = MobileAppSubscription.objects.create(user=self.user, status='trial')
+        self.assertEqual(self._list().status_code, 200)
+
+        subscription.status = 'cancelled'
+        subscription.save()
+        self.assertEqual(self._list().status_code, 403)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_cached_check_needs_no_query_and_honours_expiry(self):
+        MobileAppSubscription.objects.create(user=self.user, status='trial', trial_ends_at=timezone.now() + timedelta(seconds=60))
+        self.assertTrue(has_app_access(self.user))
+        with self.assertNumQueries(0):
+            self.assertTrue(has_app_access(self.user))
+        with mock.patch('subscriptions.access.time.time', return_value=time.time() + 120), self.assertNumQueries(0):
+            self.assertFalse(has_app_access(self.user))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_without_shared_cache_every_check_reads_the_database(self):
+        MobileAppSubscription.objects.create(user=self.user, status='trial')
+        with self.assertNumQueries(1):
+            self.assertTrue(has_app_access(self.user))
+        # Escrita sem signals (como noutro processo): visível na verificação seguinte
+        MobileAppSubscription.objects.filter(user=self.user).update(status='cancelled')
+        self.assertFalse(has_app_access(self.user))
+
+    @override_settings(SHARED_CACHE=True)
+    def test_bulk_approval_invalidates_cached_access(self):
+        subscription = MobileAppSubscription.objects.create(user=self.user, status='expired')
+        self.assertFalse(has_app_access(self.user))
+        proof = MobileAppSubscriptionPaymentProof.objects.create(subscription=subscription, file='proof.pdf')
+        bulk_approve_payment_proofs([proof.id], reviewer=None)
+        self.assertTrue(has_app_access(self.user))
+
+    def test_active_course_enrollment_grants_access(self):
+        course = Course.objects.create(title='Finanças', slug='financas', description='-', price=Decimal('1000'))
+        enrollment = Enrollment.objects.create(user=self.user, course=course, status='pending')
+        self.assertEqual(self._list().status_code, 403)
+        enrollment.status = 'active'
+        enrollment.save()
+        self.assertEqual(self._list().status_code, 200)
+
+    def test_staff_bypasses_subscription(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self._list().status_code, 200)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import TaskCategory, Task, Target, Notification
+from .models import TaskCategory, Task, Target, Notification, NotificationArchive, NotificationCounter
 
 
 @admin.register(TaskCategory)
@@ -31,3 +31,18 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'title', 'message']
     date_hierarchy = 'created_at'
     readonly_fields = ['read_at']
+
+
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    list_display = ['user', 'title', 'notification_type', 'created_at', 'archived_at']
+    list_filter = ['notification_type', 'created_at']
+    search_fields = ['user__username', 'title']
+    date_hierarchy = 'created_at'
+
+
+@admin.register(NotificationCounter)
+class NotificationCounterAdmin(admin.ModelAdmin):
+    list_display = ['user', 'unread', 'version']
+    search_fields = ['user__username']
+    readonly_fields = ['unread', 'version']
@@ -5,3 +5,7 @@ class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tasks'
     verbose_name = 'Tarefas e Metas'
+
+    def ready(self):
+        import tasks.checks  # noqa
+        import tasks.signals  # noqa
@@ -0,0 +1,131 @@
+"""
+Contador de notificações não lidas por usuário (NotificationCounter).
+
+O unread_count é consultado em polling pela app; em vez de COUNT(*) sobre as
+notificações a cada pedido, lê-se uma linha por chave primária. O contador é mantido
+com UPDATEs atómicos (F) quando as notificações são criadas, lidas ou apagadas:
+
+- criação individual: signal em tasks/signals.py
+- apagar: delete() abaixo (DELETE da API). Notification não tem receivers de delete,
+  por isso os DELETE por queryset (retenção, que só apaga lidas) não carregam as
+  linhas para emitir signals
+- criação em lote: NotificationBuffer.flush (as notificações com dedupe_key podem ser
+  descartadas pela base de dados, por isso esses usuários são recontados)
+- mark_read / mark_all_read / PATCH de is_read: tasks/views.py
+
+Se o contador divergir (escritas fora destes caminhos), o comando
+repair_notification_counters recalcula-o em bloco.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Notification, NotificationCounter
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _ensure(user_ids):
+    if not user_ids:
+        return
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+
+
+def adjust(deltas):
+    """
+    Somar `deltas` ({user_id: delta}) aos contadores (um UPDATE por valor de delta).
+    Só os incrementos criam o contador em falta; sem linha, o valor é recalculado na
+    primeira leitura (get_counter)
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    _ensure([user_id for user_id, delta in deltas.items() if delta > 0])
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        by_delta[delta].append(user_id)
+    for delta, user_ids in by_delta.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(
+            unread=Greatest(F('unread') + delta, Value(0)),
+            version=F('version') + 1,
+        )
+
+
+def recount(user_ids):
+    """Recalcular os contadores dos usuários indicados (um UPDATE com subquery)"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    _ensure(user_ids)
+    unread = (
+        Notification.objects.filter(user_id=OuterRef('user_id'), is_read=False)
+        .order_by()
+        .values('user_id')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    NotificationCounter.objects.filter(user_id__in=user_ids).update(
+        unread=Coalesce(Subquery(unread, output_field=IntegerField()), Value(0)),
+        version=F('version') + 1,
+    )
+
+
+def get_counter(user_id):
+    """Contador do usuário (criado com um recount se ainda não existir)"""
+    counter = NotificationCounter.objects.filter(user_id=user_id).first()
+    if counter is None:
+        recount([user_id])
+        counter = NotificationCounter.objects.get(user_id=user_id)
+    return counter
+
+
+def mark_read(notification):
+    """Marcar como lida; o contador só desce se a notificação ainda não estava lida"""
+    now = timezone.now()
+    updated = Notification.objects.filter(pk=notification.pk, is_read=False).update(
+        is_read=True, read_at=now
+    )
+    if updated:
+        adjust({notification.user_id: -updated})
+    notification.refresh_from_db(fields=['is_read', 'read_at'])
+    return notification
+
+
+def mark_all_read(user_id):
+    """Marcar todas como lidas; desconta exatamente as linhas atualizadas"""
+    updated = Notification.objects.filter(user_id=user_id, is_read=False).update(
+        is_read=True, read_at=timezone.now()
+    )
+    if updated:
+        adjust({user_id: -updated})
+    return updated
+
+
+def delete(notification):
+    """Apagar a notificação; o contador só desce se ela ainda não estava lida"""
+    unread, _ = Notification.objects.filter(pk=notification.pk, is_read=False).delete()
+    if unread:
+        adjust({notification.user_id: -unread})
+    else:
+        Notification.objects.filter(pk=notification.pk).delete()
+
+
+def repair(batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Recalcular os contadores de todos os usuários com notificações ou contador, em
+    lotes; devolve o número de usuários processados
+    """
+    user_ids = sorted(
+        set(Notification.objects.filter(is_read=False).values_list('user_id', flat=True).distinct())
+        | set(NotificationCounter.objects.filter(~Q(unread=0)).values_list('user_id', flat=True))
+    )
+    for start in range(0, len(user_ids), batch_size):
+        recount(user_ids[start:start + batch_size])
+        if progress:
+            progress(min(start + batch_size, len(user_ids)), len(user_ids))
+    return len(user_ids)
@@ -0,0 +1,55 @@
+"""
+Management command para arquivar notificações lidas antigas (retenção).
+Correr diariamente (cron), por exemplo:
+    python manage.py archive_notifications --days 90
+"""
+from django.core.management.base import BaseCommand
+
+from tasks.retention import DEFAULT_BATCH_SIZE, archive_notifications, expired_notifications, retention_days
+
+
+class Command(BaseCommand):
+    help = 'Move notificações lidas mais antigas que N dias para o arquivo (ou apaga-as)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Idade mínima em dias (padrão: NOTIFICATION_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Notificações por lote (uma transação curta por lote)',
+        )
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Apagar em vez de arquivar',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas contar as notificações que seriam processadas',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else retention_days()
+        total = expired_notifications(days).count()
+        action = 'apagar' if options['delete'] else 'arquivar'
+        self.stdout.write(f'{total} notificação(ões) lida(s) com mais de {days} dias para {action}.')
+        if options['dry_run'] or not total:
+            return
+
+        def progress(processed):
+            self.stdout.write(f'  {processed}/{total} ({processed * 100 // total}%)')
+
+        processed = archive_notifications(
+            days=days,
+            batch_size=max(options['batch_size'], 1),
+            delete=options['delete'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Total de {processed} notificação(ões) processada(s).'))
@@ -0,0 +1,26 @@
+"""
+Management command para recalcular os contadores de notificações não lidas
+(NotificationCounter) em bloco, se divergirem das notificações.
+"""
+from django.core.management.base import BaseCommand
+
+from tasks.counters import DEFAULT_BATCH_SIZE, repair
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os contadores de notificações não lidas de todos os usuários'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Usuários por UPDATE',
+        )
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            self.stdout.write(f'  {done}/{total} usuário(s)')
+
+        total = repair(batch_size=max(options['batch_size'], 1), progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Total de {total} contador(es) recalculado(s).'))
@@ -0,0 +1,66 @@
+"""
+Daemon de lembretes (tarefas e objetivos) com disparo no momento exato.
+Executar como processo de longa duração, em vez do cron de check_task_reminders:
+    python manage.py run_reminder_daemon
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from tasks.scheduler import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = 'Mantém os lembretes próximos em memória e cria as notificações no momento exato'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--refresh-seconds',
+            type=float,
+            default=30,
+            help='Intervalo entre leituras incrementais da base de dados',
+        )
+        parser.add_argument(
+            '--horizon-minutes',
+            type=int,
+            default=60,
+            help='Minutos à frente carregados para memória',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Carregar, disparar os lembretes vencidos e sair (útil para testes)',
+        )
+
+    def handle(self, *args, **options):
+        refresh_interval = timedelta(seconds=max(options['refresh_seconds'], 1))
+        scheduler = ReminderScheduler(horizon=timedelta(minutes=max(options['horizon_minutes'], 1)))
+        sent = 0
+
+        scheduler.refresh()
+        next_refresh = timezone.now() + refresh_interval
+        self.stdout.write(self.style.SUCCESS(f'Daemon de lembretes iniciado ({len(scheduler)} agendado(s)).'))
+        try:
+            while True:
+                now = timezone.now()
+                for obj in scheduler.fire_due(now):
+                    sent += 1
+                    self.stdout.write(f'  Lembrete enviado: {obj.title} (ID: {obj.id}) - Usuário: {obj.user_id}')
+
+                if options['once']:
+                    break
+
+                if now >= next_refresh:
+                    close_old_connections()
+                    scheduler.refresh(now)
+                    next_refresh = now + refresh_interval
+
+                wake_at = min(filter(None, [scheduler.next_fire_at(), next_refresh]))
+                time.sleep(max((wake_at - timezone.now()).total_seconds(), 0))
+        except KeyboardInterrupt:
+            self.stdout.write('Daemon interrompido.')
+
+        self.stdout.write(self.style.SUCCESS(f'Total de {sent} lembrete(s) enviado(s).'))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('task_reminder', 'Lembrete de Tarefa'), ('target_milestone', 'Marco de Meta'), ('goal_achievement', 'Conquista de Objetivo'), ('goal_reminder', 'Lembrete de Objetivo'), ('payment_due', 'Pagamento Vencendo'), ('system', 'Sistema'), ('achievement', 'Conquista'), ('reminder', 'Lembrete')], default='system', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['due_date', 'due_time'], name='tasks_task_due_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:09
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def backfill_remind_at(apps, schema_editor):
+    """remind_at = vencimento (TIME_ZONE; só data = fim do dia) - 5 minutos"""
+    Task = apps.get_model('tasks', 'Task')
+    batch = []
+    for task in Task.objects.filter(due_date__isnull=False).only('id', 'due_date', 'due_time').iterator(chunk_size=BATCH_SIZE):
+        due = timezone.make_aware(datetime.combine(task.due_date, task.due_time or time.max))
+        task.remind_at = due - timedelta(minutes=5)
+        batch.append(task)
+        if len(batch) >= BATCH_SIZE:
+            Task.objects.bulk_update(batch, ['remind_at'])
+            batch = []
+    if batch:
+        Task.objects.bulk_update(batch, ['remind_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_due_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_task_due_idx',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='remind_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Momento do lembrete (5 minutos antes do vencimento), calculado ao salvar', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['remind_at'], name='tasks_task_remind_at_idx'),
+        ),
+        migrations.RunPython(backfill_remind_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_reminder_daemon_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='recurrence_parent',
+            field=models.ForeignKey(blank=True, help_text='Tarefa original da série recorrente (tasks/recurrence.py)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='tasks.task'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'due_date'], name='tasks_task_user_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(fields=('recurrence_parent', 'due_date'), name='tasks_task_unique_occurrence'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_task_recurrence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='dedupe_key',
+            field=models.CharField(blank=True, default='', help_text='Chave de deduplicação (única quando preenchida; ver tasks/notifications.py)', max_length=200),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('dedupe_key', ''), _negated=True), fields=('dedupe_key',), name='tasks_notification_unique_dedupe_key'),
+        ),
+    ]
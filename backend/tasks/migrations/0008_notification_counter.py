@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def backfill_counters(apps, schema_editor):
+    """Contadores iniciais: uma agregação agrupada por usuário"""
+    Notification = apps.get_model('tasks', 'Notification')
+    NotificationCounter = apps.get_model('tasks', 'NotificationCounter')
+    rows = (
+        Notification.objects.filter(is_read=False)
+        .order_by()
+        .values('user_id')
+        .annotate(total=Count('id'))
+    )
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=row['user_id'], unread=row['total']) for row in rows],
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_notification_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.IntegerField(default=0)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador de Notificações',
+                'verbose_name_plural': 'Contadores de Notificações',
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
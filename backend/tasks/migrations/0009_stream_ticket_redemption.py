@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_notification_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StreamTicketRedemption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nonce', models.CharField(max_length=32, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Bilhete de Stream Usado',
+                'verbose_name_plural': 'Bilhetes de Stream Usados',
+            },
+        ),
+    ]
@@ -1,10 +1,14 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from datetime import datetime, time, timedelta
 from decimal import Decimal
 
 User = get_user_model()
 
+# Antecedência dos lembretes de tarefas
+TASK_REMINDER_LEAD = timedelta(minutes=5)
+
 
 class TaskCategory(models.Model):
     """Categoria para tarefas"""
@@ -61,7 +65,15 @@ class Task(models.Model):
         blank=True,
         null=True
     )
+    recurrence_parent = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='occurrences',
+        help_text="Tarefa original da série recorrente (tasks/recurrence.py)"
+    )
     completed_at = models.DateTimeField(null=True, blank=True)
+    remind_at = models.DateTimeField(
+        null=True, blank=True, editable=False,
+        help_text="Momento do lembrete (5 minutos antes do vencimento), calculado ao salvar"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -69,10 +81,41 @@ class Task(models.Model):
         verbose_name = "Tarefa"
         verbose_name_plural = "Tarefas"
         ordering = ['-due_date', '-created_at']
+        indexes = [
+            # Varrimento de lembretes (tasks/reminders.py)
+            models.Index(fields=['remind_at'], name='tasks_task_remind_at_idx'),
+            # Refresh incremental do run_reminder_daemon
+            models.Index(fields=['updated_at'], name='tasks_task_updated_at_idx'),
+            # Hoje/próximas/calendário
+            models.Index(fields=['user', 'due_date'], name='tasks_task_user_due_idx'),
+        ]
+        constraints = [
+            # Uma ocorrência por data em cada série recorrente
+            models.UniqueConstraint(fields=['recurrence_parent', 'due_date'], name='tasks_task_unique_occurrence'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
+    @property
+    def due_datetime(self):
+        """Data/hora de vencimento no fuso TIME_ZONE (só data = fim do dia)"""
+        if not self.due_date:
+            return None
+        from django.utils import timezone
+        return timezone.make_aware(datetime.combine(self.due_date, self.due_time or time.max))
+
+    def compute_remind_at(self):
+        due = self.due_datetime
+        return due - TASK_REMINDER_LEAD if due else None
+
+    def save(self, *args, **kwargs):
+        self.remind_at = self.compute_remind_at()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'due_date', 'due_time'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'remind_at'}
+        super().save(*args, **kwargs)
+
     @property
     def is_overdue(self):
         """Verifica se a tarefa está atrasada"""
@@ -185,6 +228,10 @@ class Notification(models.Model):
     action_url = models.CharField(max_length=500, blank=True, help_text="URL de ação (opcional)")
     related_object_type = models.CharField(max_length=50, blank=True, help_text="Tipo do objeto relacionado")
     related_object_id = models.IntegerField(null=True, blank=True, help_text="ID do objeto relacionado")
+    dedupe_key = models.CharField(
+        max_length=200, blank=True, default='',
+        help_text="Chave de deduplicação (única quando preenchida; ver tasks/notifications.py)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     read_at = models.DateTimeField(null=True, blank=True)
 
@@ -192,13 +239,74 @@ class Notification(models.Model):
         verbose_name = "Notificação"
         verbose_name_plural = "Notificações"
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=~models.Q(dedupe_key=''),
+                name='tasks_notification_unique_dedupe_key',
+            ),
+        ]
+        indexes = [
+            # Seleção das notificações lidas antigas para arquivo (tasks/retention.py)
+            models.Index(fields=['is_read', 'created_at'], name='tasks_notif_read_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
     def mark_as_read(self):
-        """Marca a notificação como lida"""
-        from django.utils import timezone
-        self.is_read = True
-        self.read_at = timezone.now()
-        self.save()
+        """Marca a notificação como lida (e atualiza o contador de não lidas)"""
+        from .counters import mark_read
+        mark_read(self)
+
+
+class NotificationArchive(models.Model):
+    """Notificação lida antiga, movida da tabela principal (comando archive_notifications)"""
+    original_id = models.BigIntegerField(help_text="ID original da notificação")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=50)
+    related_object_type = models.CharField(max_length=50, blank=True)
+    related_object_id = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    read_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Notificação Arquivada"
+        verbose_name_plural = "Notificações Arquivadas"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.title}"
+
+
+class NotificationCounter(models.Model):
+    """Número de notificações não lidas do usuário (mantido por tasks/counters.py)"""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter'
+    )
+    unread = models.IntegerField(default=0)
+    # Incrementada a cada alteração; usada como ETag do unread_count
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Contador de Notificações"
+        verbose_name_plural = "Contadores de Notificações"
+
+    def __str__(self):
+        return f"{self.user_id} - {self.unread}"
+
+
+class StreamTicketRedemption(models.Model):
+    """Bilhete do stream de notificações já usado (o nonce único garante o uso único entre processos)"""
+    nonce = models.CharField(max_length=32, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Bilhete de Stream Usado"
+        verbose_name_plural = "Bilhetes de Stream Usados"
+
+    def __str__(self):
+        return self.nonce
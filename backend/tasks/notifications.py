@@ -0,0 +1,167 @@
+"""
+Serviço de notificações: tipos com modelo de mensagem, chaves de deduplicação e
+escrita em lote (bulk_create).
+
+    with NotificationBuffer() as notifications:
+        notifications.add('task_completed', user_id=user.id, obj=task)
+
+O buffer grava ao sair do bloco (fim do pedido ou do job) ou sempre que atinge
+batch_size. A deduplicação é garantida pela base de dados: Notification.dedupe_key tem
+um índice único parcial e as notificações com chave são inseridas com
+bulk_create(ignore_conflicts=True), sem queries exists() prévias.
+"""
+from collections import Counter
+from dataclasses import dataclass
+
+from django.contrib.auth import get_user_model
+
+from . import counters, realtime
+from .models import Notification
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class NotificationTemplate:
+    notification_type: str
+    title: str
+    message: str
+    action_url: str = ''
+    related_object_type: str = ''
+    # Formato da chave de deduplicação (vazio = sem deduplicação)
+    dedupe_key: str = ''
+
+
+TEMPLATES = {
+    'task_completed': NotificationTemplate(
+        notification_type='achievement',
+        title='Tarefa Concluída!',
+        message='Você concluiu a tarefa: {obj.title}',
+        related_object_type='task',
+    ),
+    'task_reminder': NotificationTemplate(
+        notification_type='task_reminder',
+        title='Lembrete: {obj.title}',
+        message='A tarefa "{obj.title}" vence em 5 minutos ({date_str} às {time_str}). Não se esqueça de completá-la!',
+        action_url='/tasks/{obj.id}/',
+        related_object_type='task',
+        dedupe_key='task_reminder:{obj.id}:{remind_minute}',
+    ),
+    'target_created': NotificationTemplate(
+        notification_type='target_milestone',
+        title='Nova Meta Criada!',
+        message='Você criou uma nova meta: {obj.title}',
+        related_object_type='target',
+    ),
+    'target_achieved': NotificationTemplate(
+        notification_type='goal_achievement',
+        title='Meta Alcançada! 🎉',
+        message='Parabéns! Você alcançou a meta: {obj.title}',
+        related_object_type='target',
+        dedupe_key='target_achieved:{obj.id}',
+    ),
+    'goal_reminder': NotificationTemplate(
+        notification_type='goal_reminder',
+        title='Lembrete Semanal: {obj.title}',
+        message='Não se esqueça de adicionar dinheiro ao seu objetivo "{obj.title}". Você já alcançou {progress:.0f}% do objetivo. Restam {remaining:.2f} para completar!',
+        action_url='/finance/goals/{obj.id}/',
+        related_object_type='goal',
+        dedupe_key='goal_reminder:{obj.id}:{week}',
+    ),
+    'broadcast': NotificationTemplate(
+        notification_type='system',
+        title='{title}',
+        message='{message}',
+        action_url='{action_url}',
+    ),
+}
+
+
+def build(kind, user_id, obj=None, **context):
+    """Criar (sem gravar) a Notification do modelo `kind`"""
+    template = TEMPLATES[kind]
+    context['obj'] = obj
+    return Notification(
+        user_id=user_id,
+        title=template.title.format(**context)[:200],
+        message=template.message.format(**context),
+        notification_type=template.notification_type,
+        action_url=template.action_url.format(**context),
+        related_object_type=template.related_object_type,
+        related_object_id=obj.id if obj is not None and template.related_object_type else None,
+        dedupe_key=template.dedupe_key.format(**context)[:200] if template.dedupe_key else '',
+    )
+
+
+class NotificationBuffer:
+    """Acumula notificações e grava-as com bulk_create (ao sair do bloco ou por lote)"""
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._pending = []
+        self._keys = set()
+        # Linhas enviadas para a base de dados (as duplicadas por dedupe_key são ignoradas lá)
+        self.written = 0
+        self.user_ids = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, kind, user_id, obj=None, **context):
+        notification = build(kind, user_id, obj=obj, **context)
+        if notification.dedupe_key:
+            if notification.dedupe_key in self._keys:
+                return None
+            self._keys.add(notification.dedupe_key)
+        self._pending.append(notification)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return notification
+
+    def flush(self):
+        if not self._pending:
+            return
+        keyed = [n for n in self._pending if n.dedupe_key]
+        plain = [n for n in self._pending if not n.dedupe_key]
+        if keyed:
+            Notification.objects.bulk_create(keyed, batch_size=self.batch_size, ignore_conflicts=True)
+        if plain:
+            Notification.objects.bulk_create(plain, batch_size=self.batch_size)
+        # Contadores de não lidas: as chaves duplicadas foram descartadas pela base de
+        # dados, por isso esses usuários são recontados; os restantes somam o que entrou
+        keyed_users = {n.user_id for n in keyed}
+        counters.recount(keyed_users)
+        counters.adjust(Counter(n.user_id for n in plain if n.user_id not in keyed_users))
+        realtime.publish(n.user_id for n in self._pending)
+        self.written += len(self._pending)
+        self.user_ids.update(n.user_id for n in self._pending)
+        self._pending = []
+        self._keys = set()
+
+
+def notify(kind, user_id, obj=None, **context):
+    """Criar uma única notificação imediatamente (ignorada se a dedupe_key já existir)"""
+    with NotificationBuffer() as buffer:
+        buffer.add(kind, user_id, obj=obj, **context)
+
+
+def broadcast(title, message, action_url='', users=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Enviar uma notificação de sistema a vários usuários (padrão: todos os ativos).
+    Lê só os ids em blocos e grava em lotes; devolve o número de notificações criadas.
+    """
+    if users is None:
+        users = get_user_model().objects.filter(is_active=True)
+    user_ids = users.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size)
+    with NotificationBuffer(batch_size=batch_size) as buffer:
+        for user_id in user_ids:
+            buffer.add('broadcast', user_id, title=title, message=message, action_url=action_url)
+    return buffer.written
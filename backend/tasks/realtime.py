@@ -0,0 +1,183 @@
+"""
+Notificações em tempo real (Server-Sent Events).
+
+Cada cliente ligado a GET /api/tasks/notifications/stream/ fica à espera num
+asyncio.Event. Quando são gravadas notificações, publish(user_ids) acorda as ligações
+desses usuários (depois do commit), que leem as notificações novas (id > último
+enviado) e enviam-nas.
+
+publish só chega às ligações do mesmo processo. Para deployments com vários
+processos, um único poller por processo consulta a base de dados a cada
+NOTIFICATION_STREAM_POLL_SECONDS (ids acima da marca d'água, só dos usuários ligados)
+e acorda as ligações afetadas: o custo é uma query por processo por intervalo,
+qualquer que seja o número de clientes.
+
+O EventSource do browser não envia cabeçalhos, por isso o cliente pede primeiro um
+bilhete (POST .../notifications/stream_ticket/, autenticado) e liga-se com ?ticket=.
+O bilhete é assinado, expira em NOTIFICATION_STREAM_TICKET_SECONDS e só pode ser
+usado uma vez: o nonce é gravado em StreamTicketRedemption (chave única na base de
+dados, válida para todos os processos). O token da API nunca vai na URL. O acesso ao
+app é verificado ao emitir o bilhete e outra vez ao abrir o stream.
+
+Requer um servidor ASGI (config/asgi.py), por exemplo:
+    uvicorn config.asgi:application
+"""
+import asyncio
+import json
+import logging
+import secrets
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Notification, StreamTicketRedemption
+
+logger = logging.getLogger(__name__)
+
+# Notificações perdidas reenviadas ao reconectar (Last-Event-ID)
+MAX_REPLAY = 100
+
+
+TICKET_SALT = 'tasks.notification-stream'
+
+
+def poll_seconds():
+    return getattr(settings, 'NOTIFICATION_STREAM_POLL_SECONDS', 5)
+
+
+def keepalive_seconds():
+    return getattr(settings, 'NOTIFICATION_STREAM_KEEPALIVE_SECONDS', 15)
+
+
+def ticket_seconds():
+    return getattr(settings, 'NOTIFICATION_STREAM_TICKET_SECONDS', 60)
+
+
+def issue_ticket(user_id):
+    """Bilhete assinado e de uso único para abrir o stream do usuário"""
+    return signing.dumps({'user_id': user_id, 'nonce': secrets.token_urlsafe(12)}, salt=TICKET_SALT)
+
+
+def _claim_nonce(nonce):
+    """Gravar o nonce; False se já tinha sido usado. Apaga os registos de bilhetes já expirados"""
+    StreamTicketRedemption.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=ticket_seconds())
+    ).delete()
+    try:
+        with transaction.atomic():
+            StreamTicketRedemption.objects.create(nonce=nonce)
+    except IntegrityError:
+        return False
+    return True
+
+
+async def redeem_ticket(ticket):
+    """user_id do bilhete, ou None se for inválido, tiver expirado ou já tiver sido usado"""
+    try:
+        data = signing.loads(ticket, salt=TICKET_SALT, max_age=ticket_seconds())
+    except signing.BadSignature:
+        return None
+    if not await sync_to_async(_claim_nonce)(data['nonce']):
+        return None
+    return data['user_id']
+
+
+class NotificationHub:
+    """Pub/sub em memória: user_id -> eventos das ligações abertas (no event loop do ASGI)"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._loop = None
+        self._poller = None
+
+    def subscribe(self, user_id):
+        self._loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        self._subscribers.setdefault(user_id, set()).add(event)
+        if self._poller is None or self._poller.done():
+            self._poller = self._loop.create_task(self._poll())
+        return event
+
+    def unsubscribe(self, user_id, event):
+        events = self._subscribers.get(user_id)
+        if events is None:
+            return
+        events.discard(event)
+        if not events:
+            del self._subscribers[user_id]
+
+    def _wake(self, user_ids):
+        for user_id in user_ids:
+            for event in self._subscribers.get(user_id, ()):
+                event.set()
+
+    def publish(self, user_ids):
+        """Acordar as ligações dos usuários; pode ser chamado de qualquer thread"""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self._subscribers:
+            return
+        loop.call_soon_threadsafe(self._wake, set(user_ids))
+
+    async def _poll(self):
+        """Fallback multi-processo: uma query por intervalo para todas as ligações"""
+        watermark = (await Notification.objects.aaggregate(top=Max('id')))['top'] or 0
+        while self._subscribers:
+            await asyncio.sleep(poll_seconds())
+            try:
+                top = (await Notification.objects.aaggregate(top=Max('id')))['top'] or 0
+                if top <= watermark:
+                    continue
+                user_ids = {
+                    user_id async for user_id in Notification.objects.filter(
+                        id__gt=watermark, id__lte=top, user_id__in=list(self._subscribers),
+                    ).values_list('user_id', flat=True).distinct()
+                }
+                watermark = top
+                self._wake(user_ids)
+            except Exception:
+                logger.exception('Erro no poller de notificações em tempo real')
+
+
+hub = NotificationHub()
+
+
+def publish(user_ids):
+    """Anunciar notificações novas destes usuários às ligações abertas (após o commit)"""
+    user_ids = set(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: hub.publish(user_ids))
+
+
+def format_event(notification_id, data, event='notification'):
+    return f'id: {notification_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+async def stream(user_id, last_id=None, serialize=None):
+    """
+    Gerador assíncrono dos eventos SSE do usuário. Sem last_id (Last-Event-ID),
+    começa nas notificações criadas depois da ligação
+    """
+    event = hub.subscribe(user_id)
+    try:
+        queryset = Notification.objects.filter(user_id=user_id)
+        if last_id is None:
+            last_id = (await queryset.aaggregate(top=Max('id')))['top'] or 0
+        # Comentário inicial para os proxies enviarem os cabeçalhos de imediato
+        yield ': connected\n\n'
+        while True:
+            # Limpar antes de ler: um publish durante a query volta a acordar a ligação
+            event.clear()
+            async for notification in queryset.filter(id__gt=last_id).order_by('id')[:MAX_REPLAY]:
+                last_id = notification.id
+                yield format_event(notification.id, serialize(notification))
+            try:
+                await asyncio.wait_for(event.wait(), timeout=keepalive_seconds())
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+    finally:
+        hub.unsubscribe(user_id, event)
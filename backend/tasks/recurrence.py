@@ -0,0 +1,163 @@
+"""
+Motor de recorrência das tarefas.
+
+Cada série recorrente tem no máximo uma ocorrência ativa gravada na base de dados:
+- Ao concluir uma ocorrência, a seguinte é materializada (materialize_next)
+- Ocorrências futuras para o calendário são geradas em memória (expand), sem escrever
+  uma linha por cada instância futura; hoje/próximas só devolvem linhas reais, porque
+  as virtuais não têm id para as ações do app
+
+A série é identificada pela tarefa original (recurrence_parent das ocorrências seguintes).
+"""
+import calendar
+import copy
+from datetime import time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Task
+
+ACTIVE_STATUSES = ['pending', 'in_progress']
+# Limite de ocorrências virtuais por série num único pedido
+MAX_OCCURRENCES_PER_SERIES = 400
+
+
+def advance(day, pattern, anchor_day=None):
+    """Data da ocorrência seguinte; mensal mantém o dia original (limitado ao fim do mês)"""
+    if pattern == 'daily':
+        return day + timedelta(days=1)
+    if pattern == 'weekly':
+        return day + timedelta(days=7)
+    if pattern == 'monthly':
+        year, month = (day.year + 1, 1) if day.month == 12 else (day.year, day.month + 1)
+        last_day = calendar.monthrange(year, month)[1]
+        return day.replace(year=year, month=month, day=min(anchor_day or day.day, last_day))
+    return None
+
+
+def is_recurring(task):
+    return bool(task.is_recurring and task.recurrence_pattern and task.due_date)
+
+
+def series_root_id(task):
+    return task.recurrence_parent_id or task.id
+
+
+def anchor_day(task):
+    """Dia do mês da tarefa original da série (usar select_related('recurrence_parent') em lote)"""
+    root = task.recurrence_parent if task.recurrence_parent_id else task
+    return root.due_date.day if root.due_date else None
+
+
+def occurrence_dates(task, start, end):
+    """Datas das ocorrências seguintes a task.due_date que caem em [start, end]"""
+    pattern = task.recurrence_pattern
+    anchor = anchor_day(task) if pattern == 'monthly' else None
+    day = advance(task.due_date, pattern, anchor)
+    if pattern == 'daily' and day < start:
+        day = start
+    elif pattern == 'weekly' and day < start:
+        day += timedelta(days=((start - day).days + 6) // 7 * 7)
+    dates = []
+    while day and day <= end and len(dates) < MAX_OCCURRENCES_PER_SERIES:
+        if day >= start:
+            dates.append(day)
+        day = advance(day, pattern, anchor)
+    return dates
+
+
+def virtual_occurrence(task, day):
+    """Cópia em memória (sem id) da ocorrência ativa, com outra data de vencimento"""
+    occurrence = copy.copy(task)
+    occurrence.pk = occurrence.id = None
+    occurrence.due_date = day
+    occurrence.remind_at = None
+    occurrence.recurrence_parent_id = series_root_id(task)
+    occurrence.is_virtual = True
+    return occurrence
+
+
+def range_queryset(user, start, end):
+    """
+    Uma query para o intervalo: tarefas ativas que vencem em [start, end] mais as
+    ocorrências ativas de séries recorrentes anteriores a `end` (que geram virtuais)
+    """
+    return (
+        Task.objects.filter(user=user, status__in=ACTIVE_STATUSES)
+        .filter(
+            Q(due_date__gte=start, due_date__lte=end)
+            | Q(is_recurring=True, recurrence_pattern__isnull=False, due_date__lt=end)
+        )
+        .select_related('category', 'recurrence_parent')
+    )
+
+
+def expand(tasks, start, end, include_virtual=True):
+    """
+    Tarefas reais em [start, end] mais (se include_virtual) as ocorrências virtuais das
+    séries recorrentes, ordenadas por data e hora de vencimento
+    """
+    items = []
+    for task in tasks:
+        if task.due_date and start <= task.due_date <= end:
+            items.append(task)
+        if include_virtual and is_recurring(task):
+            items.extend(virtual_occurrence(task, day) for day in occurrence_dates(task, start, end))
+    return sorted(items, key=lambda t: (t.due_date, t.due_time is None, t.due_time or time.min))
+
+
+def tasks_in_range(user, start, end, include_virtual=True):
+    """
+    Tarefas ativas do intervalo. As virtuais não têm id (não aceitam ações como
+    concluir/apagar): só o calendário as pede; listas acionáveis usam include_virtual=False.
+    """
+    if not include_virtual:
+        return expand(
+            Task.objects.filter(user=user, status__in=ACTIVE_STATUSES, due_date__gte=start, due_date__lte=end)
+            .select_related('category', 'recurrence_parent'),
+            start, end, include_virtual=False,
+        )
+    return expand(range_queryset(user, start, end), start, end)
+
+
+def materialize_next(task, today=None):
+    """
+    Criar a ocorrência seguinte de uma tarefa recorrente acabada de concluir.
+    A data salta ocorrências já passadas; a unicidade (série, data) evita duplicados.
+    Devolve a nova tarefa ou None.
+    """
+    if not is_recurring(task):
+        return None
+    today = today or timezone.localdate()
+    anchor = anchor_day(task)
+    next_date = advance(task.due_date, task.recurrence_pattern, anchor)
+    while next_date < today:
+        next_date = advance(next_date, task.recurrence_pattern, anchor)
+
+    root_id = series_root_id(task)
+    if Task.objects.filter(
+        Q(recurrence_parent_id=root_id) | Q(id=root_id),
+        status__in=ACTIVE_STATUSES,
+        due_date__gte=next_date,
+    ).exists():
+        return None
+
+    try:
+        with transaction.atomic():
+            return Task.objects.create(
+                user_id=task.user_id,
+                category_id=task.category_id,
+                title=task.title,
+                description=task.description,
+                due_date=next_date,
+                due_time=task.due_time,
+                priority=task.priority,
+                is_recurring=True,
+                recurrence_pattern=task.recurrence_pattern,
+                recurrence_parent_id=root_id,
+            )
+    except IntegrityError:
+        # Outro pedido já materializou esta ocorrência
+        return None
@@ -0,0 +1,57 @@
+"""
+Lembretes de tarefas: notificação 5 minutos antes do vencimento.
+
+Task.remind_at (vencimento - 5 minutos, calculado ao salvar) é indexado, por isso o
+varrimento é um range scan no índice; as notificações são criadas com um único
+bulk_create e os duplicados (mesma tarefa e remind_at) são descartados pelo índice
+único de Notification.dedupe_key. Cada execução custa o mesmo qualquer que seja o
+total de tarefas.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Task
+from .notifications import NotificationBuffer
+
+# Janela de segurança em volta do remind_at (o comando corre a cada minuto)
+WINDOW = timedelta(minutes=1)
+
+ACTIVE_STATUSES = ['pending', 'in_progress']
+
+
+def is_in_window(task, now=None):
+    """Verificação em memória (sem query) de que remind_at está dentro da janela"""
+    now = now or timezone.now()
+    return task.remind_at is not None and now - WINDOW <= task.remind_at <= now + WINDOW
+
+
+def reminder_context(task):
+    return {
+        'date_str': task.due_date.strftime('%d/%m/%Y'),
+        'time_str': task.due_time.strftime('%H:%M') if task.due_time else 'fim do dia',
+        # Minuto (epoch, independente do fuso) do remind_at, para a dedupe_key
+        'remind_minute': int(task.remind_at.timestamp()) // 60,
+    }
+
+
+def tasks_due_for_reminder(now=None, queryset=None):
+    """Tarefas ativas com remind_at na janela (uma query)"""
+    now = now or timezone.now()
+    queryset = Task.objects.all() if queryset is None else queryset
+    return queryset.filter(
+        remind_at__range=(now - WINDOW, now + WINDOW),
+        status__in=ACTIVE_STATUSES,
+    ).select_related('user')
+
+
+def create_task_reminders(now=None, queryset=None):
+    """
+    Criar os lembretes das tarefas na janela (os já existentes são ignorados pela
+    base de dados); devolve as tarefas processadas
+    """
+    tasks = list(tasks_due_for_reminder(now, queryset))
+    with NotificationBuffer() as buffer:
+        for task in tasks:
+            buffer.add('task_reminder', task.user_id, obj=task, **reminder_context(task))
+    return tasks
@@ -0,0 +1,65 @@
+"""
+Retenção de notificações: notificações lidas mais antigas que N dias saem da tabela
+principal (para NotificationArchive, ou são apagadas), em lotes curtos.
+
+Cada lote é uma transação própria (copiar + apagar por id), por isso os bloqueios
+duram apenas o tempo de um lote e a tabela principal pode continuar a ser usada.
+Só saem notificações lidas, por isso os contadores de não lidas não mudam, e o DELETE
+por ids não carrega as linhas (Notification não tem signals de delete).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationArchive
+
+DEFAULT_BATCH_SIZE = 1000
+
+ARCHIVE_FIELDS = [
+    'id', 'user_id', 'title', 'message', 'notification_type',
+    'related_object_type', 'related_object_id', 'created_at', 'read_at',
+]
+
+
+def retention_days():
+    return getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90)
+
+
+def expired_notifications(days=None, now=None):
+    """Notificações lidas criadas há mais de `days` dias"""
+    cutoff = (now or timezone.now()) - timedelta(days=days if days is not None else retention_days())
+    return Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+
+
+def _archive_batch(ids):
+    rows = Notification.objects.filter(id__in=ids).values(*ARCHIVE_FIELDS)
+    NotificationArchive.objects.bulk_create([
+        NotificationArchive(original_id=row.pop('id'), **row) for row in rows
+    ])
+
+
+def archive_notifications(days=None, batch_size=DEFAULT_BATCH_SIZE, delete=False, progress=None):
+    """
+    Arquivar (ou apagar, com delete=True) as notificações expiradas, lote a lote.
+    `progress(total_processado)` é chamado após cada lote. Devolve o total processado.
+    """
+    queryset = expired_notifications(days)
+    processed = 0
+    last_id = 0
+    while True:
+        ids = list(
+            queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            if not delete:
+                _archive_batch(ids)
+            Notification.objects.filter(id__in=ids).delete()
+        processed += len(ids)
+        last_id = ids[-1]
+        if progress:
+            progress(processed)
+    return processed
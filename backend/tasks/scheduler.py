@@ -0,0 +1,125 @@
+"""
+Agendador em memória de lembretes (tarefas e objetivos), usado por run_reminder_daemon.
+
+Os lembretes que caem no horizonte (ex.: próxima hora) ficam num heap ordenado pelo
+momento de disparo. A cada refresh há uma query por modelo: linhas alteradas desde a
+última leitura (updated_at) mais as que acabaram de entrar no horizonte. Entradas
+canceladas ou reagendadas são descartadas ao sair do heap (remoção preguiçosa).
+No disparo, as funções set-based voltam a validar estado e duplicados na base de dados.
+"""
+import heapq
+import itertools
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Task
+from .reminders import ACTIVE_STATUSES, WINDOW, create_task_reminders
+
+# Margem na leitura por updated_at (transações que confirmam depois de outras mais recentes)
+UPDATED_AT_OVERLAP = timedelta(seconds=5)
+
+
+class ReminderScheduler:
+    def __init__(self, horizon=timedelta(hours=1)):
+        self.horizon = horizon
+        self._heap = []
+        self._counter = itertools.count()
+        # (tipo, id) -> momento de disparo atual
+        self._scheduled = {}
+        self._loaded_until = None
+        self._watermarks = {}
+        # Momentos de lembrete de objetivos já carregados e ainda por disparar
+        self._goal_slots = []
+
+    def __len__(self):
+        return len(self._scheduled)
+
+    def schedule(self, key, fire_at):
+        if self._scheduled.get(key) == fire_at:
+            return
+        self._scheduled[key] = fire_at
+        heapq.heappush(self._heap, (fire_at, next(self._counter), key))
+
+    def cancel(self, key):
+        self._scheduled.pop(key, None)
+
+    def next_fire_at(self):
+        """Momento do próximo lembrete válido (descarta entradas canceladas no topo)"""
+        while self._heap:
+            fire_at, _, key = self._heap[0]
+            if self._scheduled.get(key) == fire_at:
+                return fire_at
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now):
+        """Retirar do heap os lembretes com disparo até `now`; devolve {tipo: [ids]}"""
+        due = {}
+        while self.next_fire_at() is not None and self._heap[0][0] <= now:
+            _, _, (kind, object_id) = heapq.heappop(self._heap)
+            del self._scheduled[(kind, object_id)]
+            due.setdefault(kind, []).append(object_id)
+        return due
+
+    # ---------- carregamento ----------
+
+    def _changed_since(self, kind, now):
+        watermark = self._watermarks.get(kind)
+        self._watermarks[kind] = now
+        return Q(updated_at__gte=watermark - UPDATED_AT_OVERLAP) if watermark else Q(pk__in=[])
+
+    def refresh(self, now=None):
+        """Atualizar o heap: alterações desde o último refresh e novos lembretes no horizonte"""
+        now = now or timezone.now()
+        horizon_end = now + self.horizon
+        loaded_from = self._loaded_until or now - WINDOW
+        self._refresh_tasks(now, loaded_from, horizon_end)
+        self._refresh_goals(now, loaded_from, horizon_end)
+        self._loaded_until = horizon_end
+
+    def _refresh_tasks(self, now, loaded_from, horizon_end):
+        entering = Q(remind_at__gt=loaded_from, remind_at__lte=horizon_end, status__in=ACTIVE_STATUSES)
+        rows = Task.objects.filter(entering | self._changed_since('task', now)).values_list('id', 'remind_at', 'status')
+        for task_id, remind_at, status in rows:
+            key = ('task', task_id)
+            if status in ACTIVE_STATUSES and remind_at and now - WINDOW <= remind_at <= horizon_end:
+                self.schedule(key, max(remind_at, now))
+            else:
+                self.cancel(key)
+
+    def _refresh_goals(self, now, loaded_from, horizon_end):
+        from finance.models import Goal
+        from finance.reminders import reminder_slots
+
+        new_slots = reminder_slots(loaded_from, horizon_end)
+        self._goal_slots = [slot for slot in self._goal_slots if slot > now] + new_slots
+        by_weekday = {timezone.localtime(slot).isoweekday(): slot for slot in self._goal_slots}
+
+        query = self._changed_since('goal', now)
+        for slot in new_slots:
+            query |= Q(created_at__iso_week_day=timezone.localtime(slot).isoweekday(), status='active')
+        rows = Goal.objects.filter(query).values_list('id', 'created_at', 'status', 'current_amount', 'target_amount')
+        for goal_id, created_at, status, current_amount, target_amount in rows:
+            key = ('goal', goal_id)
+            slot = by_weekday.get(timezone.localtime(created_at).isoweekday())
+            if slot and status == 'active' and current_amount < target_amount:
+                self.schedule(key, slot)
+            else:
+                self.cancel(key)
+
+    # ---------- disparo ----------
+
+    def fire_due(self, now=None):
+        """Criar as notificações dos lembretes vencidos; devolve os objetos (tarefas/objetivos) processados"""
+        now = now or timezone.now()
+        due = self.pop_due(now)
+        created = []
+        if due.get('task'):
+            created += create_task_reminders(now=now, queryset=Task.objects.filter(pk__in=due['task']))
+        if due.get('goal'):
+            from finance.models import Goal
+            from finance.reminders import create_goal_reminders
+            created += create_goal_reminders(Goal.objects.filter(pk__in=due['goal']), now=now)
+        return created
@@ -13,16 +13,21 @@ class TaskSerializer(serializers.ModelSerializer):
     category_icon = serializers.CharField(source='category.icon', read_only=True)
     category_color = serializers.CharField(source='category.color', read_only=True)
     is_overdue = serializers.BooleanField(read_only=True)
+    # Ocorrência futura gerada em memória (sem id); recurrence_parent identifica a série
+    is_virtual = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
         fields = [
             'id', 'category', 'category_name', 'category_icon', 'category_color',
             'title', 'description', 'due_date', 'due_time', 'priority', 'status',
-            'is_recurring', 'recurrence_pattern', 'completed_at', 'is_overdue',
-            'created_at', 'updated_at'
+            'is_recurring', 'recurrence_pattern', 'recurrence_parent', 'is_virtual',
+            'completed_at', 'is_overdue', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['completed_at', 'created_at', 'updated_at']
+        read_only_fields = ['recurrence_parent', 'completed_at', 'created_at', 'updated_at']
+
+    def get_is_virtual(self, obj):
+        return getattr(obj, 'is_virtual', False)
 
 
 class TargetSerializer(serializers.ModelSerializer):
@@ -1,64 +1,39 @@
 """
-Signals para tarefas - verificar lembretes quando tarefas são criadas ou atualizadas
+Signals para tarefas - verificar lembretes quando tarefas são criadas ou atualizadas,
+invalidar as estatísticas em cache do usuário e manter o contador de não lidas
 """
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.utils import timezone
-from datetime import timedelta
-from .models import Task, Notification
+from . import counters, realtime
+from .models import Notification, Target, Task
+from .reminders import ACTIVE_STATUSES, create_task_reminders, is_in_window
+from .stats import invalidate_user_stats
 
 
 @receiver(post_save, sender=Task)
 def check_task_reminder_on_save(sender, instance, created, **kwargs):
     """
-    Verifica se uma tarefa precisa de notificação quando é criada ou atualizada
+    Cria o lembrete logo ao salvar se a tarefa já está na janela dos 5 minutos
+    (sem query quando não está; remind_at é calculado em Task.save)
     """
-    # Só verificar se a tarefa não está completa ou cancelada
-    if instance.status in ['completed', 'cancelled']:
+    if instance.status not in ACTIVE_STATUSES or not is_in_window(instance):
         return
-    
-    # Só verificar se tem data de vencimento
-    if not instance.due_date:
-        return
-    
-    # Combinar data e hora se ambos existirem
-    if instance.due_date and instance.due_time:
-        due_datetime = timezone.make_aware(
-            timezone.datetime.combine(instance.due_date, instance.due_time)
-        )
-    elif instance.due_date:
-        # Se só tiver data, considerar fim do dia (23:59:59)
-        due_datetime = timezone.make_aware(
-            timezone.datetime.combine(instance.due_date, timezone.datetime.max.time())
-        )
-    else:
-        return
-    
-    now = timezone.now()
-    time_until_due = (due_datetime - now).total_seconds()
-    
-    # Verificar se está dentro da janela de 5 minutos antes (entre 4 e 6 minutos)
-    if 240 <= time_until_due <= 360:
-        # Verificar se já existe uma notificação recente para esta tarefa
-        recent_notification = Notification.objects.filter(
-            user=instance.user,
-            notification_type='task_reminder',
-            related_object_type='task',
-            related_object_id=instance.id,
-            created_at__gte=now - timedelta(minutes=10)
-        ).exists()
-        
-        if not recent_notification:
-            # Criar notificação
-            time_str = instance.due_time.strftime('%H:%M') if instance.due_time else 'fim do dia'
-            date_str = instance.due_date.strftime('%d/%m/%Y')
-            
-            Notification.objects.create(
-                user=instance.user,
-                title=f'Lembrete: {instance.title}',
-                message=f'A tarefa "{instance.title}" vence em 5 minutos ({date_str} às {time_str}). Não se esqueça de completá-la!',
-                notification_type='task_reminder',
-                related_object_type='task',
-                related_object_id=instance.id,
-                action_url=f'/tasks/{instance.id}/',
-            )
+    create_task_reminders(queryset=Task.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Target)
+@receiver(post_delete, sender=Target)
+def invalidate_stats_on_write(sender, instance, **kwargs):
+    """Qualquer escrita numa tarefa/meta invalida o snapshot de estatísticas do usuário"""
+    invalidate_user_stats(instance.user_id)
+
+
+@receiver(post_save, sender=Notification)
+def count_created_notification(sender, instance, created, **kwargs):
+    """Notificação criada individualmente (save/create; o bulk_create é contado no buffer)"""
+    if created and not instance.is_read:
+        counters.adjust({instance.user_id: 1})
+    if created:
+        realtime.publish([instance.user_id])
@@ -0,0 +1,80 @@
+"""
+Estatísticas de tarefas e metas: uma query de agregação condicional por modelo,
+guardadas em cache por usuário.
+
+A cache é versionada: cada escrita numa Task/Target do usuário (signals) incrementa a
+versão, invalidando de uma vez todos os snapshots desse usuário (qualquer período).
+Sem cache partilhada (settings.SHARED_CACHE) a invalidação não chegaria aos outros
+processos, por isso as estatísticas são calculadas a cada pedido.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Target, Task
+
+ACTIVE_STATUSES = ['pending', 'in_progress']
+
+
+def _version_key(user_id):
+    return f'tasks:stats:version:{user_id}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'TASK_STATS_CACHE_SECONDS', 300)
+
+
+def invalidate_user_stats(user_id):
+    """Invalidar os snapshots de estatísticas do usuário"""
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), 1, timeout=None)
+
+
+def _cached(user_id, name, period_dates, compute):
+    if not getattr(settings, 'SHARED_CACHE', False):
+        return compute()
+    version = cache.get_or_set(_version_key(user_id), 1, timeout=None)
+    period = f'{period_dates[0]}:{period_dates[1]}' if period_dates else 'all'
+    # A data de hoje faz parte da chave porque "overdue" depende dela
+    key = f'tasks:stats:{user_id}:{version}:{name}:{period}:{timezone.localdate()}'
+    data = cache.get(key)
+    if data is None:
+        data = compute()
+        cache.set(key, data, timeout=_cache_timeout())
+    return data
+
+
+def task_stats(user, period_dates=None):
+    def compute():
+        base = Task.objects.filter(user=user)
+        if period_dates:
+            start, end = period_dates
+            base = base.filter(due_date__gte=start, due_date__lte=end)
+        counts = base.aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+            pending=Count('id', filter=Q(status='pending')),
+            in_progress=Count('id', filter=Q(status='in_progress')),
+            overdue=Count('id', filter=Q(due_date__lt=timezone.localdate(), status__in=ACTIVE_STATUSES)),
+        )
+        total, completed = counts['total'], counts['completed']
+        counts['completion_rate'] = round((completed / total * 100), 1) if total > 0 else 0
+        return counts
+    return _cached(user.pk, 'tasks', period_dates, compute)
+
+
+def target_stats(user, period_dates=None):
+    def compute():
+        base = Target.objects.filter(user=user)
+        if period_dates:
+            start, end = period_dates
+            base = base.filter(start_date__lte=end, target_date__gte=start)
+        return base.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(status='active')),
+            completed=Count('id', filter=Q(status='completed')),
+        )
+    return _cached(user.pk, 'targets', period_dates, compute)
@@ -0,0 +1,377 @@
+from datetime import timedelta
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from subscriptions.models import MobileAppSubscription
+
+from . import counters
+from .models import (
+    Notification, NotificationArchive, NotificationCounter, StreamTicketRedemption, Target, Task,
+)
+from .notifications import NotificationBuffer, broadcast, notify
+from .reminders import create_task_reminders
+from .retention import archive_notifications
+from .stats import task_stats
+from .views import _stream_user, notification_stream
+
+User = get_user_model()
+
+
+def due_in(minutes):
+    """(due_date, due_time) no fuso local daqui a `minutes` minutos"""
+    moment = timezone.localtime() + timedelta(minutes=minutes)
+    return moment.date(), moment.time().replace(second=0, microsecond=0)
+
+
+class TaskReminderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+
+    def _task(self, minutes, **kwargs):
+        due_date, due_time = due_in(minutes)
+        return Task.objects.create(user=self.user, title=f'Tarefa {minutes}', due_date=due_date, due_time=due_time, **kwargs)
+
+    def test_reminders_are_created_once_per_task(self):
+        due = [self._task(5), self._task(5)]
+        self._task(5, status='completed')
+        self._task(60)
+
+        processed = create_task_reminders()
+        self.assertEqual({task.id for task in processed}, {task.id for task in due})
+        create_task_reminders()
+        self.assertEqual(Notification.objects.filter(notification_type='task_reminder').count(), 2)
+
+    def test_query_count_does_not_grow_with_due_tasks(self):
+        self._task(5)
+        with CaptureQueriesContext(connection) as few:
+            create_task_reminders()
+        Notification.objects.all().delete()
+        for _ in range(20):
+            self._task(5)
+        with CaptureQueriesContext(connection) as many:
+            create_task_reminders()
+        self.assertEqual(len(many), len(few))
+
+
+class RemindAtTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+
+    def test_remind_at_follows_due_date_and_time(self):
+        due_date, due_time = due_in(120)
+        task = Task.objects.create(user=self.user, title='Pagar renda', due_date=due_date, due_time=due_time)
+        self.assertEqual(task.remind_at, task.due_datetime - timedelta(minutes=5))
+
+        task.due_date = due_date + timedelta(days=1)
+        task.save(update_fields=['due_date'])
+        task.refresh_from_db()
+        self.assertEqual(task.remind_at, task.due_datetime - timedelta(minutes=5))
+
+        task.due_date = None
+        task.save()
+        self.assertIsNone(Task.objects.get(pk=task.pk).remind_at)
+
+
+class ReminderSchedulerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+
+    def test_fires_due_reminders_once_and_follows_reschedules(self):
+        from .scheduler import ReminderScheduler
+
+        due_date, due_time = due_in(5)
+        task = Task.objects.create(user=self.user, title='Ligar ao banco', due_date=due_date, due_time=due_time)
+        later = Task.objects.create(user=self.user, title='Reunião', due_date=due_date, due_time=due_in(30)[1])
+        scheduler = ReminderScheduler()
+        scheduler.refresh()
+        self.assertEqual(len(scheduler), 2)
+
+        self.assertEqual([obj.id for obj in scheduler.fire_due()], [task.id])
+        self.assertEqual(scheduler.fire_due(), [])
+
+        # Reagendada para daqui a 2h (fora do horizonte): sai do heap no próximo refresh
+        later.due_time = None
+        later.due_date = due_date + timedelta(days=1)
+        later.save()
+        scheduler.refresh(timezone.now() + timedelta(seconds=1))
+        self.assertNotIn(('task', later.id), scheduler._scheduled)
+        # A tarefa já lembrada pode voltar ao heap (updated_at recente), mas a base de dados descarta o duplicado
+        scheduler.fire_due(timezone.now() + timedelta(seconds=1))
+        self.assertEqual(Notification.objects.filter(notification_type='task_reminder').count(), 1)
+
+
+class RecurringTaskApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+        MobileAppSubscription.objects.create(user=self.user, status='trial')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.now().date()
+        self.series = Task.objects.create(
+            user=self.user, title='Regar plantas', due_date=self.today,
+            is_recurring=True, recurrence_pattern='daily',
+        )
+
+    def test_today_and_upcoming_return_only_actionable_rows(self):
+        for action in ('today', 'upcoming'):
+            data = self.client.get(f'/api/tasks/tasks/{action}/').data
+            self.assertEqual([row['id'] for row in data], [self.series.id], action)
+            self.assertFalse(any(row['is_virtual'] for row in data))
+
+    def test_calendar_expands_virtual_occurrences(self):
+        data = self.client.get('/api/tasks/tasks/calendar/', {
+            'date_from': str(self.today), 'date_to': str(self.today + timedelta(days=2)),
+        }).data
+        self.assertEqual([row['is_virtual'] for row in data], [False, True, True])
+
+    def test_completing_materializes_next_occurrence_once(self):
+        response = self.client.post(f'/api/tasks/tasks/{self.series.id}/complete/')
+        next_id = response.data['next_occurrence']['id']
+        self.assertEqual(response.data['next_occurrence']['due_date'], str(self.today + timedelta(days=1)))
+        self.client.post(f'/api/tasks/tasks/{self.series.id}/complete/')
+        self.assertEqual(Task.objects.filter(recurrence_parent=self.series).count(), 1)
+        upcoming = self.client.get('/api/tasks/tasks/upcoming/').data
+        self.assertEqual([row['id'] for row in upcoming], [next_id])
+
+
+class TaskStatsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+        Task.objects.create(user=self.user, title='Primeira')
+
+    @override_settings(SHARED_CACHE=True)
+    def test_write_invalidates_cached_stats(self):
+        self.assertEqual(task_stats(self.user)['total'], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(task_stats(self.user)['total'], 1)
+
+        Task.objects.create(user=self.user, title='Segunda', status='completed')
+        stats = task_stats(self.user)
+        self.assertEqual((stats['total'], stats['completed']), (2, 1))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_stats_are_not_cached_without_shared_cache(self):
+        task_stats(self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(task_stats(self.user)['total'], 1)
+
+
+class NotificationBufferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+
+    def _add(self, buffer, n):
+        for i in range(n):
+            buffer.add('broadcast', self.user.id, title=f'Aviso {i}', message='Olá', action_url='')
+
+    def test_buffer_writes_per_batch_and_on_exit(self):
+        with NotificationBuffer(batch_size=2) as buffer:
+            self._add(buffer, 3)
+            self.assertEqual(Notification.objects.count(), 2)
+            self.assertEqual(len(buffer), 1)
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertEqual(buffer.written, 3)
+        self.assertEqual(counters.get_counter(self.user.id).unread, 3)
+
+    def test_nothing_is_written_when_the_block_fails(self):
+        with self.assertRaises(RuntimeError):
+            with NotificationBuffer() as buffer:
+                self._add(buffer, 2)
+                raise RuntimeError
+        self.assertFalse(Notification.objects.exists())
+
+    def test_broadcast_notifies_active_users_only(self):
+        other = User.objects.create_user(email='rui@example.com', username='rui', password='pass12345')
+        User.objects.create_user(email='off@example.com', username='off', password='pass12345', is_active=False)
+
+        self.assertEqual(broadcast('Manutenção', 'Hoje à noite', batch_size=1), 2)
+        self.assertEqual(
+            set(Notification.objects.values_list('user_id', flat=True)), {self.user.id, other.id}
+        )
+        self.assertEqual(counters.get_counter(other.id).unread, 1)
+
+
+class NotificationDedupeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+        today = timezone.localdate()
+        self.target = Target.objects.create(
+            user=self.user, title='Correr 10km', start_date=today, target_date=today + timedelta(days=30)
+        )
+
+    def test_duplicate_key_is_ignored_by_the_database(self):
+        notify('target_achieved', self.user.id, obj=self.target)
+        notify('target_achieved', self.user.id, obj=self.target)
+
+        notifications = Notification.objects.filter(user=self.user)
+        self.assertEqual(notifications.count(), 1)
+        self.assertEqual(notifications.get().dedupe_key, f'target_achieved:{self.target.id}')
+        self.assertEqual(counters.get_counter(self.user.id).unread, 1)
+
+    def test_duplicate_key_in_the_same_buffer_is_dropped(self):
+        with NotificationBuffer() as buffer:
+            self.assertIsNotNone(buffer.add('target_achieved', self.user.id, obj=self.target))
+            self.assertIsNone(buffer.add('target_achieved', self.user.id, obj=self.target))
+            buffer.add('target_created', self.user.id, obj=self.target)
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(counters.get_counter(self.user.id).unread, 2)
+
+
+class NotificationRetentionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+        old = timezone.now() - timedelta(days=120)
+        for i in range(3):
+            self._notification(f'Antiga lida {i}', is_read=True, created_at=old)
+        self.unread = self._notification('Antiga por ler', created_at=old)
+        self.recent = self._notification('Recente lida', is_read=True)
+
+    def _notification(self, title, created_at=None, **kwargs):
+        notification = Notification.objects.create(user=self.user, title=title, message='...', **kwargs)
+        if created_at:
+            Notification.objects.filter(pk=notification.pk).update(created_at=created_at)
+        return notification
+
+    def test_archive_moves_old_read_notifications_in_batches(self):
+        batches = []
+        self.assertEqual(archive_notifications(days=90, batch_size=2, progress=batches.append), 3)
+        self.assertEqual(batches, [2, 3])
+        self.assertEqual(
+            set(Notification.objects.values_list('pk', flat=True)), {self.unread.pk, self.recent.pk}
+        )
+        self.assertEqual(NotificationArchive.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(counters.get_counter(self.user.id).unread, 1)
+
+    def test_delete_skips_the_archive(self):
+        self.assertEqual(archive_notifications(days=90, delete=True), 3)
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertFalse(NotificationArchive.objects.exists())
+
+    def test_dry_run_only_counts(self):
+        call_command('archive_notifications', days=90, dry_run=True, stdout=StringIO())
+        self.assertEqual(Notification.objects.count(), 5)
+        self.assertFalse(NotificationArchive.objects.exists())
+
+
+class NotificationCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+        MobileAppSubscription.objects.create(user=self.user, status='trial')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.notifications = [
+            Notification.objects.create(user=self.user, title=f'Aviso {i}', message='...') for i in range(4)
+        ]
+
+    def assertCounterMatchesRecount(self, expected):
+        self.assertEqual(counters.get_counter(self.user.id).unread, expected)
+        counters.recount([self.user.id])
+        self.assertEqual(NotificationCounter.objects.get(user=self.user).unread, expected)
+
+    def test_counter_follows_read_and_delete(self):
+        url = '/api/tasks/notifications/'
+        first, second, third, _ = self.notifications
+        self.client.post(f'{url}{first.id}/mark_read/')
+        self.client.post(f'{url}{first.id}/mark_read/')
+        self.assertCounterMatchesRecount(3)
+
+        self.assertEqual(self.client.delete(f'{url}{first.id}/').status_code, 204)
+        self.assertEqual(self.client.delete(f'{url}{second.id}/').status_code, 204)
+        self.assertCounterMatchesRecount(2)
+
+        self.client.patch(f'{url}{third.id}/', {'is_read': True}, format='json')
+        self.assertCounterMatchesRecount(1)
+        self.client.post(f'{url}mark_all_read/')
+        self.assertCounterMatchesRecount(0)
+
+    def test_queryset_delete_does_not_load_rows(self):
+        Notification.objects.filter(user=self.user).update(is_read=True)
+        with self.assertNumQueries(1):
+            Notification.objects.filter(user=self.user).delete()
+
+
+class NotificationStreamAuthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='ana@example.com', username='ana', password='pass12345')
+        MobileAppSubscription.objects.create(user=self.user, status='trial')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _request(self, **params):
+        request = RequestFactory().get('/api/tasks/notifications/stream/', params)
+
+        async def anonymous():
+            return AnonymousUser()
+        request.auser = anonymous
+        return request
+
+    def _stream_user(self, **params):
+        return async_to_sync(_stream_user)(self._request(**params))
+
+    def _ticket(self):
+        response = self.client.post('/api/tasks/notifications/stream_ticket/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['ticket']
+
+    def test_ticket_is_single_use(self):
+        ticket = self._ticket()
+        self.assertEqual(self._stream_user(ticket=ticket), self.user)
+        self.assertIsNone(self._stream_user(ticket=ticket))
+
+    def test_ticket_is_single_use_across_processes(self):
+        ticket = self._ticket()
+        self.assertEqual(self._stream_user(ticket=ticket), self.user)
+        # Outro processo não partilha a cache: a marca de uso fica na base de dados
+        cache.clear()
+        self.assertIsNone(self._stream_user(ticket=ticket))
+        self.assertEqual(StreamTicketRedemption.objects.count(), 1)
+
+    def test_expired_redemptions_are_purged(self):
+        StreamTicketRedemption.objects.create(nonce='antigo')
+        StreamTicketRedemption.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self._stream_user(ticket=self._ticket()), self.user)
+        self.assertFalse(StreamTicketRedemption.objects.filter(nonce='antigo').exists())
+
+    def test_ticket_requires_app_access(self):
+        MobileAppSubscription.objects.filter(user=self.user).update(status='expired')
+        response = self.client.post('/api/tasks/notifications/stream_ticket/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_stream_rechecks_app_access_on_redeem(self):
+        ticket = self._ticket()
+        MobileAppSubscription.objects.filter(user=self.user).update(status='expired')
+        response = async_to_sync(notification_stream)(self._request(ticket=ticket))
+        self.assertEqual(response.status_code, 403)
+
+    def test_expired_or_forged_ticket_is_rejected(self):
+        ticket = self._ticket()
+        self.assertIsNone(self._stream_user(ticket=ticket + 'x'))
+        with override_settings(NOTIFICATION_STREAM_TICKET_SECONDS=-1):
+            self.assertIsNone(self._stream_user(ticket=ticket))
+
+    def test_api_token_is_not_accepted_in_the_url(self):
+        token = Token.objects.create(user=self.user)
+        self.assertIsNone(self._stream_user(token=token.key))
+
+    def test_ticket_requires_authentication(self):
+        self.assertEqual(APIClient().post('/api/tasks/notifications/stream_ticket/').status_code, 401)
@@ -1,7 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    TaskCategoryViewSet, TaskViewSet, TargetViewSet, NotificationViewSet
+    TaskCategoryViewSet, TaskViewSet, TargetViewSet, NotificationViewSet, admin_broadcast,
+    notification_stream
 )
 
 router = DefaultRouter()
@@ -11,5 +12,8 @@ router.register(r'targets', TargetViewSet, basename='target')
 router.register(r'notifications', NotificationViewSet, basename='notification')
 
 urlpatterns = [
+    # Antes do router, para não coincidir com notifications/<pk>/
+    path('notifications/stream/', notification_stream, name='notification-stream'),
+    path('admin/notifications/broadcast/', admin_broadcast, name='tasks-admin-broadcast'),
     path('', include(router.urls)),
 ]
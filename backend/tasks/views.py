@@ -1,8 +1,14 @@
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
+from subscriptions.access import has_app_access
+from subscriptions.permissions import HasAppAccess
 from rest_framework.response import Response
+from rest_framework.authtoken.models import Token
+from django.contrib.auth import get_user_model
 from django.db.models import Q, Count
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
 
@@ -10,19 +16,28 @@ from .models import TaskCategory, Task, Target, Notification
 from .serializers import (
     TaskCategorySerializer, TaskSerializer, TargetSerializer, NotificationSerializer
 )
+from .recurrence import materialize_next, tasks_in_range
+from .stats import target_stats, task_stats
+from .notifications import broadcast, notify
+from . import counters, realtime
+
+User = get_user_model()
+
+# Intervalo máximo do calendário (ocorrências recorrentes são geradas em memória)
+MAX_CALENDAR_DAYS = 366
 
 
 class TaskCategoryViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet para categorias de tarefas"""
     queryset = TaskCategory.objects.all()
     serializer_class = TaskCategorySerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, HasAppAccess]
 
 
 class TaskViewSet(viewsets.ModelViewSet):
     """ViewSet para tarefas"""
     serializer_class = TaskSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, HasAppAccess]
 
     def get_queryset(self):
         user = self.request.user
@@ -53,48 +68,55 @@ class TaskViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
-        """Marca uma tarefa como concluída"""
+        """Marca uma tarefa como concluída (e cria a próxima ocorrência se for recorrente)"""
         task = self.get_object()
+        already_completed = task.status == 'completed'
         task.status = 'completed'
         task.completed_at = timezone.now()
         task.save()
+        next_occurrence = None if already_completed else materialize_next(task)
         
         # Criar notificação de conclusão
-        Notification.objects.create(
-            user=request.user,
-            title='Tarefa Concluída!',
-            message=f'Você concluiu a tarefa: {task.title}',
-            notification_type='achievement',
-            related_object_type='task',
-            related_object_id=task.id,
-        )
+        notify('task_completed', request.user.id, obj=task)
         
-        serializer = self.get_serializer(task)
-        return Response(serializer.data)
+        data = self.get_serializer(task).data
+        data['next_occurrence'] = self.get_serializer(next_occurrence).data if next_occurrence else None
+        return Response(data)
 
     @action(detail=False, methods=['get'])
     def today(self, request):
-        """Tarefas de hoje"""
+        """Tarefas de hoje (só linhas reais: a ocorrência ativa de cada série recorrente)"""
         today = timezone.now().date()
-        tasks = Task.objects.filter(
-            user=request.user,
-            due_date=today,
-            status__in=['pending', 'in_progress']
-        )
+        tasks = tasks_in_range(request.user, today, today, include_virtual=False)
         serializer = self.get_serializer(tasks, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
-        """Próximas tarefas (próximos 7 dias)"""
+        """Próximas tarefas (próximos 7 dias, só linhas reais que o app pode concluir/apagar)"""
         today = timezone.now().date()
         week_from_now = today + timedelta(days=7)
-        tasks = Task.objects.filter(
-            user=request.user,
-            due_date__gte=today,
-            due_date__lte=week_from_now,
-            status__in=['pending', 'in_progress']
-        )
+        tasks = tasks_in_range(request.user, today, week_from_now, include_virtual=False)
+        serializer = self.get_serializer(tasks, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """Tarefas ativas entre date_from e date_to (YYYY-MM-DD), com as ocorrências recorrentes expandidas"""
+        try:
+            start = datetime.strptime(request.query_params['date_from'], '%Y-%m-%d').date()
+            end = datetime.strptime(request.query_params['date_to'], '%Y-%m-%d').date()
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Indique date_from e date_to no formato YYYY-MM-DD.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if end < start or (end - start).days > MAX_CALENDAR_DAYS:
+            return Response(
+                {'error': f'Intervalo inválido (máximo {MAX_CALENDAR_DAYS} dias).'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        tasks = tasks_in_range(request.user, start, end)
         serializer = self.get_serializer(tasks, many=True)
         return Response(serializer.data)
 
@@ -130,27 +152,9 @@ class TaskViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Estatísticas das tarefas. Params: period (daily|monthly|yearly|custom), month, year, date_from, date_to"""
-        user = request.user
-        base = Task.objects.filter(user=user)
         period_dates = self._get_period_dates()
-        if period_dates:
-            start, end = period_dates
-            base = base.filter(due_date__gte=start, due_date__lte=end)
-        total = base.count()
-        completed = base.filter(status='completed').count()
-        pending = base.filter(status='pending').count()
-        in_progress = base.filter(status='in_progress').count()
-        overdue = base.filter(
-            due_date__lt=timezone.now().date(),
-            status__in=['pending', 'in_progress']
-        ).count()
         return Response({
-            'total': total,
-            'completed': completed,
-            'pending': pending,
-            'in_progress': in_progress,
-            'overdue': overdue,
-            'completion_rate': round((completed / total * 100), 1) if total > 0 else 0,
+            **task_stats(request.user, period_dates),
             'period': period_dates and {'start': str(period_dates[0]), 'end': str(period_dates[1])} or None,
         })
 
@@ -158,7 +162,7 @@ class TaskViewSet(viewsets.ModelViewSet):
 class TargetViewSet(viewsets.ModelViewSet):
     """ViewSet para metas"""
     serializer_class = TargetSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, HasAppAccess]
 
     def get_queryset(self):
         user = self.request.user
@@ -178,15 +182,7 @@ class TargetViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
         
         # Criar notificação de nova meta
-        target = serializer.instance
-        Notification.objects.create(
-            user=self.request.user,
-            title='Nova Meta Criada!',
-            message=f'Você criou uma nova meta: {target.title}',
-            notification_type='target_milestone',
-            related_object_type='target',
-            related_object_id=target.id,
-        )
+        notify('target_created', self.request.user.id, obj=serializer.instance)
 
     def _get_period_dates(self):
         """Parse period params for stats: daily, monthly, yearly, custom."""
@@ -220,19 +216,9 @@ class TargetViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Estatísticas das metas. Params: period (daily|monthly|yearly|custom), month, year, date_from, date_to"""
-        user = request.user
-        base = Target.objects.filter(user=user)
         period_dates = self._get_period_dates()
-        if period_dates:
-            start, end = period_dates
-            base = base.filter(start_date__lte=end, target_date__gte=start)
-        total = base.count()
-        active = base.filter(status='active').count()
-        completed = base.filter(status='completed').count()
         return Response({
-            'total': total,
-            'active': active,
-            'completed': completed,
+            **target_stats(request.user, period_dates),
             'period': period_dates and {'start': str(period_dates[0]), 'end': str(period_dates[1])} or None,
         })
 
@@ -248,14 +234,7 @@ class TargetViewSet(viewsets.ModelViewSet):
             # Verificar se a meta foi alcançada
             if target.target_value and target.current_value >= target.target_value:
                 target.status = 'completed'
-                Notification.objects.create(
-                    user=request.user,
-                    title='Meta Alcançada! 🎉',
-                    message=f'Parabéns! Você alcançou a meta: {target.title}',
-                    notification_type='goal_achievement',
-                    related_object_type='target',
-                    related_object_id=target.id,
-                )
+                notify('target_achieved', request.user.id, obj=target)
             
             target.save()
         
@@ -266,7 +245,7 @@ class TargetViewSet(viewsets.ModelViewSet):
 class NotificationViewSet(viewsets.ModelViewSet):
     """ViewSet para notificações"""
     serializer_class = NotificationSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, HasAppAccess]
 
     def get_queryset(self):
         user = self.request.user
@@ -285,25 +264,111 @@ class NotificationViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_update(self, serializer):
+        was_read = serializer.instance.is_read
+        notification = serializer.save()
+        if notification.is_read != was_read:
+            counters.adjust({notification.user_id: -1 if notification.is_read else 1})
+
+    def perform_destroy(self, instance):
+        counters.delete(instance)
+
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """Marca uma notificação como lida"""
-        notification = self.get_object()
-        notification.mark_as_read()
+        notification = counters.mark_read(self.get_object())
         serializer = self.get_serializer(notification)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def stream_ticket(self, request):
+        """
+        Bilhete de uso único para abrir o stream (EventSource não envia o token).
+        Só é emitido com acesso ao app (HasAppAccess do ViewSet)
+        """
+        return Response({
+            'ticket': realtime.issue_ticket(request.user.id),
+            'expires_in': realtime.ticket_seconds(),
+        })
+
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """Marca todas as notificações como lidas"""
-        Notification.objects.filter(user=request.user, is_read=False).update(
-            is_read=True,
-            read_at=timezone.now()
-        )
+        counters.mark_all_read(request.user.id)
         return Response({'message': 'Todas as notificações foram marcadas como lidas'})
 
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
-        """Conta notificações não lidas"""
-        count = Notification.objects.filter(user=request.user, is_read=False).count()
-        return Response({'count': count})
+        """
+        Conta notificações não lidas (contador por usuário, sem COUNT). Responde 304 se o
+        If-None-Match coincidir com o ETag atual
+        """
+        counter = counters.get_counter(request.user.id)
+        etag = f'"{counter.user_id}-{counter.version}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response({'count': counter.unread}, headers=headers)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def admin_broadcast(request):
+    """Enviar uma notificação de sistema a todos os usuários ativos (admin). Body: title, message, action_url"""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return Response(
+            {'error': 'Acesso negado. Apenas administradores.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    title = (request.data.get('title') or '').strip()
+    message = (request.data.get('message') or '').strip()
+    if not title or not message:
+        return Response(
+            {'error': 'Título e mensagem são obrigatórios.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    sent = broadcast(title, message, action_url=(request.data.get('action_url') or '')[:500])
+    return Response({'message': f'Notificação enviada a {sent} usuário(s).', 'sent': sent})
+
+
+async def _stream_user(request):
+    """Usuário do stream: bilhete ?ticket= (EventSource), token no cabeçalho Authorization, ou sessão"""
+    ticket = request.GET.get('ticket')
+    if ticket:
+        user_id = await realtime.redeem_ticket(ticket)
+        if user_id is None:
+            return None
+        return await User.objects.filter(pk=user_id, is_active=True).afirst()
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Token '):
+        token = await Token.objects.select_related('user').filter(key=header[6:].strip()).afirst()
+        return token.user if token and token.user.is_active else None
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+async def notification_stream(request):
+    """
+    Server-Sent Events com as notificações novas do usuário (requer servidor ASGI).
+    Ao reconectar, o cabeçalho Last-Event-ID reenvia as notificações perdidas
+    """
+    user = await _stream_user(request)
+    if user is None:
+        return JsonResponse({'error': 'Autenticação necessária.'}, status=401)
+    # O acesso pode ter terminado depois de o bilhete ser emitido
+    if not await sync_to_async(has_app_access)(user):
+        return JsonResponse({'detail': HasAppAccess.message}, status=403)
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    last_id = int(last_event_id) if last_event_id.isdigit() else None
+    response = StreamingHttpResponse(
+        realtime.stream(
+            user.id,
+            last_id=last_id,
+            serialize=lambda notification: NotificationSerializer(notification).data,
+        ),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Desativar o buffering do nginx para os eventos saírem de imediato
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -185,7 +185,9 @@ export default function AICopilotScreen() {
       // Provide more helpful error message
       let errorMessage = 'Desculpe, ocorreu um erro ao processar sua mensagem. Por favor, tente novamente.'
       
-      if (error.response?.status === 401) {
+      if (error.code === 'COPILOT_TIMEOUT') {
+        errorMessage = error.message
+      } else if (error.response?.status === 401) {
         errorMessage = 'Sessão expirada. Por favor, faça login novamente.'
       } else if (error.response?.status === 403) {
         errorMessage = 'Você não tem permissão para usar esta funcionalidade.'
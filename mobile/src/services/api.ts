@@ -670,6 +670,10 @@ export const lessonQuizApi = {
 }
 
 // AI Copilot API
+// Long-polling per request (server caps it at 5s) and overall deadline for a reply
+const COPILOT_JOB_WAIT_SECONDS = 5
+const COPILOT_JOB_TIMEOUT_MS = 90000
+
 export const aiCopilotApi = {
   getConversations: async () => {
     const response = await api.get('/ai-copilot/conversations/')
@@ -697,11 +701,27 @@ export const aiCopilotApi = {
         message,
         conversation_id: conversationId || null,
       })
+      let data = response.data
+      // The reply is generated by a background worker: poll the job until it finishes (with an overall deadline)
+      if (data.job_id && !data.assistant_message) {
+        let job = data.job
+        const deadline = Date.now() + COPILOT_JOB_TIMEOUT_MS
+        while (!job || job.status === 'queued' || job.status === 'running') {
+          if (Date.now() > deadline) {
+            const timeoutError: any = new Error('A resposta está a demorar mais do que o esperado. Tente novamente daqui a pouco.')
+            timeoutError.code = 'COPILOT_TIMEOUT'
+            throw timeoutError
+          }
+          const jobResponse = await api.get(`/ai-copilot/jobs/${data.job_id}/`, { params: { wait: COPILOT_JOB_WAIT_SECONDS } })
+          job = jobResponse.data
+        }
+        data = { ...data, assistant_message: job.assistant_message, error: job.error }
+      }
       if (__DEV__) {
         console.log('📤 AI Copilot chat request:', { message: message.substring(0, 50), conversationId })
-        console.log('✅ AI Copilot chat response:', response.data)
+        console.log('✅ AI Copilot chat response:', data)
       }
-      return response.data
+      return data
     } catch (error: any) {
       if (__DEV__) {
         console.error('❌ AI Copilot chat error:', {